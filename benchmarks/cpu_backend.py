@@ -0,0 +1,96 @@
+# CPU backend benchmark: memory, tokens/s and accuracy parity against float32
+#
+# Usage:
+#   python -m benchmarks.cpu_backend                     # int8 vs float32
+#   python -m benchmarks.cpu_backend --backend onnx
+#   python -m benchmarks.cpu_backend --skip-parity       # no float32 copy kept for parity
+#
+# Needs the full ML requirements (torch, transformers; optimum[onnxruntime] for onnx).
+# The float32 reference stays loaded for the parity check, so peak memory is the sum
+# of both models.
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.run import peak_rss_mb
+
+PROMPT = (
+    "<|system|>\nYou are an AI assistant specialized in MSME business analytics.\n<|user|>\n"
+    "Data Context: Laptops sold 40 units at 1200.0, mice 120 units at 25.0, monitors 15 units at 300.0\n\n"
+    "Question: Which product brought in the most revenue and why?\n<|assistant|>\n"
+)
+
+
+def current_rss_mb():
+    """Resident set size now, from /proc where available, else the peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def tokens_per_second(model, tokenizer, new_tokens, runs):
+    import torch
+
+    input_ids = tokenizer(PROMPT, return_tensors="pt").input_ids
+    kwargs = dict(attention_mask=torch.ones_like(input_ids), max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                  do_sample=False, pad_token_id=tokenizer.eos_token_id)
+    with torch.no_grad():
+        model.generate(input_ids, **dict(kwargs, max_new_tokens=4, min_new_tokens=4))  # warm-up
+        start = time.perf_counter()
+        for _ in range(runs):
+            model.generate(input_ids, **kwargs)
+    return new_tokens * runs / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a CPU backend against the float32 model")
+    parser.add_argument("--model", default="microsoft/Phi-3.5-mini-instruct")
+    parser.add_argument("--backend", choices=["int8", "onnx"], default="int8")
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-parity", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from src.core.cpu_backend import configure_cpu_threads, load_cpu_model, parity_check
+
+    threads = configure_cpu_threads()
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    results = {"model": args.model, "backend": args.backend, "threads": threads}
+
+    before = current_rss_mb()
+    reference = AutoModelForCausalLM.from_pretrained(
+        args.model, trust_remote_code=True, attn_implementation="eager", torch_dtype=torch.float32
+    ).eval()
+    results["float32_mb"] = current_rss_mb() - before
+    results["float32_tokens_per_s"] = tokens_per_second(reference, tokenizer, args.new_tokens, args.runs)
+    if args.skip_parity:
+        del reference
+        reference = None
+
+    before = current_rss_mb()
+    _, candidate = load_cpu_model(args.model, args.backend)
+    results[f"{args.backend}_mb"] = current_rss_mb() - before
+    results[f"{args.backend}_tokens_per_s"] = tokens_per_second(candidate, tokenizer, args.new_tokens, args.runs)
+
+    results["memory_ratio"] = results[f"{args.backend}_mb"] / results["float32_mb"] if results["float32_mb"] else None
+    results["speedup"] = results[f"{args.backend}_tokens_per_s"] / results["float32_tokens_per_s"]
+    if reference is not None:
+        results["parity"] = parity_check(reference, candidate, tokenizer)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if results.get("parity", {}).get("passed", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
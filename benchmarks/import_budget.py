@@ -0,0 +1,102 @@
+# Import-time budget check for the Streamlit entry point
+#
+# Usage: python -m benchmarks.import_budget [--budget-ms 1000] [--runs 3]
+#
+# Each configuration imports src.ui (what main.py does before rendering) in a fresh
+# interpreter and fails if the app's own import time exceeds the budget or if any
+# heavy ML module is pulled in at import time.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported once a local model or vector store is needed
+HEAVY_MODULES = [
+    "torch", "transformers", "sentence_transformers", "langchain", "langchain_huggingface",
+    "langchain_community", "faiss", "openai", "bitsandbytes",
+]
+
+PROBE = r"""
+import importlib.abc, json, sys, time
+
+blocked = set(sys.argv[1].split(",")) if sys.argv[1] else set()
+
+class Hide(importlib.abc.MetaPathFinder):
+    # Simulates an install without the ML stack: every finder reports blocked modules as
+    # missing, so find_spec probes return None and imports raise ModuleNotFoundError
+    def __init__(self, finder):
+        self.finder = finder
+
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in blocked:
+            return None
+        return self.finder.find_spec(name, path, target)
+
+    def invalidate_caches(self):
+        if hasattr(self.finder, "invalidate_caches"):
+            self.finder.invalidate_caches()
+
+sys.meta_path[:] = [Hide(finder) for finder in sys.meta_path]
+
+start = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+import src.ui
+app_done = time.perf_counter()
+
+print(json.dumps({
+    "streamlit_ms": (streamlit_done - start) * 1000,
+    "app_ms": (app_done - streamlit_done) * 1000,
+    "heavy_loaded": sorted(m for m in sys.argv[2].split(",") if m in sys.modules),
+}))
+"""
+
+CONFIGURATIONS = {
+    # Default deployment: grok4 API mode with the ML stack installed but unused
+    "api-only": [],
+    # requirements_basic.txt install: no ML libraries at all
+    "no-ml": HEAVY_MODULES,
+}
+
+
+def measure(blocked, runs):
+    """Best-of-runs import timings for one configuration, each in a fresh interpreter"""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, ",".join(blocked), ",".join(HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda result: result["app_ms"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("PIRHO_IMPORT_BUDGET_MS", 1000)),
+                        help="Maximum import time of src.ui on top of streamlit itself")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, blocked in CONFIGURATIONS.items():
+        result = measure(blocked, args.runs)
+        problems = []
+        if result["app_ms"] > args.budget_ms:
+            problems.append(f"over budget ({args.budget_ms:.0f} ms)")
+        if result["heavy_loaded"]:
+            problems.append(f"heavy modules imported: {', '.join(result['heavy_loaded'])}")
+        failed = failed or bool(problems)
+
+        status = "FAIL" if problems else "ok"
+        print(f"{name:10s} app {result['app_ms']:7.1f} ms  streamlit {result['streamlit_ms']:7.1f} ms  {status}"
+              + (f" - {'; '.join(problems)}" if problems else ""))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# Prefix cache benchmark: prefill time with and without the cached system prompt
+#
+# Usage:
+#   python -m benchmarks.prefix_cache                    # float32 Phi-3.5-mini on CPU
+#   python -m benchmarks.prefix_cache --backend int8 --language hi --runs 10
+#
+# Needs the full ML requirements (torch, transformers). Each question is prefilled in
+# full, then again from a copy of the cached system prompt, which is the work
+# LLMHandler does before the first generated token. The next-token prediction of both
+# is compared to check the cached path gives the same result.
+import argparse
+import json
+import statistics
+import sys
+import time
+
+QUESTIONS = [
+    "Data Context: Rows (row | Product | Quantity | Price):\n0 | Laptop | 2 | 1200.0\n1 | Mouse | 10 | 25.0\n\n"
+    "Question: What was the revenue from laptops?",
+    "Which product sold the most units: laptops (40) or mice (120)?",
+    "Data Context: Dataset: 500 rows, 4 columns\n- Region: str; ~4 distinct; top North, South\n\n"
+    "Question: Which region should we focus on next quarter?",
+]
+
+
+def prompt_for(question, language):
+    from src.core.llm import HINDI_INSTRUCTION, SYSTEM_PROMPT
+
+    system_prompt = SYSTEM_PROMPT + (HINDI_INSTRUCTION if language == "hi" else "")
+    return f"<|system|>\n{system_prompt}\n<|user|>\n{question}\n<|assistant|>\n"
+
+
+def timed_prefill(model, input_ids, past=None):
+    """(milliseconds, next-token id) of one forward pass over input_ids"""
+    import torch
+
+    cached = past.get_seq_length() if past is not None else 0
+    attention_mask = torch.ones((1, cached + input_ids.shape[1]), dtype=torch.long)
+    started = time.perf_counter()
+    with torch.no_grad():
+        logits = model(input_ids=input_ids, attention_mask=attention_mask, past_key_values=past, use_cache=True).logits
+    return (time.perf_counter() - started) * 1000, int(logits[0, -1].argmax())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefill time saved by the system prompt KV cache")
+    parser.add_argument("--model", default="microsoft/Phi-3.5-mini-instruct")
+    parser.add_argument("--backend", choices=["float32", "int8"], default="float32")
+    parser.add_argument("--language", choices=["en", "hi"], default="en")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    import copy
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from src.core.cpu_backend import configure_cpu_threads, load_cpu_model
+    from src.core.prefix_cache import PrefixCache, split_prompt
+
+    configure_cpu_threads()
+    if args.backend == "int8":
+        tokenizer, model = load_cpu_model(args.model, "int8")
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(args.model)
+        model = AutoModelForCausalLM.from_pretrained(
+            args.model, trust_remote_code=True, attn_implementation="eager", torch_dtype=torch.float32
+        ).eval()
+
+    cache = PrefixCache(model, tokenizer)
+    prompts = [prompt_for(question, args.language) for question in QUESTIONS]
+    prefix = split_prompt(prompts[0])[0]
+    started = time.perf_counter()
+    prefix_ids, prefix_past = cache.lookup(prefix)
+    prefix_ms = (time.perf_counter() - started) * 1000
+
+    full_ms, cached_ms, prompt_tokens = [], [], []
+    same_next_token = True
+    for prompt in prompts:
+        ids = tokenizer(prompt, return_tensors="pt").input_ids
+        prompt_tokens.append(ids.shape[1])
+        timed_prefill(model, ids)  # warm-up
+        for _ in range(args.runs):
+            elapsed, full_token = timed_prefill(model, ids)
+            full_ms.append(elapsed)
+            started = time.perf_counter()
+            past = copy.deepcopy(prefix_past)
+            copy_ms = (time.perf_counter() - started) * 1000
+            elapsed, cached_token = timed_prefill(model, ids[:, len(prefix_ids):], past)
+            cached_ms.append(copy_ms + elapsed)
+            same_next_token = same_next_token and full_token == cached_token
+
+    full, cached = statistics.mean(full_ms), statistics.mean(cached_ms)
+    results = {
+        "model": args.model,
+        "backend": args.backend,
+        "language": args.language,
+        "prefix_tokens": len(prefix_ids),
+        "mean_prompt_tokens": statistics.mean(prompt_tokens),
+        "prefix_prefill_ms": round(prefix_ms, 1),
+        "full_prefill_ms": round(full, 1),
+        "cached_prefill_ms": round(cached, 1),
+        "saved_ms": round(full - cached, 1),
+        "saved_fraction": round((full - cached) / full, 3) if full else 0.0,
+        "same_next_token": same_next_token,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if same_next_token else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# End-to-end benchmark: ingestion, retrieval and generation on synthetic data
+#
+# Usage:
+#   python -m benchmarks.run                                  # 10k, 100k, 1M rows
+#   python -m benchmarks.run --sizes 10000 --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+#
+# Each dataset size runs in its own interpreter so peak RSS is measured per size.
+# Generation uses LLMHandler in grok4 mode against a local stub OpenAI-compatible
+# server, so no network access or API key is needed.
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_sales_csv
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+QUERIES = [
+    "What is the total revenue by product?",
+    "Top 5 customers",
+    "What were my top-selling products last month?",
+    "How many laptops were sold?",
+    "Average price",
+    "Tell me about Bob Johnson",
+    "Any unusual orders for monitors?",
+    "Which customers buy keyboards and mice together?",
+    "Summarize recent sales trends",
+    "Show orders where quantity > 4",
+]
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=float)
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_dataset(rows, query_rounds, chunksize=None):
+    """Ingest a synthetic CSV of rows rows into a fresh RAGHandler, then time queries"""
+    with tempfile.TemporaryDirectory() as workdir:
+        # A private index cache directory so every run measures a cold build
+        os.environ["PIRHO_INDEX_CACHE_DIR"] = os.path.join(workdir, "index_cache")
+        from src.core.rag import ML_AVAILABLE, RAGHandler
+
+        path = write_sales_csv(os.path.join(workdir, "sales.csv"), rows)
+        handler = RAGHandler()
+
+        start = time.perf_counter()
+        message = handler.load_csv(path, chunksize=chunksize)
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(query_rounds):
+            for query in QUERIES:
+                query_start = time.perf_counter()
+                handler.query_data(query)
+                latencies.append((time.perf_counter() - query_start) * 1000)
+
+    metrics = {
+        f"ingest.{rows}.rows_per_s": rows / elapsed,
+        f"ingest.{rows}.seconds": elapsed,
+        f"ingest.{rows}.peak_rss_mb": peak_rss_mb(),
+    }
+    metrics.update({f"query.{rows}.{name}": value for name, value in percentiles(latencies).items()})
+    return metrics, {"rows": rows, "ml_available": ML_AVAILABLE, "load_message": message}
+
+
+def bench_generation(requests, first_token_delay, token_delay):
+    """Time generate_response and stream_response through the stub server, uncached"""
+    from benchmarks.stub_llm import StubOpenAIServer
+    from src.core.llm import LLMHandler
+    from src.core.response_cache import ResponseCache
+
+    with StubOpenAIServer(first_token_delay=first_token_delay, token_delay=token_delay) as server:
+        os.environ["XAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("XAI_API_KEY", "benchmark")
+        handler = LLMHandler("grok4", response_cache=ResponseCache(max_entries=0))
+
+        latencies, first_token, streamed = [], [], []
+        for i in range(requests):
+            prompt = QUERIES[i % len(QUERIES)]
+            context = f"Row {i}: Date: 2025-01-01, Product: Laptop, Quantity: 1, Price: 1200.0, Customer: John Doe"
+
+            start = time.perf_counter()
+            handler.generate_response(prompt, context)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            first = None
+            for _ in handler.stream_response(prompt, context + " (stream)"):
+                if first is None:
+                    first = (time.perf_counter() - start) * 1000
+            first_token.append(first or 0.0)
+            streamed.append((time.perf_counter() - start) * 1000)
+
+    metrics = {f"generate.{name}": value for name, value in percentiles(latencies).items()}
+    metrics.update({f"generate.ttft_{name}": value for name, value in percentiles(first_token).items()})
+    metrics.update({f"generate.stream_{name}": value for name, value in percentiles(streamed).items()})
+    return metrics
+
+
+def higher_is_better(metric):
+    return metric.endswith("rows_per_s")
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of results against baseline beyond tolerance"""
+    regressions = []
+    for metric, base in baseline.items():
+        current = results.get(metric)
+        if current is None or not base:
+            continue
+        change = (current - base) / base
+        worse = -change if higher_is_better(metric) else change
+        if worse > tolerance:
+            regressions.append(f"{metric}: {base:.2f} -> {current:.2f} ({change:+.0%})")
+    return regressions
+
+
+def run_size_in_subprocess(rows, query_rounds, chunksize):
+    command = [sys.executable, "-m", "benchmarks.run", "--single-size", str(rows), "--query-rounds", str(query_rounds)]
+    if chunksize:
+        command += ["--chunksize", str(chunksize)]
+    output = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PiRhoAI end-to-end benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--query-rounds", type=int, default=3, help="Passes over the query set per size")
+    parser.add_argument("--chunksize", type=int, default=None, help="Benchmark streaming ingestion")
+    parser.add_argument("--generate-requests", type=int, default=20)
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="Stub server latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub server per-token latency (s)")
+    parser.add_argument("--baseline", help="JSON file of metrics to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's metrics to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--output", help="Write full results as JSON")
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single_size:
+        metrics, info = bench_dataset(args.single_size, args.query_rounds, args.chunksize)
+        print(json.dumps({"metrics": metrics, "info": info}))
+        return 0
+
+    metrics = {}
+    for rows in args.sizes:
+        result = run_size_in_subprocess(rows, args.query_rounds, args.chunksize)
+        metrics.update(result["metrics"])
+        info = result["info"]
+        print(f"{rows:>9,} rows: {result['metrics'][f'ingest.{rows}.rows_per_s']:>10,.0f} rows/s, "
+              f"peak RSS {result['metrics'][f'ingest.{rows}.peak_rss_mb']:,.0f} MB, "
+              f"query p50 {result['metrics'][f'query.{rows}.p50_ms']:.1f} ms "
+              f"(ML {'on' if info['ml_available'] else 'off'})")
+
+    if args.generate_requests:
+        generation = bench_generation(args.generate_requests, args.first_token_delay, args.token_delay)
+        metrics.update(generation)
+        print(f"generate p50 {generation['generate.p50_ms']:.1f} ms, "
+              f"time to first token p50 {generation['generate.ttft_p50_ms']:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
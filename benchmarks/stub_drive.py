@@ -0,0 +1,214 @@
+# Stub Google Drive server for offline download and sync tests
+#
+#   GET /download?id=ID            file bytes; supports Range, If-Range, If-None-Match
+#   GET /drive/v3/files/ID         JSON metadata (name, size, md5Checksum, modifiedTime)
+#
+# Point the connector at it with
+#   PIRHO_DRIVE_DOWNLOAD_URL=http://127.0.0.1:PORT/download?id={file_id}
+#   PIRHO_DRIVE_METADATA_URL=http://127.0.0.1:PORT/drive/v3/files/{file_id}
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        server = self.server
+        with server.lock:
+            server.requests += 1
+
+        if parsed.path == "/download":
+            file_id = parse_qs(parsed.query).get("id", [""])[0]
+            with server.lock:
+                server.download_requests += 1
+            self._download(server.files.get(file_id))
+        elif parsed.path.startswith("/drive/v3/files/"):
+            file_id = parsed.path.rsplit("/", 1)[-1]
+            with server.lock:
+                server.metadata_requests += 1
+            self._metadata(server.files.get(file_id))
+        else:
+            self._empty(404)
+
+    def _empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _metadata(self, entry):
+        if entry is None:
+            self._empty(404)
+            return
+        if self.headers.get("If-None-Match") == entry["etag"]:
+            self._empty(304, {"ETag": entry["etag"]})
+            return
+        payload = json.dumps({
+            "id": entry["id"],
+            "name": entry["name"],
+            "size": str(len(entry["data"])),
+            "md5Checksum": entry["md5"],
+            "modifiedTime": entry["modified"],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", entry["etag"])
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _download(self, entry):
+        if entry is None:
+            self._empty(404)
+            return
+        if self.headers.get("If-None-Match") == entry["etag"]:
+            self._empty(304, {"ETag": entry["etag"]})
+            return
+
+        data = entry["data"]
+        start, end, status = 0, len(data) - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range == entry["etag"]):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), len(data) - 1) if match.group(2) else len(data) - 1
+            status = 206
+
+        body = data[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Type", "text/csv" if entry["name"].endswith(".csv") else "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{entry["name"]}"')
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", entry["etag"])
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+
+        server = self.server
+        with server.lock:
+            drop = server.drop_next > 0
+            if drop:
+                server.drop_next -= 1
+        if drop:
+            # Send part of the body, then hang up as a flaky link would
+            self.wfile.write(body[:server.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            with server.lock:
+                server.bytes_sent += min(len(body), server.drop_after)
+            return
+
+        for offset in range(0, len(body), 64 * 1024):
+            self.wfile.write(body[offset:offset + 64 * 1024])
+            if server.byte_delay:
+                time.sleep(server.byte_delay * min(64 * 1024, len(body) - offset))
+        with server.lock:
+            server.bytes_sent += len(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive or abandoned downloads are expected, not errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StubDriveServer:
+    def __init__(self, host="127.0.0.1", port=0, byte_delay=0.0):
+        """
+        Serves registered files like Drive's download and metadata endpoints.
+        drop_next(n, after_bytes) makes the next n downloads disconnect early.
+        """
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.lock = threading.Lock()
+        self.httpd.files = {}
+        self.httpd.requests = 0
+        self.httpd.download_requests = 0
+        self.httpd.metadata_requests = 0
+        self.httpd.bytes_sent = 0
+        self.httpd.drop_next = 0
+        self.httpd.drop_after = 0
+        self.httpd.byte_delay = byte_delay
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def download_url(self):
+        return self.base_url + "/download?id={file_id}"
+
+    @property
+    def metadata_url(self):
+        return self.base_url + "/drive/v3/files/{file_id}"
+
+    def put_file(self, file_id, data, name):
+        """Add or replace a file; replacing bumps modifiedTime, md5Checksum and ETag"""
+        md5 = hashlib.md5(data).hexdigest()
+        with self.httpd.lock:
+            version = self.httpd.files.get(file_id, {}).get("version", 0) + 1
+            self.httpd.files[file_id] = {
+                "id": file_id,
+                "name": name,
+                "data": data,
+                "md5": md5,
+                "etag": f'"{md5}-{version}"',
+                "version": version,
+                "modified": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            }
+
+    def drop_next(self, count, after_bytes):
+        with self.httpd.lock:
+            self.httpd.drop_next = count
+            self.httpd.drop_after = after_bytes
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def download_requests(self):
+        return self.httpd.download_requests
+
+    @property
+    def metadata_requests(self):
+        return self.httpd.metadata_requests
+
+    @property
+    def bytes_sent(self):
+        return self.httpd.bytes_sent
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
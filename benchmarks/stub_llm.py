@@ -0,0 +1,169 @@
+# Stub OpenAI-compatible chat completions server for offline benchmarks and tests
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ["revenue", "grew", "across", "laptops", "while", "mouse", "orders", "stayed", "flat",
+         "and", "top", "customers", "drove", "most", "sales", "this", "month", "-", "consider", "restocking"]
+
+
+def stub_completion(messages, max_tokens=256):
+    """Deterministic pseudo-answer derived from the request messages"""
+    seed = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+    length = min(max_tokens, 40 + seed[0] % 40)
+    return [WORDS[(seed[i % len(seed)] + i) % len(WORDS)] + " " for i in range(length)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.fail_next > 0
+            if fail:
+                server.fail_next -= 1
+        if fail:
+            payload = json.dumps({"error": {"message": "stub overloaded", "type": "rate_limit"}}).encode("utf-8")
+            self.send_response(server.fail_status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        tokens = stub_completion(body.get("messages", []), body.get("max_tokens") or 256)
+        time.sleep(server.first_token_delay)
+        if body.get("stream"):
+            self._stream(body, tokens)
+        else:
+            time.sleep(server.token_delay * len(tokens))
+            self._respond(body, tokens)
+
+    def _respond(self, body, tokens):
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens + [None]):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": token} if token is not None else {},
+                    "finish_reason": None if token is not None else "stop",
+                }],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if token is not None:
+                time.sleep(self.server.token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive or abandoned streams are expected, not errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StubOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, first_token_delay=0.0, token_delay=0.0):
+        """
+        Local /v1/chat/completions endpoint with deterministic answers and optional
+        simulated latency. fail_next(n, status) makes the next n requests fail.
+        """
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.fail_next = 0
+        self.httpd.fail_status = 429
+        self.httpd.first_token_delay = first_token_delay
+        self.httpd.token_delay = token_delay
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def fail_next(self, count, status=429):
+        with self.httpd.lock:
+            self.httpd.fail_next = count
+            self.httpd.fail_status = status
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubOpenAIServer(port=args.port, first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    print(f"Stub server on {server.base_url} (set XAI_BASE_URL to this)")
+    server.start()._thread.join()
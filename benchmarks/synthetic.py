@@ -0,0 +1,51 @@
+# Synthetic MSME sales data with the same schema as sample_data.csv
+import numpy as np
+import pandas as pd
+
+# Product -> (min price, max price, max quantity per order), matching sample_data.csv
+PRODUCTS = {
+    "Laptop": (1000.0, 1400.0, 3),
+    "Mouse": (15.0, 30.0, 6),
+    "Keyboard": (60.0, 90.0, 5),
+    "Monitor": (250.0, 350.0, 3),
+    "Headphones": (40.0, 150.0, 4),
+    "Webcam": (35.0, 90.0, 3),
+    "Printer": (120.0, 400.0, 2),
+    "Router": (50.0, 180.0, 3),
+}
+FIRST_NAMES = ["John", "Jane", "Bob", "Alice", "Charlie", "Diana", "Eve", "Frank", "Grace", "Henry",
+               "Ivy", "Jack", "Kate", "Liam", "Mia", "Noah", "Olivia", "Peter", "Quinn", "Rose"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Brown", "Wilson", "Lee", "Davis", "Miller", "Taylor", "Clark",
+              "Anderson", "White", "Thompson", "Martin", "Garcia", "Walker", "Harris", "Lewis", "Young", "Hall"]
+
+
+def generate_sales_data(rows, seed=0, start_date="2025-01-01", customers=2000):
+    """Deterministic Date, Product, Quantity, Price, Customer frame with rows rows"""
+    rng = np.random.default_rng(seed)
+    names = list(PRODUCTS)
+    product_idx = rng.integers(0, len(names), rows)
+    low = np.array([PRODUCTS[name][0] for name in names])[product_idx]
+    high = np.array([PRODUCTS[name][1] for name in names])[product_idx]
+    max_qty = np.array([PRODUCTS[name][2] for name in names])[product_idx]
+
+    customer_pool = np.array([
+        f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+        + (f" {i // (len(FIRST_NAMES) * len(LAST_NAMES))}" if i >= len(FIRST_NAMES) * len(LAST_NAMES) else "")
+        for i in range(customers)
+    ])
+
+    # Spread orders over roughly a year, in date order like an exported ledger
+    day_offsets = np.sort(rng.integers(0, 365, rows))
+    return pd.DataFrame({
+        "Date": (pd.Timestamp(start_date) + pd.to_timedelta(day_offsets, unit="D")).strftime("%Y-%m-%d"),
+        "Product": np.array(names)[product_idx],
+        "Quantity": rng.integers(1, max_qty + 1),
+        "Price": np.round(rng.uniform(low, high) * 2) / 2,
+        "Customer": customer_pool[rng.integers(0, customers, rows)],
+    })
+
+
+def write_sales_csv(path, rows, seed=0):
+    """Write a synthetic dataset to path and return the path"""
+    generate_sales_data(rows, seed=seed).to_csv(path, index=False)
+    return path
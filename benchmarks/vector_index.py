@@ -0,0 +1,72 @@
+# Vector index benchmark: recall@k and per-query latency of each index strategy vs exact search
+#
+# Usage:
+#   python -m benchmarks.vector_index                                # 200k synthetic 384-d vectors
+#   python -m benchmarks.vector_index --rows 5000000 --strategies ivfsq ivfpq --nprobe 8 16 32
+#   python -m benchmarks.vector_index --vectors embeddings.npy       # real embeddings (rows x dim)
+#
+# Synthetic vectors are unit-normalised points around random cluster centres, roughly the
+# shape of sentence-transformer embeddings of tabular rows. Needs faiss and numpy.
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from src.core.vector_index import DEFAULT_EF_SEARCH, DEFAULT_NPROBE, INDEX_STRATEGIES, recall_report
+
+
+def synthetic_vectors(rows, dim, clusters=1000, noise=0.35, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    # Generate in blocks so memory stays near the size of the result
+    for start in range(0, rows, 100_000):
+        end = min(start + 100_000, rows)
+        block = centres[rng.integers(0, clusters, end - start)]
+        block += noise * rng.standard_normal(block.shape).astype(np.float32)
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall vs latency of FAISS index strategies")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--vectors", help="Load vectors from a .npy file instead of generating them")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--strategies", nargs="+", choices=INDEX_STRATEGIES, default=list(INDEX_STRATEGIES))
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, DEFAULT_NPROBE, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, DEFAULT_EF_SEARCH, 128])
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.vectors:
+        vectors = np.load(args.vectors, mmap_mode="r")
+    else:
+        vectors = synthetic_vectors(args.rows, args.dim)
+
+    # Queries are perturbed copies of stored vectors, like questions phrased close to a row
+    rng = np.random.default_rng(1)
+    queries = np.array(vectors[rng.choice(len(vectors), args.queries, replace=False)], dtype=np.float32)
+    queries += 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    report = recall_report(vectors, queries, args.strategies, k=args.k,
+                           nprobes=args.nprobe, ef_searches=args.ef_search)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'strategy':<8} {'setting':<14} {'recall':>7} {'ms/query':>9} {'build s':>8} {'MB':>8}")
+    for row in report:
+        setting = ", ".join(f"{key}={row[key]}" for key in ("nprobe", "ef_search") if key in row) or "-"
+        print(f"{row['strategy']:<8} {setting:<14} {row['recall']:>7.3f} {row['ms_per_query']:>9.3f} "
+              f"{row['build_s']:>8.1f} {row['memory_mb']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": len(vectors), "dim": int(vectors.shape[1]), "k": args.k, "results": report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
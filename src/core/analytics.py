@@ -0,0 +1,338 @@
+# Analytics engine - exact pandas answers for aggregation, filter, top-N and group-by questions
+import operator
+import re
+import pandas as pd
+
+# Question words mapped to aggregation functions
+AGGREGATION_WORDS = {
+    "sum": ["total", "sum", "overall", "combined"],
+    "mean": ["average", "avg", "mean"],
+    "count": ["how many", "count", "number of"],
+    "max": ["maximum", "max", "largest single", "biggest single"],
+    "min": ["minimum", "min", "smallest single"],
+}
+TOP_WORDS = ["top", "best", "highest", "largest", "most", "biggest"]
+BOTTOM_WORDS = ["bottom", "worst", "lowest", "least", "smallest", "fewest"]
+LIST_WORDS = ["show", "list", "find", "which", "display", "all"]
+
+# Measures that can be derived from quantity x price when not present as columns
+REVENUE_WORDS = ["revenue", "sales", "turnover", "income", "amount", "earnings"]
+UNITS_WORDS = ["selling", "sold", "units", "volume"]
+QUANTITY_COLUMNS = ["quantity", "qty", "units", "count"]
+PRICE_COLUMNS = ["price", "unit_price", "unit price", "rate", "cost"]
+
+TIME_GROUPS = {
+    "day": ["daily", "by day", "per day", "each day"],
+    "week": ["weekly", "by week", "per week", "each week"],
+    "month": ["monthly", "by month", "per month", "each month"],
+    "year": ["yearly", "annual", "by year", "per year", "each year"],
+}
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+COMPARISONS = {
+    ">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt, "=": operator.eq,
+    "at least": operator.ge, "at most": operator.le, "above": operator.gt, "over": operator.gt,
+    "more than": operator.gt, "greater than": operator.gt, "below": operator.lt, "under": operator.lt,
+    "less than": operator.lt, "equal to": operator.eq,
+}
+MAX_RESULT_ROWS = 20
+# Text columns with more distinct values than this are not scanned for filter values
+MAX_FILTER_CARDINALITY = 10000
+
+
+def _contains(text, phrase):
+    """Whole-word/phrase match"""
+    return re.search(rf"(?<!\w){re.escape(phrase)}(?!\w)", text) is not None
+
+
+def _phrases(question, max_words=4):
+    """All 1..max_words word n-grams of the question, with and without a plural 's'"""
+    words = [word.strip("?.,!;:'\"()") for word in question.split()]
+    words = [word for word in words if word]
+    phrases = set()
+    for size in range(1, max_words + 1):
+        for start in range(len(words) - size + 1):
+            phrase = " ".join(words[start:start + size])
+            phrases.add(phrase)
+            if phrase.endswith("s"):
+                phrases.add(phrase[:-1])
+    return phrases
+
+
+def _name_variants(name):
+    base = str(name).lower().replace("_", " ").strip()
+    variants = {base, base + "s", base + "es"}
+    if base.endswith("y"):
+        variants.add(base[:-1] + "ies")
+    if base.endswith("s"):
+        variants.add(base[:-1])
+    return variants
+
+
+class QueryPlan:
+    def __init__(self):
+        """Structured interpretation of a natural language question"""
+        self.aggregation = None
+        self.measure = None
+        self.measure_values = None
+        self.group = None
+        self.time_group = None
+        self.top_n = None
+        self.ascending = False
+        self.filters = []
+        self.list_rows = False
+
+    def describe(self):
+        parts = []
+        if self.aggregation:
+            parts.append(f"{self.aggregation} of {self.measure or 'rows'}")
+        if self.group or self.time_group:
+            parts.append(f"grouped by {self.group or self.time_group}")
+        if self.top_n:
+            parts.append(f"{'bottom' if self.ascending else 'top'} {self.top_n}")
+        for _, label, _ in self.filters:
+            parts.append(f"where {label}")
+        if self.list_rows and not self.aggregation:
+            parts.append("matching rows")
+        return ", ".join(parts)
+
+
+class AnalyticsEngine:
+    def __init__(self, df):
+        """Answer structured questions exactly by computing over the full dataframe"""
+        self.df = df
+        self.date_column, self.dates = self._detect_dates(df)
+        self.numeric_columns = [
+            col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        self.text_columns = [
+            col for col in df.columns
+            if col not in self.numeric_columns and col != self.date_column
+        ]
+        self._value_lookup = None
+
+    @staticmethod
+    def _detect_dates(df):
+        """Find a datetime column, parsing text columns whose name or sample looks like a date"""
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                return col, df[col]
+        for col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                continue
+            sample = df[col].dropna().head(20)
+            if sample.empty:
+                continue
+            parsed = pd.to_datetime(sample.astype(str), errors="coerce", format="mixed")
+            if parsed.notna().mean() >= 0.9:
+                return col, pd.to_datetime(df[col], errors="coerce", format="mixed")
+        return None, None
+
+    @property
+    def value_lookup(self):
+        """Lowercased distinct values of low-cardinality text columns, for filter matching"""
+        if self._value_lookup is None:
+            self._value_lookup = {}
+            for col in self.text_columns:
+                values = self.df[col].dropna().astype(str).unique()
+                if len(values) <= MAX_FILTER_CARDINALITY:
+                    self._value_lookup[col] = {value.lower(): value for value in values}
+        return self._value_lookup
+
+    def _find_column(self, question, columns):
+        """Column whose name (or plural) is mentioned in the question"""
+        for col in columns:
+            if any(_contains(question, variant) for variant in _name_variants(col)):
+                return col
+        return None
+
+    def _find_named_column(self, names):
+        for col in self.df.columns:
+            if str(col).lower().replace("_", " ") in names:
+                return col
+        return None
+
+    def _measure(self, question):
+        """Numeric column, or derived quantity x price measure, that the question names"""
+        column = self._find_column(question, self.numeric_columns)
+        if column is not None:
+            return column, self.df[column]
+
+        quantity = self._find_named_column(QUANTITY_COLUMNS)
+        price = self._find_named_column(PRICE_COLUMNS)
+        if any(_contains(question, word) for word in REVENUE_WORDS) and quantity is not None and price is not None:
+            return "Revenue", self.df[quantity] * self.df[price]
+        if any(_contains(question, word) for word in UNITS_WORDS) and quantity is not None:
+            return quantity, self.df[quantity]
+        return None, None
+
+    def _filters(self, question):
+        """Equality filters on mentioned column values plus numeric comparisons and time windows"""
+        filters = []
+        phrases = _phrases(question)
+        for col, values in self.value_lookup.items():
+            matched = sorted({
+                values[phrase] for phrase in phrases
+                if len(phrase) > 1 and phrase in values
+            })
+            if matched:
+                filters.append((col, f"{col} in {matched}", self.df[col].astype(str).isin(matched)))
+
+        for col in self.numeric_columns:
+            for variant in _name_variants(col):
+                for phrase, compare in COMPARISONS.items():
+                    match = re.search(rf"\b{re.escape(variant)}\s*(?:is\s+)?{re.escape(phrase)}\s*(-?\d+(?:\.\d+)?)", question)
+                    if match:
+                        threshold = float(match.group(1))
+                        filters.append((col, f"{col} {phrase} {threshold:g}", compare(self.df[col], threshold)))
+                        break
+
+        if self.dates is not None:
+            filters.extend(self._time_filters(question))
+        return filters
+
+    def _time_filters(self, question):
+        dates = self.dates
+        latest = dates.max()
+        if pd.isna(latest):
+            return []
+        if _contains(question, "last month") or _contains(question, "this month") or _contains(question, "latest month"):
+            # Relative to the data: the most recent calendar month present
+            period = latest.to_period("M")
+            return [(self.date_column, f"{self.date_column} in {period}", dates.dt.to_period("M") == period)]
+        if _contains(question, "last year") or _contains(question, "this year"):
+            return [(self.date_column, f"{self.date_column} in {latest.year}", dates.dt.year == latest.year)]
+
+        for number, month in enumerate(MONTHS, start=1):
+            match = re.search(rf"\b{month}(?:\s+(\d{{4}}))?\b", question)
+            if match:
+                mask = dates.dt.month == number
+                label = month.title()
+                if match.group(1):
+                    mask &= dates.dt.year == int(match.group(1))
+                    label += f" {match.group(1)}"
+                return [(self.date_column, f"{self.date_column} in {label}", mask)]
+        return []
+
+    def plan(self, question):
+        """Interpret the question, or return None if it needs fuzzy retrieval instead"""
+        question = question.lower()
+        plan = QueryPlan()
+
+        for aggregation, words in AGGREGATION_WORDS.items():
+            if any(_contains(question, word) for word in words):
+                plan.aggregation = aggregation
+                break
+
+        top = re.search(rf"\b({'|'.join(TOP_WORDS + BOTTOM_WORDS)})(?:[\s-]+(\d+))?\b", question)
+        if top:
+            plan.ascending = top.group(1) in BOTTOM_WORDS
+            plan.top_n = int(top.group(2)) if top.group(2) else (5 if top.group(1) in ("top", "bottom", "best", "worst") else 1)
+
+        for period, words in TIME_GROUPS.items():
+            if self.dates is not None and any(_contains(question, word) for word in words):
+                plan.time_group = period
+                break
+
+        plan.filters = self._filters(question)
+        filtered_columns = {col for col, _, _ in plan.filters}
+        group_candidates = [col for col in self.text_columns if col not in filtered_columns]
+        by_clause = re.search(r"\b(?:by|per|each|every|across)\s+([a-z_ ]+)", question)
+        if by_clause:
+            plan.group = self._find_column(by_clause.group(1), group_candidates)
+        if plan.group is None and plan.top_n:
+            plan.group = self._find_column(question, group_candidates)
+
+        plan.list_rows = any(_contains(question, word) for word in LIST_WORDS) and bool(plan.filters)
+
+        if not (plan.aggregation or plan.top_n or plan.group or plan.time_group or plan.list_rows):
+            return None
+
+        plan.measure, plan.measure_values = self._measure(question)
+        if not (plan.measure or plan.group or plan.time_group or plan.filters):
+            # Nothing in the question names a column or value of this data ("best deals")
+            return None
+
+        quantity = self._find_named_column(QUANTITY_COLUMNS)
+        if plan.aggregation == "count" and quantity is not None and any(_contains(question, word) for word in UNITS_WORDS):
+            # "How many laptops were sold" counts units, not rows
+            plan.aggregation = "sum"
+        if plan.aggregation is None and (plan.top_n or plan.group or plan.time_group):
+            # Without a named measure ("most orders", "most popular") rankings count rows;
+            # revenue is only ranked when the question asks about sales or revenue
+            plan.aggregation = "sum" if plan.measure else "count"
+        if plan.aggregation not in (None, "count") and plan.measure is None:
+            # Asked for a numeric aggregate of something we cannot identify
+            return None
+        return plan
+
+    def execute(self, plan):
+        """Run the plan over the dataframe and format a compact text result"""
+        mask = pd.Series(True, index=self.df.index)
+        for _, _, condition in plan.filters:
+            mask &= condition.fillna(False).to_numpy(dtype=bool)
+        matched = int(mask.sum())
+        header = f"Computed result ({plan.describe()}; {matched} of {len(self.df)} rows matched):"
+
+        if plan.aggregation is None:
+            rows = self.df[mask].head(MAX_RESULT_ROWS)
+            more = f"\n... {matched - len(rows)} more rows" if matched > len(rows) else ""
+            return f"{header}\n{rows.to_string()}{more}"
+
+        values = plan.measure_values[mask] if plan.measure_values is not None else pd.Series(1, index=self.df.index)[mask]
+        keys = None
+        if plan.group:
+            keys = self.df.loc[mask, plan.group]
+        elif plan.time_group:
+            keys = self.dates[mask].dt.to_period(plan.time_group[0].upper()).astype(str)
+
+        if keys is None:
+            if plan.top_n and plan.measure:
+                # Top-N individual rows by the measure
+                order = self._head_with_ties(values.sort_values(ascending=plan.ascending), plan.top_n).index
+                result = self.df.loc[order].assign(**{plan.measure: values.loc[order]})
+                return f"{header}\n{result.to_string()}"
+            result = values.size if plan.aggregation == "count" else getattr(values, plan.aggregation)()
+            return f"{header}\n{plan.aggregation} of {plan.measure or 'rows'}: {self._format(result)}"
+
+        grouped = values.groupby(keys.to_numpy(), sort=False)
+        result = grouped.size() if plan.aggregation == "count" else getattr(grouped, plan.aggregation)()
+        if plan.top_n or not plan.time_group:
+            result = result.sort_values(ascending=plan.ascending)
+        else:
+            result = result.sort_index()
+        shown = self._head_with_ties(result, plan.top_n) if plan.top_n else result.head(MAX_RESULT_ROWS)
+        lines = [f"{key}: {self._format(value)}" for key, value in shown.items()]
+        if len(result) > len(shown) and not plan.top_n:
+            lines.append(f"... {len(result) - len(shown)} more groups")
+        elif len(result) > len(shown) and result.iloc[len(shown)] == shown.iloc[-1]:
+            lines.append(f"... {int((result.iloc[len(shown):] == shown.iloc[-1]).sum())} more tied")
+        label = f"{plan.group or plan.time_group} | {plan.aggregation} of {plan.measure or 'rows'}"
+        return "\n".join([header, label] + lines)
+
+    @staticmethod
+    def _head_with_ties(ranked, n):
+        """First n of a sorted series plus everything tied with the n-th, up to MAX_RESULT_ROWS"""
+        if len(ranked) <= n:
+            return ranked
+        tied = ranked.iloc[n:] == ranked.iloc[n - 1]
+        extra = int(tied.cummin().sum())
+        return ranked.iloc[:max(n, min(n + extra, MAX_RESULT_ROWS))]
+
+    @staticmethod
+    def _format(value):
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return str(value)
+
+    def answer(self, question):
+        """Exact computed context for structured questions, or None to fall back to retrieval"""
+        plan = self.plan(question)
+        if plan is None:
+            return None
+        try:
+            return self.execute(plan)
+        except Exception as e:
+            print(f"Warning: Structured query failed, falling back to retrieval: {e}")
+            return None
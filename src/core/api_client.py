@@ -0,0 +1,208 @@
+# API client - shared, retrying, concurrency-limited client for the xAI/OpenAI-compatible API
+#
+# One client per (API key, base URL) is shared by every session, so HTTP keep-alive
+# connections are reused. Calls time out, retry 429/5xx/connection errors with jittered
+# exponential backoff (honouring Retry-After), and wait for one of a fixed number of
+# slots per API key, shared by blocking and asyncio callers. An asyncio interface (achat,
+# achat_stream) lets many requests be in flight from one event loop.
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+import weakref
+
+DEFAULT_BASE_URL = "https://api.x.ai/v1"
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_BASE_SECONDS = 0.5
+DEFAULT_BACKOFF_MAX_SECONDS = 8.0
+DEFAULT_MAX_CONCURRENCY = 8
+RETRY_STATUS_CODES = {408, 409, 429}
+# Async callers poll for a free slot so a cancelled wait never holds one
+ASYNC_SLOT_POLL_MIN_SECONDS = 0.005
+ASYNC_SLOT_POLL_MAX_SECONDS = 0.1
+
+
+def _key_id(api_key):
+    """Stable, non-secret identifier for an API key"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections are retried"""
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None):
+        """Full-jitter exponential backoff: attempt n waits uniform(0, min(max_delay, base * 2**n))"""
+        self.max_attempts = max_attempts or int(os.getenv("PIRHO_API_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        self.base_delay = base_delay if base_delay is not None else DEFAULT_BACKOFF_BASE_SECONDS
+        self.max_delay = max_delay if max_delay is not None else DEFAULT_BACKOFF_MAX_SECONDS
+
+    def delay(self, attempt, error=None):
+        retry_after = _retry_after(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class _KeySlots:
+    def __init__(self, limit):
+        """Concurrency slots for one API key; a context manager for threads and for coroutines"""
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._semaphore.release()
+        return False
+
+    async def __aenter__(self):
+        delay = ASYNC_SLOT_POLL_MIN_SECONDS
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, ASYNC_SLOT_POLL_MAX_SECONDS)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+        return False
+
+
+# Concurrency slots per API key, shared by every client and event loop using that key
+_key_slots = {}
+_key_slots_lock = threading.Lock()
+
+
+def _slots_for(api_key, limit):
+    with _key_slots_lock:
+        key = _key_id(api_key)
+        if key not in _key_slots:
+            _key_slots[key] = _KeySlots(limit)
+        return _key_slots[key]
+
+
+class APIClient:
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, timeout=None, connect_timeout=None,
+                 max_concurrency=None, retry_policy=None):
+        """
+        Shared sync/async chat completions client for one API key and base URL.
+        Use get_api_client() rather than constructing one per handler.
+        """
+        import openai
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = openai.Timeout(
+            timeout or float(os.getenv("PIRHO_API_TIMEOUT", DEFAULT_TIMEOUT_SECONDS)),
+            connect=connect_timeout or DEFAULT_CONNECT_TIMEOUT_SECONDS
+        )
+        self.max_concurrency = max_concurrency or int(os.getenv("PIRHO_API_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        self.retry_policy = retry_policy or RetryPolicy()
+        # The SDK's own retries are disabled so backoff and concurrency are handled in one place
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0)
+        self._slots = _slots_for(api_key, self.max_concurrency)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.retries = 0
+
+    def _with_retries(self, call):
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except Exception as e:
+                if attempt + 1 >= self.retry_policy.max_attempts or not is_retryable(e):
+                    raise
+                self.retries += 1
+                time.sleep(self.retry_policy.delay(attempt, e))
+                attempt += 1
+
+    def chat(self, **params):
+        """Blocking chat completion (same parameters as client.chat.completions.create)"""
+        with self._slots:
+            return self._with_retries(lambda: self.client.chat.completions.create(**params))
+
+    def chat_stream(self, **params):
+        """
+        Yield chat completion chunks. Opening the stream is retried; once chunks
+        have arrived, a failure is raised rather than replayed.
+        """
+        with self._slots:
+            stream = self._with_retries(lambda: self.client.chat.completions.create(stream=True, **params))
+            with stream:
+                yield from stream
+
+    def _async_client(self):
+        # httpx async connections belong to one event loop, so each loop gets its own client
+        import openai
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                        timeout=self.timeout, max_retries=0)
+            self._async_clients[loop] = client
+        return client
+
+    async def _awith_retries(self, call):
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                if attempt + 1 >= self.retry_policy.max_attempts or not is_retryable(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.retry_policy.delay(attempt, e))
+                attempt += 1
+
+    async def achat(self, **params):
+        """Async chat completion; shares the API key's max_concurrency slots with blocking calls"""
+        client = self._async_client()
+        async with self._slots:
+            return await self._awith_retries(lambda: client.chat.completions.create(**params))
+
+    async def achat_stream(self, **params):
+        """Async generator of chat completion chunks"""
+        client = self._async_client()
+        async with self._slots:
+            stream = await self._awith_retries(lambda: client.chat.completions.create(stream=True, **params))
+            async with stream:
+                async for chunk in stream:
+                    yield chunk
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_api_client(api_key=None, base_url=None):
+    """Process-wide APIClient for XAI_API_KEY / XAI_BASE_URL (or the given values)"""
+    api_key = api_key if api_key is not None else os.getenv("XAI_API_KEY", "")
+    base_url = base_url or os.getenv("XAI_BASE_URL", DEFAULT_BASE_URL)
+    key = (_key_id(api_key), base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = APIClient(api_key, base_url)
+        return _clients[key]
@@ -0,0 +1,406 @@
+# Dataset catalog - several named datasets, each with its own index and profile
+#
+# Datasets are registered by name and loaded into their own RAGHandler on first use.
+# Loaded datasets of every catalog in the process (one per UI session) share one memory
+# budget: they are kept least recently used first and evicted once their estimated size
+# (dataframe, vectors, document text and lexical index) exceeds it; an evicted dataset reloads from its file or parsed snapshot, usually through the index cache. Files
+# loaded without a snapshot (streamed CSVs) are kept, hard-linked where possible, until the
+# dataset is removed or the catalog is collected, since callers delete their uploads.
+# Queries fan out to the chosen datasets in parallel and the closest matches across
+# all of them are merged into one context.
+import os
+import shutil
+import sys
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.context_builder import RetrievedContext
+from src.data.snapshot import ARROW_AVAILABLE, get_snapshot_store
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+DEFAULT_QUERY_WORKERS = 4
+DEFAULT_CATALOG_DIR = os.path.join(".cache", "catalog")
+
+
+def estimate_dataset_bytes(handler):
+    """Best-effort resident size of a loaded RAGHandler"""
+    size = 0
+    if handler.df is not None:
+        size += int(handler.df.memory_usage(deep=True).sum())
+    if getattr(handler, "lexical", None) is not None:
+        size += handler.lexical.memory_bytes()
+    vectorstore = handler.vectorstore
+    if vectorstore is not None:
+        from src.core.vector_index import estimate_index_bytes
+
+        size += estimate_index_bytes(vectorstore.index)
+        documents = getattr(vectorstore.docstore, "_dict", {})
+        size += sum(sys.getsizeof(doc.page_content) for doc in documents.values())
+    return size
+
+
+def merge_results(results, k=5):
+    """
+    One context from per-dataset query results [(name, context)]: the k closest matches
+    across every dataset, grouped by dataset in order of each one's best match, followed
+    by that dataset's unscored material (exact answers, profile). Datasets with matches,
+    none of them among the k closest, are left out.
+    """
+    per_dataset = []
+    scored = []
+    for name, context in results:
+        sections = getattr(context, "sections", None) or [(str(context), None)]
+        columns = getattr(context, "columns", None) or []
+        per_dataset.append((name, sections, columns))
+        scored.extend((section[1], name, position) for position, section in enumerate(sections)
+                      if section[1] is not None)
+    closest = sorted(scored, key=lambda item: item[0])[:k]
+    kept = {(name, position) for _, name, position in closest}
+    best = {}
+    for distance, name, _ in closest:
+        best.setdefault(name, distance)
+
+    merged = []
+    # Datasets answered exactly (no scored matches) first, then by best match
+    order = sorted(range(len(per_dataset)), key=lambda i: best.get(per_dataset[i][0], -1.0))
+    for i in order:
+        name, sections, columns = per_dataset[i]
+        has_scores = any(section[1] is not None for section in sections)
+        if has_scores and name not in best:
+            continue
+        chosen = [
+            (text, distance, columns) for position, (text, distance, *_) in enumerate(sections)
+            if distance is None or (name, position) in kept
+        ]
+        text, distance, columns = chosen[0]
+        chosen[0] = (f"From {name}:\n{text}", distance, columns)
+        merged.extend(chosen)
+    return RetrievedContext("\n\n".join(section[0] for section in merged), merged)
+
+
+class MemoryBudget:
+    def __init__(self, memory_budget_mb=None):
+        """
+        Memory shared by the loaded datasets of every catalog using it: they are kept
+        least recently used first and evicted once their estimated total exceeds
+        memory_budget_mb (PIRHO_CATALOG_MEMORY_MB). Catalogs sharing a budget share its lock.
+        """
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("PIRHO_CATALOG_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        # id(dataset) -> weak reference, least recently used first; datasets of a collected catalog drop out
+        self._resident = OrderedDict()
+
+    def touch_locked(self, dataset):
+        """Record dataset as loaded and most recently used"""
+        key = id(dataset)
+        self._resident[key] = weakref.ref(dataset)
+        self._resident.move_to_end(key)
+
+    def discard_locked(self, dataset):
+        self._resident.pop(id(dataset), None)
+
+    def evict_locked(self):
+        """Unload least recently used datasets until the total fits; held and active ones stay"""
+        resident = []
+        for key, ref in list(self._resident.items()):
+            dataset = ref()
+            if dataset is None:
+                del self._resident[key]
+            else:
+                resident.append((key, dataset))
+        total = sum(dataset.size_bytes for _, dataset in resident)
+        for key, dataset in resident:
+            if total <= self.memory_budget_bytes:
+                break
+            owner = dataset.owner()
+            if dataset.refs == 0 and (owner is None or owner.active != dataset.name):
+                total -= dataset.size_bytes
+                del self._resident[key]
+                dataset.handler = None
+                dataset.size_bytes = 0
+                if owner is not None:
+                    owner.evictions += 1
+
+    def resident_bytes_locked(self):
+        """Estimated size of every loaded dataset under this budget"""
+        datasets = [ref() for ref in self._resident.values()]
+        return sum(dataset.size_bytes for dataset in datasets if dataset is not None)
+
+
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+
+def get_memory_budget():
+    """Process-wide dataset memory budget configured from PIRHO_CATALOG_MEMORY_MB"""
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = MemoryBudget()
+        return _default_budget
+
+
+class _Dataset:
+    def __init__(self, name, file_path=None, df=None, load_options=None, owner=None):
+        self.name = name
+        # Weak reference to the catalog, for the shared budget's eviction
+        self.owner = owner or (lambda: None)
+        self.file_path = file_path
+        self.df = df
+        self.load_options = load_options or {}
+        # Parsed snapshot of file_path, to reload from once the file itself is gone
+        self.snapshot_key = None
+        # Catalog-owned copy of file_path when it has no snapshot
+        self.kept_path = None
+        self.handler = None
+        self.size_bytes = 0
+        self.refs = 0
+        self.message = None
+        self.lock = threading.Lock()
+
+
+class DatasetCatalog:
+    def __init__(self, memory_budget_mb=None, workers=None, handler_factory=None):
+        """
+        Named datasets loaded on first use and evicted least recently used under the
+        process-wide memory budget (get_memory_budget), shared with every other catalog,
+        or a budget of memory_budget_mb of their own. Queries run on up to workers
+        datasets at once (PIRHO_CATALOG_WORKERS).
+        """
+        self.budget = MemoryBudget(memory_budget_mb) if memory_budget_mb is not None else get_memory_budget()
+        self.workers = workers or int(os.getenv("PIRHO_CATALOG_WORKERS", DEFAULT_QUERY_WORKERS))
+        if handler_factory is None:
+            from src.core.rag import RAGHandler as handler_factory
+        self.handler_factory = handler_factory
+        self.snapshots = get_snapshot_store()
+        # Kept source files live in a directory of their own, deleted with the catalog
+        self.files_dir = os.path.join(os.getenv("PIRHO_CATALOG_DIR", DEFAULT_CATALOG_DIR), uuid.uuid4().hex)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.files_dir, ignore_errors=True)
+        self._datasets = {}
+        self._lock = self.budget.lock
+        # The most recently loaded dataset is the one on screen; it is never evicted
+        self.active = None
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, name, file_path=None, df=None, **load_options):
+        """Add (or replace) a dataset without loading it; load_options go to load_csv"""
+        if file_path is None and df is None:
+            raise ValueError(f"Dataset '{name}' needs a file path or a dataframe")
+        with self._lock:
+            previous = self._datasets.get(name)
+            self._datasets[name] = _Dataset(name, file_path, df, load_options, weakref.ref(self))
+            if previous is not None:
+                self.budget.discard_locked(previous)
+        if previous is not None:
+            previous.handler = None
+            self._discard_file(previous)
+        return name
+
+    def load(self, name, file_path=None, df=None, progress_callback=None, **load_options):
+        """
+        Load a dataset now and make it the active one. A dataset already loaded under
+        name keeps its handler, so incremental=True re-embeds only changed rows.
+        Returns (handler, message).
+        """
+        if file_path is None and df is None:
+            raise ValueError(f"Dataset '{name}' needs a file path or a dataframe")
+        with self._lock:
+            dataset = self._datasets.get(name)
+        if dataset is None or dataset.handler is None:
+            self.register(name, file_path, df, **load_options)
+            with self._lock:
+                dataset = self._datasets[name]
+        else:
+            dataset.file_path, dataset.df, dataset.load_options = file_path, df, load_options
+
+        with dataset.lock:
+            handler = dataset.handler or self.handler_factory()
+            message = self._load_into(dataset, handler, progress_callback)
+        with self._lock:
+            if dataset.handler is not None:
+                self.active = name
+            self._evict_locked()
+        return handler, message
+
+    def _load_into(self, dataset, handler, progress_callback=None):
+        """Run load_csv for dataset on handler and record it as resident if it succeeded"""
+        options = dict(dataset.load_options)
+        from_file = False
+        try:
+            if dataset.df is not None:
+                message = handler.load_csv(df=dataset.df, progress_callback=progress_callback, **options)
+            elif os.path.exists(dataset.file_path):
+                message = handler.load_csv(dataset.file_path, progress_callback=progress_callback, **options)
+                from_file = True
+            elif dataset.kept_path is not None and os.path.exists(dataset.kept_path):
+                message = handler.load_csv(dataset.kept_path, progress_callback=progress_callback, **options)
+            else:
+                if dataset.snapshot_key is None:
+                    dataset.message = f"Dataset '{dataset.name}': file not found: {dataset.file_path}"
+                    return dataset.message
+                df = self.snapshots.load(dataset.snapshot_key)
+                if df is None:
+                    dataset.message = f"Dataset '{dataset.name}' is no longer available. Please load it again."
+                    return dataset.message
+                options.pop("chunksize", None)
+                message = handler.load_csv(df=df, progress_callback=progress_callback, **options)
+        except Exception as e:
+            message = f"Error loading dataset '{dataset.name}': {e}"
+
+        dataset.message = message
+        if handler.profile is None or not handler.profile.rows:
+            return message
+        if from_file:
+            self._keep_source(dataset)
+        dataset.handler = handler
+        dataset.size_bytes = estimate_dataset_bytes(handler)
+        with self._lock:
+            self.loads += 1
+            self.budget.touch_locked(dataset)
+        return message
+
+    def _keep_source(self, dataset):
+        """
+        Make sure dataset can reload once its file is gone: through the snapshot load_csv
+        wrote, or (streamed CSVs write none) a catalog-owned link or copy of the file
+        """
+        self._discard_file(dataset)
+        dataset.snapshot_key = None
+        if ARROW_AVAILABLE and dataset.file_path.endswith(('.csv', '.xlsx', '.xls')):
+            key = self.snapshots.key_for(dataset.file_path)
+            if self.snapshots.has(key):
+                dataset.snapshot_key = key
+                return
+        os.makedirs(self.files_dir, exist_ok=True)
+        kept_path = os.path.join(self.files_dir, f"{uuid.uuid4().hex}-{os.path.basename(dataset.file_path)}")
+        try:
+            os.link(dataset.file_path, kept_path)
+        except OSError:
+            try:
+                shutil.copyfile(dataset.file_path, kept_path)
+            except OSError as e:
+                print(f"Warning: Could not keep a copy of {dataset.file_path}: {e}")
+                return
+        dataset.kept_path = kept_path
+
+    @staticmethod
+    def _discard_file(dataset):
+        if dataset.kept_path is not None:
+            try:
+                os.remove(dataset.kept_path)
+            except OSError:
+                pass
+            dataset.kept_path = None
+
+    def _acquire(self, name):
+        """Loaded handler for name (loading it if needed) held against eviction, or None"""
+        with self._lock:
+            dataset = self._datasets.get(name)
+            if dataset is None:
+                raise KeyError(f"Unknown dataset '{name}'")
+            dataset.refs += 1
+        try:
+            with dataset.lock:
+                if dataset.handler is None:
+                    self._load_into(dataset, self.handler_factory())
+        except BaseException:
+            self._release(dataset)
+            raise
+        with self._lock:
+            if dataset.handler is not None:
+                self.budget.touch_locked(dataset)
+        return dataset
+
+    def _release(self, dataset):
+        with self._lock:
+            dataset.refs = max(0, dataset.refs - 1)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        self.budget.evict_locked()
+
+    def get(self, name):
+        """Loaded RAGHandler for name, or None (with the reason in message(name)) if it failed to load"""
+        dataset = self._acquire(name)
+        try:
+            return dataset.handler
+        finally:
+            self._release(dataset)
+
+    def message(self, name):
+        """Result of the last load of name"""
+        with self._lock:
+            dataset = self._datasets.get(name)
+        return dataset.message if dataset is not None else None
+
+    def query(self, query, datasets=None, k=5):
+        """
+        Query the named datasets (all registered ones by default) in parallel and
+        merge their contexts; see merge_results
+        """
+        with self._lock:
+            names = list(datasets) if datasets else list(self._datasets)
+        if not names:
+            return "No data loaded yet. Please upload a CSV or Excel file first."
+        if len(names) == 1:
+            return self._query_one(names[0], query, k)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(names))) as pool:
+            contexts = list(pool.map(lambda name: self._query_one(name, query, k), names))
+        return merge_results(list(zip(names, contexts)), k)
+
+    def _query_one(self, name, query, k):
+        try:
+            dataset = self._acquire(name)
+        except KeyError as e:
+            return str(e.args[0])
+        try:
+            if dataset.handler is None:
+                return dataset.message or f"Dataset '{name}' could not be loaded."
+            return dataset.handler.query_data(query, k=k)
+        except Exception as e:
+            return f"Error querying dataset '{name}': {e}"
+        finally:
+            self._release(dataset)
+
+    def remove(self, name):
+        with self._lock:
+            dataset = self._datasets.pop(name, None)
+            if dataset is not None:
+                self.budget.discard_locked(dataset)
+            if self.active == name:
+                self.active = None
+        if dataset is not None:
+            dataset.handler = None
+            self._discard_file(dataset)
+
+    def names(self):
+        with self._lock:
+            return list(self._datasets)
+
+    def stats(self):
+        """
+        Per-dataset residency and estimated size in MB, load and eviction counts, and the
+        MB used of the shared budget by every catalog on it
+        """
+        with self._lock:
+            return {
+                "datasets": {
+                    name: {
+                        "loaded": dataset.handler is not None,
+                        "size_mb": round(dataset.size_bytes / (1024 * 1024), 1),
+                        "refs": dataset.refs,
+                    }
+                    for name, dataset in self._datasets.items()
+                },
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "budget_used_mb": round(self.budget.resident_bytes_locked() / (1024 * 1024), 1),
+                "budget_mb": round(self.budget.memory_budget_bytes / (1024 * 1024), 1),
+            }
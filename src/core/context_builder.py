@@ -0,0 +1,162 @@
+# Context builder - pack retrieved material into a token budget for the prompt
+#
+# Retrieval returns a RetrievedContext: a plain string (so caching and display are
+# unchanged) that also carries its scored sections. The builder drops sections far less
+# relevant than the best one, removes duplicate rows and paragraphs, rewrites runs of
+# "Row i: col: value, ..." lines as one header plus value lines, and adds material in
+# relevance order until the budget is spent, never cutting a line in half.
+import os
+import re
+
+DEFAULT_CONTEXT_TOKENS = 600
+# Sections whose distance exceeds the best one by this factor (and by DISTANCE_MARGIN,
+# so an almost exact best match does not crowd out everything else) are dropped
+MAX_DISTANCE_RATIO = 1.6
+DISTANCE_MARGIN = 0.25
+# Rough tokens-per-character for models without a local tokenizer (API models)
+CHARS_PER_TOKEN = 4
+ROW_PATTERN = re.compile(r"^Row ([^:]+): (.*)$")
+
+
+class RetrievedContext(str):
+    """
+    Retrieval result usable as a plain string. sections is a list of
+    (text, distance) in relevance order, distance None for unscored material
+    (e.g. the dataset profile); columns names the dataset columns, in order.
+    A section from another dataset can carry its own columns as (text, distance, columns).
+    """
+
+    def __new__(cls, text, sections=(), columns=()):
+        context = super().__new__(cls, text)
+        context.sections = list(sections)
+        context.columns = list(columns)
+        return context
+
+
+def approximate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def tokenizer_counter(tokenizer):
+    """Token counting function for a Hugging Face tokenizer"""
+    def count(text):
+        return len(tokenizer.encode(text, add_special_tokens=False)) if text else 0
+    return count
+
+
+def parse_row(line, columns):
+    """(label, [values]) for a serialized row over columns, or None if line is not one"""
+    match = ROW_PATTERN.match(line)
+    if not match or not columns:
+        return None
+    label, rest = match.groups()
+    values = []
+    for position, column in enumerate(columns):
+        prefix = f"{column}: "
+        if not rest.startswith(prefix):
+            return None
+        rest = rest[len(prefix):]
+        if position + 1 < len(columns):
+            separator = f", {columns[position + 1]}: "
+            end = rest.find(separator)
+            if end == -1:
+                return None
+            values.append(rest[:end])
+            rest = rest[end + 2:]
+        else:
+            values.append(rest)
+    return label, values
+
+
+class ContextBuilder:
+    def __init__(self, count_tokens=None, budget_tokens=None, max_distance_ratio=MAX_DISTANCE_RATIO):
+        """
+        Fit context into budget_tokens (PIRHO_CONTEXT_TOKENS) as measured by count_tokens,
+        the active model's tokenizer where there is one
+        """
+        self.count_tokens = count_tokens or approximate_tokens
+        self.budget_tokens = budget_tokens or int(os.getenv("PIRHO_CONTEXT_TOKENS", DEFAULT_CONTEXT_TOKENS))
+        self.max_distance_ratio = max_distance_ratio
+
+    def _relevant(self, sections):
+        """Sections close enough to the best match; unscored sections are always kept"""
+        distances = [section[1] for section in sections if section[1] is not None]
+        if not distances:
+            return sections
+        best = min(distances)
+        limit = max(best * self.max_distance_ratio, best + DISTANCE_MARGIN)
+        return [section for section in sections if section[1] is None or section[1] <= limit]
+
+    def compact(self, text, columns, seen):
+        """
+        [(run, line)] for text with lines already in seen dropped. Rows are rewritten as
+        value lines; run is (run number, header) for consecutive rows sharing a header,
+        None for a plain line.
+        """
+        blocks = []
+        run = None
+        for line in text.split("\n"):
+            line = line.strip()
+            key = " ".join(line.split())
+            if not key:
+                run = None
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            parsed = parse_row(line, columns)
+            if parsed is None:
+                run = None
+                blocks.append((None, line))
+                continue
+            label, values = parsed
+            if run is None:
+                run = (len(blocks), "Rows (row | " + " | ".join(columns) + "):")
+            blocks.append((run, f"{label} | " + " | ".join(values)))
+        return blocks
+
+    def build(self, context):
+        """
+        Context text within the budget. Returns (text, stats) where stats has tokens,
+        sections, dropped (low score) and truncated (lines left out for space).
+        """
+        if not context:
+            return "", {"tokens": 0, "sections": 0, "dropped": 0, "truncated": 0}
+
+        sections = getattr(context, "sections", None) or [(str(context), None)]
+        columns = getattr(context, "columns", None) or []
+        relevant = self._relevant(sections)
+
+        seen = set()
+        lines = []
+        sections_used = 0
+        used = 0
+        truncated = 0
+        # Header of the row run the output currently ends in; rows from the next
+        # section continue under it instead of repeating it
+        header = None
+        for section in relevant:
+            started = False
+            section_columns = section[2] if len(section) > 2 else columns
+            for run, line in self.compact(section[0], section_columns, seen):
+                continues = run is not None and run[1] == header
+                block = [line] if continues else ([run[1], line] if run else [line])
+                if not started and lines and not continues:
+                    block.insert(0, "")
+                cost = self.count_tokens("\n".join(block)) + 1
+                if used + cost > self.budget_tokens:
+                    truncated += 1
+                    continue
+                lines.extend(block)
+                used += cost
+                header = run[1] if run else None
+                if not started:
+                    started = True
+                    sections_used += 1
+
+        return "\n".join(lines), {
+            "tokens": used,
+            "sections": sections_used,
+            "dropped": len(sections) - len(relevant),
+            "truncated": truncated,
+        }
@@ -0,0 +1,183 @@
+# CPU backends - int8 and ONNX Runtime variants of the local model for CPU-only machines
+#
+# "int8": float32 weights loaded, then every nn.Linear dynamically quantized to int8
+#         (weights stored int8, activations quantized per batch). Roughly a quarter of
+#         the linear-layer memory and faster matmuls on AVX2/AVX-512 VNNI CPUs.
+# "onnx": the model exported to ONNX and run through ONNX Runtime via optimum
+#         (pip install optimum[onnxruntime]), with an int8 dynamic-quantized graph when
+#         quantize=True.
+# Both are drop-in models for the transformers text-generation pipeline.
+import os
+import threading
+
+CPU_BACKENDS = ("int8", "onnx")
+DEFAULT_ONNX_CACHE_DIR = os.path.join(".cache", "onnx")
+
+# Short analytics prompts in the app's prompt format, used by the parity check
+PARITY_PROMPTS = [
+    "<|system|>\nYou are an AI assistant specialized in MSME business analytics.\n<|user|>\n"
+    "Data Context: Row 0: Date: 2025-01-01, Product: Laptop, Quantity: 2, Price: 1200.0, Customer: John Doe\n\n"
+    "Question: What was the revenue from this order?\n<|assistant|>\n",
+    "<|system|>\nYou are an AI assistant specialized in MSME business analytics.\n<|user|>\n"
+    "Summarize in one sentence: laptops sold 40 units, mice 120 units, monitors 15 units.\n<|assistant|>\n",
+    "<|system|>\nYou are an AI assistant specialized in MSME business analytics. Respond in Hindi using simple language.\n"
+    "<|user|>\nWhich product sold the most units: laptops (40) or mice (120)?\n<|assistant|>\n",
+]
+MIN_TOP1_AGREEMENT = 0.9
+
+
+_configured_threads = None
+_threads_lock = threading.Lock()
+
+
+def cpu_cores():
+    """CPUs this process may run on (its affinity mask where the OS has one)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def configure_cpu_threads(threads=None):
+    """
+    Set torch's intra-op thread count: PIRHO_CPU_THREADS, by default every available CPU.
+    The LLM generates one token at a time and uses them all; embedding builds divide the
+    same cores between their workers (see embedding.default_workers). torch's setting is
+    process-wide, so it is applied once, before the first model loads; later calls
+    return it unchanged unless threads is given explicitly.
+    """
+    global _configured_threads
+    import torch
+
+    with _threads_lock:
+        if threads is None:
+            if _configured_threads is not None:
+                return _configured_threads
+            threads = int(os.getenv("PIRHO_CPU_THREADS", "0")) or cpu_cores()
+        torch.set_num_threads(threads)
+        _configured_threads = threads
+        return threads
+
+
+def quantize_int8(model):
+    """Dynamically quantize every nn.Linear of a float32 model to int8, in place"""
+    import torch
+
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_int8_model(model_name):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    # low_cpu_mem_usage avoids holding a second float32 copy while loading
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        trust_remote_code=True,
+        attn_implementation="eager",
+        torch_dtype=torch.float32,
+        low_cpu_mem_usage=True
+    )
+    return quantize_int8(model)
+
+
+def load_onnx_model(model_name, cache_dir=None, quantize=True):
+    """
+    ONNX Runtime model for model_name, exported once and reused from cache_dir.
+    Raises ImportError when optimum[onnxruntime] is not installed.
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    cache_dir = cache_dir or os.getenv("PIRHO_ONNX_CACHE_DIR", DEFAULT_ONNX_CACHE_DIR)
+    export_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+    quantized_dir = export_dir + "-int8"
+
+    if quantize and os.path.exists(os.path.join(quantized_dir, "model_quantized.onnx")):
+        return ORTModelForCausalLM.from_pretrained(quantized_dir, file_name="model_quantized.onnx")
+
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model = ORTModelForCausalLM.from_pretrained(export_dir)
+    else:
+        model = ORTModelForCausalLM.from_pretrained(model_name, export=True, trust_remote_code=True)
+        model.save_pretrained(export_dir)
+
+    if not quantize:
+        return model
+
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+    # avx2 is the common denominator for x86 servers; VNNI CPUs still benefit
+    quantizer.quantize(save_dir=quantized_dir, quantization_config=AutoQuantizationConfig.avx2(is_static=False))
+    return ORTModelForCausalLM.from_pretrained(quantized_dir, file_name="model_quantized.onnx")
+
+
+def load_cpu_model(model_name, backend="int8"):
+    """Return (tokenizer, model) for a CPU backend"""
+    from transformers import AutoTokenizer
+
+    if backend not in CPU_BACKENDS:
+        raise ValueError(f"Unknown CPU backend: {backend}. Use one of {', '.join(CPU_BACKENDS)}.")
+
+    configure_cpu_threads()
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "onnx":
+        model = load_onnx_model(model_name)
+    else:
+        model = load_int8_model(model_name)
+    return tokenizer, model
+
+
+def _next_token_logits(model, input_ids):
+    import torch
+
+    with torch.no_grad():
+        return model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids)).logits[0]
+
+
+def parity_check(reference, candidate, tokenizer, prompts=None, max_new_tokens=32):
+    """
+    Compare a candidate model against the float32 reference on greedy continuations.
+    The reference's greedy tokens are fed to both models (teacher forcing) and, at each
+    generated position, top-1 agreement and KL(reference || candidate) are measured.
+    Returns a dict with top1_agreement, mean_kl, positions and passed.
+    """
+    import torch
+
+    agree = 0
+    positions = 0
+    kl_total = 0.0
+    for prompt in prompts or PARITY_PROMPTS:
+        input_ids = tokenizer(prompt, return_tensors="pt").input_ids
+        with torch.no_grad():
+            sequence = reference.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id
+            )
+        prompt_length = input_ids.shape[1]
+        generated = sequence.shape[1] - prompt_length
+        if generated <= 0:
+            continue
+
+        # Logits at position i predict token i + 1
+        span = slice(prompt_length - 1, sequence.shape[1] - 1)
+        expected = _next_token_logits(reference, sequence)[span].float()
+        actual = _next_token_logits(candidate, sequence)[span].float()
+
+        agree += int((expected.argmax(-1) == actual.argmax(-1)).sum())
+        log_p = torch.log_softmax(expected, -1)
+        log_q = torch.log_softmax(actual, -1)
+        kl_total += float((log_p.exp() * (log_p - log_q)).sum(-1).sum())
+        positions += generated
+
+    top1 = agree / positions if positions else 0.0
+    return {
+        "top1_agreement": top1,
+        "mean_kl": kl_total / positions if positions else 0.0,
+        "positions": positions,
+        "passed": positions > 0 and top1 >= MIN_TOP1_AGREEMENT,
+    }
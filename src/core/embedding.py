@@ -0,0 +1,162 @@
+# Embedding pipeline - batched, multi-core document embedding into FAISS
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from src.core import vector_index
+from src.core.cpu_backend import cpu_cores
+from src.utils import tracing
+
+
+def row_document_id(row_index):
+    """Vector store id of the document for one dataframe row"""
+    return f"row-{row_index}"
+
+
+def document_id(document):
+    """Stable vector store id for a row or summary document"""
+    metadata = document.metadata
+    if "doc_id" in metadata:
+        return metadata["doc_id"]
+    if metadata.get("type") == "data":
+        return row_document_id(metadata["row_index"])
+    return metadata.get("type", "document")
+
+
+def default_workers():
+    """
+    Embedding threads (PIRHO_EMBEDDING_WORKERS). Each worker's batch runs on torch's
+    intra-op pool, so workers and torch threads split the cores: by default
+    cores // torch threads, which is one worker using every core unless PIRHO_CPU_THREADS
+    gives torch fewer (PIRHO_CPU_THREADS=4 on 16 cores runs 4 batches at once).
+    """
+    workers = int(os.getenv("PIRHO_EMBEDDING_WORKERS", "0"))
+    if workers:
+        return workers
+    torch = sys.modules.get("torch")
+    threads = torch.get_num_threads() if torch is not None else 1
+    return max(1, cpu_cores() // threads)
+
+
+def rebatch(document_batches, batch_size):
+    """Regroup an iterable of document lists into lists of exactly batch_size (last may be short)"""
+    pending = []
+    for documents in document_batches:
+        pending.extend(documents)
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+
+class EmbeddingPipeline:
+    def __init__(self, embedding_model, batch_size=256, max_workers=None, progress_callback=None,
+                 index_strategy="flat", expected_rows=None):
+        """
+        Embed documents in fixed-size batches on a worker pool and add each batch
+        to the vector store as soon as it finishes.
+        progress_callback(done, total) is called after every batch; total may be None.
+        index_strategy (see vector_index) sets the FAISS index a new store is built on;
+        trained strategies hold back vectors until there are enough to train on,
+        sized for expected_rows.
+        """
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.max_workers = max_workers or default_workers()
+        self.progress_callback = progress_callback
+        self.index_strategy = index_strategy
+        self.expected_rows = expected_rows
+        # (documents, vectors) embedded before the index could be created and trained
+        self._pending = []
+        self._pending_count = 0
+        self._training_target = None
+
+    def _embed(self, documents):
+        texts = [doc.page_content for doc in documents]
+        return documents, self.embedding_model.embed_documents(texts)
+
+    def _add(self, vectorstore, documents, vectors):
+        from langchain.vectorstores import FAISS
+
+        if vectorstore is None and self.index_strategy != "flat":
+            self._pending.append((documents, vectors))
+            self._pending_count += len(documents)
+            if self._training_target is None:
+                # Without a row estimate everything is held until the end of the build
+                rows = self.expected_rows
+                index = vector_index.create_index(self.index_strategy, len(vectors[0]), rows or 0)
+                self._training_target = vector_index.training_size(index, rows) if rows else float("inf")
+            if self._pending_count < self._training_target:
+                return None
+            return self._flush_pending()
+
+        text_embeddings = [(doc.page_content, vector) for doc, vector in zip(documents, vectors)]
+        metadatas = [doc.metadata for doc in documents]
+        ids = [document_id(doc) for doc in documents]
+
+        if vectorstore is None:
+            return FAISS.from_embeddings(text_embeddings, self.embedding_model, metadatas=metadatas, ids=ids)
+        vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        return vectorstore
+
+    def _flush_pending(self):
+        """Train a new index on the held-back vectors and wrap it in a store holding them"""
+        from langchain.docstore.in_memory import InMemoryDocstore
+        from langchain.vectorstores import FAISS
+
+        pending, self._pending, self._pending_count = self._pending, [], 0
+        sample = np.asarray([vector for _, vectors in pending for vector in vectors], dtype=np.float32)
+        rows = max(self.expected_rows or 0, len(sample))
+        index = vector_index.create_index(self.index_strategy, sample.shape[1], rows)
+        if len(sample) < vector_index.min_training_size(index):
+            # Too few rows to train centroids (e.g. a row estimate that was far too high)
+            print(f"Warning: {len(sample)} vectors are too few to train a {self.index_strategy} index; using flat")
+            index = vector_index.create_index("flat", sample.shape[1], len(sample))
+        vector_index.train_index(index, sample)
+
+        vectorstore = FAISS(self.embedding_model, index, InMemoryDocstore(), {})
+        for documents, vectors in pending:
+            vectorstore = self._add(vectorstore, documents, vectors)
+        return vectorstore
+
+    @tracing.traced("embedding.build")
+    def build(self, document_batches, vectorstore=None, total=None):
+        """
+        Embed every document from document_batches into vectorstore (created if None).
+        Returns (vectorstore, number_of_documents).
+        """
+        done = 0
+        in_flight = set()
+        self._pending, self._pending_count, self._training_target = [], 0, None
+        # Bound queued work so memory scales with batch_size * workers, not the dataset
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch in rebatch(document_batches, self.batch_size):
+                in_flight.add(executor.submit(self._embed, batch))
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        vectorstore, done = self._collect(future, vectorstore, done, total)
+
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    vectorstore, done = self._collect(future, vectorstore, done, total)
+
+        if self._pending:
+            vectorstore = self._flush_pending()
+
+        tracing.current_span().set(documents=done, batch_size=self.batch_size, workers=self.max_workers,
+                                   index=vector_index.strategy_of(vectorstore.index) if vectorstore else None)
+        return vectorstore, done
+
+    def _collect(self, future, vectorstore, done, total):
+        documents, vectors = future.result()
+        vectorstore = self._add(vectorstore, documents, vectors)
+        done += len(documents)
+        if self.progress_callback:
+            self.progress_callback(done, total)
+        return vectorstore, done
+
@@ -0,0 +1,171 @@
+# Hierarchical documents - rows packed into chunks per group, with one summary per group
+#
+# Rows are grouped by a meaningful key (a categorical column such as product or customer,
+# else a date window, else fixed row ranges), serialized, and packed into chunk-sized
+# documents by the text splitter. Each group also gets a summary document. Retrieval goes
+# top-down: the closest group summaries first, then the closest chunks of those groups.
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_GROUPS = 200
+ROW_WINDOW = 500
+SUMMARY_TOP_VALUES = 3
+# Object columns parsed as dates when at least this fraction of a sample parses
+DATE_PARSE_FRACTION = 0.9
+
+
+def _is_text(values):
+    return pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype)
+
+
+def _as_dates(values):
+    """values as datetimes if the column holds dates, else None"""
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    if not _is_text(values):
+        return None
+    sample = values.dropna().head(200)
+    if sample.empty:
+        return None
+    parsed = pd.to_datetime(sample, errors="coerce", format="mixed")
+    if parsed.notna().mean() < DATE_PARSE_FRACTION:
+        return None
+    return pd.to_datetime(values, errors="coerce", format="mixed")
+
+
+def choose_group_key(df, max_groups=DEFAULT_MAX_GROUPS):
+    """
+    (column, kind) to group rows by: the categorical column with the most distinct
+    values up to max_groups ("category"), else a date column ("date"), else (None, "window")
+    """
+    best, best_count = None, 0
+    for col in df.columns:
+        values = df[col]
+        if not (_is_text(values) or isinstance(values.dtype, pd.CategoricalDtype)):
+            continue
+        if _as_dates(values) is not None:
+            continue
+        count = values.nunique(dropna=True)
+        # A useful group has several rows on average
+        if 2 <= count <= max_groups and count * 2 <= len(df) and count > best_count:
+            best, best_count = col, count
+    if best is not None:
+        return best, "category"
+
+    for col in df.columns:
+        if _as_dates(df[col]) is not None:
+            return col, "date"
+    return None, "window"
+
+
+def date_frequency(dates):
+    """Window for date grouping: weeks for short spans, months, quarters for long ones"""
+    dates = dates.dropna()
+    if dates.empty:
+        return "M"
+    span_days = (dates.max() - dates.min()).days
+    if span_days <= 62:
+        return "W"
+    if span_days > 3 * 365:
+        return "Q"
+    return "M"
+
+
+def resolve_group_key(df, column=None, max_groups=DEFAULT_MAX_GROUPS):
+    """(column, kind, freq) for grouping df, by the given column or chosen automatically"""
+    if column is None:
+        column, kind = choose_group_key(df, max_groups)
+    elif column not in df.columns:
+        raise ValueError(f"Cannot group by '{column}': no such column")
+    else:
+        kind = "date" if _as_dates(df[column]) is not None else "category"
+    freq = date_frequency(_as_dates(df[column])) if kind == "date" else None
+    return column, kind, freq
+
+
+def group_labels(df, column, kind, freq=None, offset=0):
+    """
+    Label per row naming its group. offset is the position of df's first row
+    in the whole dataset, so row windows line up across streamed chunks.
+    """
+    if kind == "category":
+        return df[column].astype(object).where(df[column].notna(), "(missing)").astype(str)
+    if kind == "date":
+        dates = _as_dates(df[column])
+        periods = dates.dt.tz_localize(None) if getattr(dates.dt, "tz", None) is not None else dates
+        labels = periods.dt.to_period(freq or date_frequency(dates)).astype(str)
+        return labels.where(dates.notna(), "(missing)")
+    starts = (offset + np.arange(len(df))) // ROW_WINDOW * ROW_WINDOW
+    return pd.Series([f"rows {start}-{start + ROW_WINDOW - 1}" for start in starts], index=df.index)
+
+
+def group_title(column, kind, label):
+    if kind == "window":
+        return f"Rows {label[5:]}"
+    return f"{column} = {label}"
+
+
+def date_columns(df):
+    """Columns of df holding dates (datetime dtype or parseable text)"""
+    return [col for col in df.columns if _as_dates(df[col]) is not None]
+
+
+def summarize_group(title, rows, dates=()):
+    """
+    Summary text for one group: size, numeric totals and ranges, date spans for the
+    dates columns, and the most common values of the rest
+    """
+    lines = [f"Group {title}: {len(rows)} rows"]
+    for col in rows.columns:
+        values = rows[col]
+        if col in dates:
+            parsed = _as_dates(values)
+            parsed = parsed.dropna() if parsed is not None else parsed
+            if parsed is not None and not parsed.empty:
+                lines.append(f"- {col}: from {parsed.min()} to {parsed.max()}")
+        elif pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            present = values.dropna()
+            if present.empty:
+                continue
+            lines.append(
+                f"- {col}: total {present.sum():g}, mean {present.mean():g}, "
+                f"min {present.min():g}, max {present.max():g}"
+            )
+        else:
+            counts = values.astype(str).value_counts().head(SUMMARY_TOP_VALUES)
+            if len(counts):
+                lines.append(f"- {col}: " + ", ".join(f"{value} ({count})" for value, count in counts.items()))
+    return "\n".join(lines)
+
+
+class Hierarchy:
+    def __init__(self, summary_positions, chunk_positions):
+        """
+        Index positions of group summaries, and of each group's chunks, in a vector store
+        built from grouped documents
+        """
+        self.summary_positions = summary_positions
+        self.chunk_positions = chunk_positions
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Recover the group structure from document metadata, or None for a per-row store"""
+        has_groups = False
+        summary_positions = []
+        chunk_positions = {}
+        for position, doc_id in vectorstore.index_to_docstore_id.items():
+            metadata = vectorstore.docstore.search(doc_id).metadata
+            doc_type = metadata.get("type")
+            # The dataset summary competes with the group summaries at the top level
+            if doc_type in ("group_summary", "summary"):
+                summary_positions.append(position)
+                has_groups = has_groups or doc_type == "group_summary"
+            elif doc_type == "chunk":
+                chunk_positions.setdefault(metadata["group"], []).append(position)
+        if not has_groups:
+            return None
+        return cls(summary_positions, chunk_positions)
+
+    @property
+    def groups(self):
+        return len(self.chunk_positions)
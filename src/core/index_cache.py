@@ -0,0 +1,185 @@
+# Persistent FAISS index cache keyed by dataset contents
+#
+# Trust: a saved store's docstore is a pickle, so loading one can run code. Entries are
+# only loaded from the app's own cache directory, when owned by the current user and
+# when their metadata names the key being looked up; anyone who can write to that
+# directory can still run code as the app, so keep it private.
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "faiss")
+DEFAULT_MAX_CACHE_MB = 1024
+METADATA_FILE = "cache_meta.json"
+# Bump when the text or metadata of indexed documents (rows, summaries, groups) changes,
+# so indexes built with the old format are not reused
+INDEX_FORMAT_VERSION = "2"
+
+
+def dataframe_fingerprint(df):
+    """Hash a dataframe's columns, dtypes and values into a stable hex digest"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode("utf-8"))
+    digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode("utf-8"))
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        # Unhashable cells (lists, dicts); fall back to their string form
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=True)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path, block_size=1024 * 1024):
+    """Hash a file's bytes without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexCache:
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        """
+        On-disk cache of saved FAISS stores, one directory per key.
+        Least recently used entries are evicted once the cache exceeds max_size_mb.
+        """
+        self.cache_dir = os.path.realpath(cache_dir or os.getenv("PIRHO_INDEX_CACHE_DIR", DEFAULT_CACHE_DIR))
+        if max_size_mb is None:
+            max_size_mb = float(os.getenv("PIRHO_INDEX_CACHE_MB", DEFAULT_MAX_CACHE_MB))
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+    def make_key(self, fingerprint, model_name, **params):
+        """
+        Build a cache key from a content fingerprint (see dataframe_fingerprint and
+        file_fingerprint), the document format, the embedding model and chunking parameters
+        """
+        digest = hashlib.sha256()
+        digest.update(fingerprint.encode("utf-8"))
+        digest.update(INDEX_FORMAT_VERSION.encode("utf-8"))
+        digest.update(model_name.encode("utf-8"))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, embedding_model):
+        """Reopen a cached vector store, or return None on a miss"""
+        path = self._entry_path(key)
+        if not self._trusted(path, key):
+            return None
+
+        from langchain.vectorstores import FAISS
+
+        try:
+            # Unpickles the docstore; _trusted checked the entry is this app's own
+            vectorstore = FAISS.load_local(path, embedding_model, allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable index cache entry {key}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        self._touch(path)
+        return vectorstore
+
+    def save(self, key, vectorstore, **info):
+        """Persist a vector store under key, then evict old entries over the size budget"""
+        # Private to this user: entries are unpickled on load
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        path = self._entry_path(key)
+        staging = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+
+        try:
+            vectorstore.save_local(staging)
+            with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                json.dump({"key": key, "created": time.time(), "last_used": time.time(), **info}, f, default=str)
+
+            # Publish atomically so concurrent readers never see a half-written entry
+            if os.path.exists(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+        except OSError as e:
+            print(f"Warning: Could not write index cache entry {key}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        self.evict(keep=key)
+
+    def _trusted(self, path, key):
+        """Whether path is an entry this app saved under key, inside the cache directory and owned by this user"""
+        meta_path = os.path.join(path, METADATA_FILE)
+        if os.path.dirname(os.path.realpath(path)) != self.cache_dir or not os.path.isfile(meta_path):
+            return False
+        try:
+            if hasattr(os, "getuid") and any(os.stat(item).st_uid != os.getuid() for item in (path, meta_path)):
+                print(f"Warning: Ignoring index cache entry {key} not owned by this user")
+                return False
+            with open(meta_path) as f:
+                return json.load(f).get("key") == key
+        except (OSError, ValueError):
+            return False
+
+    def _touch(self, path):
+        meta_path = os.path.join(path, METADATA_FILE)
+        staging = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta["last_used"] = time.time()
+            # Replaced whole so a concurrent reader never sees a half-written file
+            with open(staging, "w") as f:
+                json.dump(meta, f, default=str)
+            os.replace(staging, meta_path)
+        except (OSError, ValueError):
+            try:
+                os.remove(staging)
+            except OSError:
+                pass
+
+    def _entries(self):
+        """List (last_used, size_bytes, path) for every complete cache entry"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(path, METADATA_FILE)
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            try:
+                with open(meta_path) as f:
+                    last_used = json.load(f).get("last_used", 0)
+            except (OSError, ValueError):
+                last_used = 0
+            size = sum(
+                os.path.getsize(os.path.join(root, file))
+                for root, _, files in os.walk(path)
+                for file in files
+            )
+            entries.append((last_used, size, path))
+        return entries
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        keep_path = self._entry_path(keep) if keep else None
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Delete every cache entry"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,274 @@
+# Lexical index - BM25 over row values plus exact per-column value lookup
+#
+# Built at load time beside the vector store, from the cell values of every row (column
+# names are left out; they occur in every row). Postings are kept as flat numpy arrays
+# sorted by token, so a query scores only the rows containing its tokens. Column values
+# that pick out at most MAX_ENTITY_ROWS rows (names, SKUs, invoice numbers) are also kept,
+# as sorted 64-bit hashes per column: a question naming one resolves to its rows by
+# binary search, without embedding the question. Only text columns hold entities: a number
+# or year in a question is left to the analytics and vector paths. Float and boolean
+# columns are not indexed at all.
+# reciprocal_rank_fusion merges BM25 and vector rankings for everything else.
+import hashlib
+import importlib.util
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Tokens are lower-cased runs between whitespace and ASCII punctuation, so names in any
+# script survive; the same pattern runs in Python and in Arrow's RE2
+SEPARATOR_PATTERN = r"[\s!-/:-@\[-`{-~]+"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Values naming more rows than this are categories, not entities
+MAX_ENTITY_ROWS = 20
+# Longest value, in tokens, matched against a question
+MAX_VALUE_TOKENS = 6
+# Shorter matches ("5", "a") are too likely to be incidental words or numbers
+MIN_ENTITY_CHARS = 3
+# Tokens in more than this fraction of rows barely change BM25 ranks; skipped for speed
+MAX_POSTING_FRACTION = 0.5
+RRF_K = 60
+
+_SEPARATOR_RE = re.compile(SEPARATOR_PATTERN)
+
+
+def lexical_index_enabled():
+    return os.getenv("PIRHO_LEXICAL_INDEX", "1").lower() not in ("0", "false", "no")
+
+
+def tokenize(text):
+    return [token for token in _SEPARATOR_RE.split(str(text).lower()) if token]
+
+
+def normalize_value(value):
+    """Lookup key for a cell value: its tokens joined by single spaces"""
+    return " ".join(tokenize(value))
+
+
+def _key_hashes(keys):
+    """64-bit hashes of value keys; cheap enough per question to keep lookups in microseconds"""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") for key in keys),
+        dtype=np.uint64, count=len(keys)
+    )
+
+
+def _tokenize_values(values):
+    """
+    (tokens per value, all tokens in order, value keys) for an array of distinct values,
+    computed in Arrow when pyarrow is installed
+    """
+    if not ARROW_AVAILABLE:
+        token_lists = [tokenize(value) for value in values]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        tokens = [token for value_tokens in token_lists for token in value_tokens]
+        return lengths, tokens, [" ".join(value_tokens) for value_tokens in token_lists]
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    text = pa.array(pd.Series(values, dtype=object).astype(str).to_numpy(dtype=object), type=pa.string())
+    keys = pc.utf8_trim(pc.replace_substring_regex(pc.utf8_lower(text), SEPARATOR_PATTERN, " "), " ")
+    lists = pc.split_pattern(keys, " ")
+    tokens = pc.list_flatten(lists)
+    parents = pc.list_parent_indices(lists).to_numpy()
+    # An empty value splits into one empty token
+    kept = (pc.utf8_length(tokens).to_numpy() > 0)
+    lengths = np.bincount(parents[kept], minlength=len(values)).astype(np.int64)
+    return lengths, tokens.filter(pa.array(kept)), keys.to_numpy(zero_copy_only=False)
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Keys of several best-first rankings, ordered by summed 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex:
+    def __init__(self):
+        """Build with add() per dataframe (or streamed chunk), then finish() before searching"""
+        self.rows = 0
+        self._vocab = {}
+        # Per added chunk: token ids and row positions of every token occurrence
+        self._token_parts = []
+        self._row_parts = []
+        # column -> [(value key hashes, row positions)] per chunk, then sorted arrays after finish()
+        self._value_parts = {}
+        self._values = {}
+        self._offsets = None
+        self._postings = None
+        self._frequencies = None
+        self._lengths = None
+        self._average_length = 0.0
+
+    def add(self, df, offset=None):
+        """Index a dataframe chunk whose first row is at position offset (default: after the last)"""
+        offset = self.rows if offset is None else offset
+        for col in df.columns:
+            values = df[col]
+            if pd.api.types.is_float_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+                # Measurements and flags are not asked for by their digits
+                continue
+            # Each distinct value is tokenized once; rows then refer to it by code
+            codes, uniques = pd.factorize(values)
+            lengths, tokens, keys = _tokenize_values(uniques)
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+            flat = self._token_ids(tokens)
+
+            present = np.flatnonzero(codes >= 0)
+            row_codes = codes[present]
+            row_lengths = lengths[row_codes]
+            total = int(row_lengths.sum())
+            if total:
+                # Position of every token occurrence in flat: its value's start plus its index within the value
+                first = np.repeat(starts[row_codes] - (np.cumsum(row_lengths) - row_lengths), row_lengths)
+                self._token_parts.append(flat[first + np.arange(total)])
+                self._row_parts.append(np.repeat(present + offset, row_lengths))
+
+            if pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+                keys = _key_hashes(keys)
+                named = row_lengths > 0
+                self._value_parts.setdefault(col, []).append((keys[row_codes[named]], present[named] + offset))
+        self.rows = max(self.rows, offset + len(df))
+        return self
+
+    def _token_ids(self, tokens):
+        """Vocabulary ids of a token sequence, adding new tokens to the vocabulary"""
+        vocab = self._vocab
+        if ARROW_AVAILABLE and not isinstance(tokens, list):
+            import pyarrow.compute as pc
+
+            # Only distinct tokens go through the Python dictionary
+            encoded = pc.dictionary_encode(tokens)
+            distinct = np.fromiter((vocab.setdefault(token, len(vocab)) for token in encoded.dictionary.to_pylist()),
+                                   dtype=np.int32, count=len(encoded.dictionary))
+            return distinct[encoded.indices.to_numpy()] if len(tokens) else np.empty(0, np.int32)
+        return np.fromiter((vocab.setdefault(token, len(vocab)) for token in tokens), dtype=np.int32, count=len(tokens))
+
+    def finish(self):
+        """Merge the added chunks into searchable postings and value arrays"""
+        tokens = np.concatenate(self._token_parts) if self._token_parts else np.empty(0, np.int32)
+        rows = np.concatenate(self._row_parts) if self._row_parts else np.empty(0, np.int64)
+        self._token_parts, self._row_parts = [], []
+
+        self._lengths = np.bincount(rows, minlength=self.rows).astype(np.float32)
+        self._average_length = float(self._lengths.mean()) if self.rows else 0.0
+
+        # One posting per (token, row), with the token's count in that row
+        order = np.lexsort((rows, tokens))
+        tokens, rows = tokens[order], rows[order]
+        starts = np.flatnonzero(np.concatenate(([True], (tokens[1:] != tokens[:-1]) | (rows[1:] != rows[:-1]))))
+        self._frequencies = np.diff(np.append(starts, len(tokens))).astype(np.float32)
+        tokens, self._postings = tokens[starts], rows[starts].astype(np.int32 if self.rows < 2 ** 31 else np.int64)
+        self._offsets = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(np.bincount(tokens, minlength=len(self._vocab)))
+
+        for col, parts in self._value_parts.items():
+            keys = np.concatenate([keys for keys, _ in parts])
+            positions = np.concatenate([positions for _, positions in parts])
+            order = np.argsort(keys, kind="stable")
+            keys, positions = keys[order], positions[order]
+            _, counts = np.unique(keys, return_counts=True)
+            selective = np.repeat(counts <= MAX_ENTITY_ROWS, counts)
+            self._values[col] = (keys[selective], positions[selective])
+        self._value_parts = {}
+        return self
+
+    def search(self, query, k=10):
+        """(row positions, BM25 scores) of the k best rows for query, best first"""
+        ids = set()
+        for token in tokenize(query):
+            # Plural question words ("monitors") find singular values
+            for form in (token, token[:-1] if token.endswith("s") else None, token[:-2] if token.endswith("es") else None):
+                if form and form in self._vocab:
+                    ids.add(self._vocab[form])
+                    break
+        postings, scores = [], []
+        for token_id in ids:
+            start, end = self._offsets[token_id], self._offsets[token_id + 1]
+            count = end - start
+            if count == 0 or count > MAX_POSTING_FRACTION * self.rows:
+                continue
+            rows = self._postings[start:end]
+            frequencies = self._frequencies[start:end]
+            idf = math.log(1 + (self.rows - count + 0.5) / (count + 0.5))
+            norm = frequencies + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[rows] / self._average_length)
+            postings.append(rows)
+            scores.append(idf * frequencies * (BM25_K1 + 1) / norm)
+        if not postings:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows, scores = np.concatenate(postings), np.concatenate(scores)
+        if len(postings) > 1:
+            rows, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return rows[top].astype(np.int64), scores[top]
+
+    def lookup(self, value, column=None):
+        """Row positions whose column (any column by default) equals value, for selective values"""
+        hashed = _key_hashes([normalize_value(value)])
+        columns = [column] if column is not None else list(self._values)
+        found = [self._positions(col, hashed)[0] for col in columns if col in self._values]
+        found = [positions for positions in found if len(positions)]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _positions(self, column, hashed):
+        """Row positions of each key hash in column"""
+        keys, positions = self._values[column]
+        starts = np.searchsorted(keys, hashed, side="left")
+        ends = np.searchsorted(keys, hashed, side="right")
+        return [positions[start:end] if end > start else () for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def match_entities(self, query):
+        """
+        [(column, value, row positions)] for selective column values named in query,
+        longest first; the words of one match are not reused by a shorter one
+        """
+        tokens = tokenize(query)
+        spans = [
+            (start, size, " ".join(tokens[start:start + size]))
+            for size in range(min(MAX_VALUE_TOKENS, len(tokens)), 0, -1)
+            for start in range(len(tokens) - size + 1)
+        ]
+        spans = [span for span in spans if len(span[2]) >= MIN_ENTITY_CHARS]
+        if not spans or not self._values:
+            return []
+        # Every candidate is hashed and searched at once, per column
+        hashed = _key_hashes([key for _, _, key in spans])
+        found = {col: self._positions(col, hashed) for col in self._values}
+
+        used = [False] * len(tokens)
+        matches = []
+        for number, (start, size, key) in enumerate(spans):
+            if any(used[start:start + size]):
+                continue
+            hits = [(col, key, found[col][number]) for col in self._values if len(found[col][number])]
+            if hits:
+                used[start:start + size] = [True] * size
+                matches.extend(hits)
+        return matches
+
+    def memory_bytes(self):
+        """Approximate resident size of the finished index"""
+        size = sum(array.nbytes for array in (self._offsets, self._postings, self._frequencies, self._lengths)
+                   if array is not None)
+        size += sum(len(token) + 80 for token in self._vocab)
+        for keys, positions in self._values.values():
+            size += positions.nbytes + keys.nbytes
+        return size
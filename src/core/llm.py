@@ -1,30 +1,280 @@
 # LLM module - Phi-4 mini or Grok-4 for MSME analytics (browser-compatible design)
-from langchain_huggingface import HuggingFacePipeline
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, BitsAndBytesConfig
-from openai import OpenAI
+# torch, transformers, langchain and openai are imported on first use so that the
+# UI starts quickly and API-only mode never pays for the local model stack.
+import asyncio
 import os
-import torch
+import queue
+import threading
+import time
+from src.core.context_builder import ContextBuilder, approximate_tokens, tokenizer_counter
+from src.core.prefix_cache import PrefixCache, prefix_cache_enabled, split_prompt, supports_prefix_cache
+from src.core.response_cache import get_response_cache
+from src.utils import tracing
+
+MAX_NEW_TOKENS = 256
+MAX_RESPONSE_CHARS = 500
+ASSISTANT_MARKER = "<|assistant|>"
+API_MODEL = "grok-beta"  # Fast model
+SYSTEM_PROMPT = "You are an AI assistant specialized in MSME business analytics. Provide concise, accurate insights from the data. Use bullet points for lists and keep responses under 200 words."
+HINDI_INSTRUCTION = " Respond in Hindi using simple language."
+# Phi-4 variants that run on an optimized CPU backend (see src/core/cpu_backend.py)
+CPU_MODEL_CHOICES = {"phi4-int8": "int8", "phi4-onnx": "onnx"}
+# Local generation scheduling, shared by every session using the same handler
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_BATCH_WINDOW_MS = 25
+DEFAULT_MAX_PENDING = 32
+DEFAULT_GENERATION_WORKERS = 1
+SUBMIT_TIMEOUT_SECONDS = 10
+
+
+def clean_stream(pieces, max_chars=MAX_RESPONSE_CHARS, marker=ASSISTANT_MARKER):
+    """
+    Apply generate_response's cleanup to streamed text: strip leading whitespace,
+    stop at a repeated assistant marker and cap the total length.
+    A marker split across pieces is caught by holding back a short tail.
+    """
+    buffer = ""
+    emitted = 0
+    started = False
+    for piece in pieces:
+        buffer += piece
+        if not started:
+            buffer = buffer.lstrip()
+            started = bool(buffer)
+
+        cut = buffer.find(marker)
+        finished = cut != -1
+        if finished:
+            buffer = buffer[:cut].rstrip()
+            ready = len(buffer)
+        else:
+            # Hold back trailing whitespace and anything that could be the start of a marker
+            ready = len(buffer[:max(0, len(buffer) - (len(marker) - 1))].rstrip())
+
+        ready = min(ready, max_chars - emitted)
+        if ready > 0:
+            yield buffer[:ready]
+            emitted += ready
+            buffer = buffer[ready:]
+        if finished or emitted >= max_chars:
+            return
+
+    tail = buffer.rstrip()[:max_chars - emitted]
+    if tail:
+        yield tail
+
+
+class GenerationQueueFull(RuntimeError):
+    pass
+
+
+class GenerationRequest:
+    _DONE = object()
+
+    def __init__(self, prompt):
+        """One queued prompt; iterate it for text pieces or call result() for the whole text"""
+        self.prompt = prompt
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.batch_size = None
+        self._pieces = queue.Queue()
+        self._finished = False
+
+    def put(self, text):
+        if text:
+            self._pieces.put(text)
+
+    def finish(self, error=None):
+        if not self._finished:
+            self._finished = True
+            self._pieces.put(error if error is not None else self._DONE)
+
+    def __iter__(self):
+        while True:
+            item = self._pieces.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def result(self):
+        return "".join(self)
+
+    @property
+    def queue_ms(self):
+        return (self.started_at - self.submitted_at) * 1000 if self.started_at else None
+
+
+class GenerationScheduler:
+    def __init__(self, run_batch, max_batch_size=None, batch_window_ms=None, max_pending=None, workers=None):
+        """
+        Queue prompts from concurrent callers and run them through run_batch(requests)
+        in groups: after the first prompt arrives, others arriving within batch_window_ms
+        join the same batch (up to max_batch_size). workers caps how many batches run at
+        once; beyond max_pending queued prompts, submit() raises GenerationQueueFull.
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size or int(os.getenv("PIRHO_GENERATION_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE))
+        window_ms = batch_window_ms if batch_window_ms is not None else float(
+            os.getenv("PIRHO_GENERATION_BATCH_WINDOW_MS", DEFAULT_BATCH_WINDOW_MS))
+        self.batch_window = window_ms / 1000
+        self.workers = workers or int(os.getenv("PIRHO_GENERATION_WORKERS", DEFAULT_GENERATION_WORKERS))
+        self._queue = queue.Queue(maxsize=max_pending or int(os.getenv("PIRHO_GENERATION_QUEUE_SIZE", DEFAULT_MAX_PENDING)))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def submit(self, prompt, timeout=SUBMIT_TIMEOUT_SECONDS):
+        """Queue a prompt and return its GenerationRequest; waits up to timeout for room"""
+        self._start_workers()
+        request = GenerationRequest(prompt)
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise GenerationQueueFull(
+                f"Too many questions are being answered right now ({self._queue.maxsize} waiting). Please try again shortly."
+            )
+        with self._lock:
+            self.submitted += 1
+        return request
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                worker = threading.Thread(target=self._work, name=f"generation-{len(self._threads)}", daemon=True)
+                worker.start()
+                self._threads.append(worker)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            for request in batch:
+                request.started_at = started
+                request.batch_size = len(batch)
+            with self._lock:
+                self.batches += 1
+                self.batched_requests += len(batch)
+            try:
+                self.run_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.finish(e)
+            else:
+                for request in batch:
+                    request.finish()
+
+    def stats(self):
+        """Queue depth, rejections and average batch size"""
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            }
+
+
+class _BatchStreamer:
+    def __init__(self, tokenizer, requests, stop_token_ids):
+        """
+        generate() streamer that decodes each row of a batch separately and
+        hands the new text to that row's GenerationRequest
+        """
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self.stop_token_ids = stop_token_ids
+        self.tokens = [[] for _ in requests]
+        self.sent = [0] * len(requests)
+        self.stopped = [False] * len(requests)
+        self.prompt_seen = False
+
+    def put(self, value):
+        # The first call carries the prompt ids
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        for row, new_tokens in enumerate(value.reshape(len(self.requests), -1).tolist()):
+            if self.stopped[row]:
+                continue
+            for token in new_tokens:
+                if token in self.stop_token_ids:
+                    self.stopped[row] = True
+                    break
+                self.tokens[row].append(token)
+            self._flush(row, final=self.stopped[row])
+
+    def end(self):
+        for row in range(len(self.requests)):
+            self._flush(row, final=True)
+
+    def _flush(self, row, final=False):
+        text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        # Hold back an incomplete multi-byte character until the next token completes it
+        if not final and text.endswith("\ufffd"):
+            return
+        self.requests[row].put(text[self.sent[row]:])
+        self.sent[row] = len(text)
+
 
 class LLMHandler:
-    def __init__(self, model_choice="phi4"):
+    def __init__(self, model_choice="phi4", response_cache=None, context_tokens=None):
         """
         Initialize LLM handler with model choice for easy swapping.
-        Models: 'phi4' for Phi-4-mini, 'grok4' for future Grok-4 integration
+        Models: 'phi4' for Phi-4-mini, 'grok4' for future Grok-4 integration,
+        'phi4-int8' / 'phi4-onnx' for Phi-4-mini on an optimized CPU backend
+        Responses are cached in response_cache (the shared process-wide cache by default).
+        Data context is packed into context_tokens (PIRHO_CONTEXT_TOKENS) prompt tokens.
         """
         self.model_choice = model_choice.lower()
+        self.response_cache = response_cache or get_response_cache()
         self.model_name = self._get_model_name()
+        # How the model runs ("api", "int8", "onnx", "cuda-int8", "float32"), set once it loads
+        self.backend = None
         self.tokenizer = None
         self.model = None
-        self.llm = None
+        self.client = None
+        self.scheduler = None
+        self.prefix_cache = None
+        self.context_builder = ContextBuilder(self._count_tokens, context_tokens)
+        self._token_counter = None
 
         try:
             self._initialize_model()
         except Exception as e:
             print(f"Warning: Model initialization failed: {e}. Will initialize on first use.")
 
+    @property
+    def cache_model(self):
+        """
+        Response cache key for this handler: model choice, weights and backend, since
+        several choices share one model name but differ in prompt format or numerics
+        """
+        return f"{self.model_choice}|{self.model_name}|{self.backend}"
+
     def _get_model_name(self):
         """Get model name based on choice"""
-        if self.model_choice == "phi4":
+        if self.model_choice == "phi4" or self.model_choice in CPU_MODEL_CHOICES:
             # Use phi-3.5-mini for testing until Phi-4 is released
             return "microsoft/Phi-3.5-mini-instruct"
         elif self.model_choice == "grok4":
@@ -36,22 +286,34 @@ class LLMHandler:
         else:
             return "microsoft/Phi-3.5-mini-instruct"  # Default fallback
 
+    @tracing.traced("llm.initialize_model")
     def _initialize_model(self):
         """Initialize the language model with optimization for edge devices"""
+        tracing.current_span().set(model=self.model_name)
         if self.model_choice == "grok4":
-            # Use xAI API for Grok
-            self.client = OpenAI(
-                api_key=os.getenv("XAI_API_KEY", ""),  # User should set this
-                base_url="https://api.x.ai/v1"
-            )
-            self.llm = "grok_api"  # Placeholder, will handle in generate_response
+            from src.core.api_client import get_api_client
+
+            # Use xAI API for Grok through the shared pooled client (XAI_API_KEY, XAI_BASE_URL)
+            self.client = get_api_client()
+            self.backend = "api"
             return
 
         # For browser/WebVM deployment, consider using ONNX.js
         # This server-side implementation is for initial development
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+        from src.core.cpu_backend import configure_cpu_threads
+
+        configure_cpu_threads()
 
+        if self.model_choice in CPU_MODEL_CHOICES:
+            # int8 weights or ONNX Runtime: about half the memory of float32 and faster per token on CPU
+            from src.core.cpu_backend import load_cpu_model
+
+            self.tokenizer, self.model = load_cpu_model(self.model_name, CPU_MODEL_CHOICES[self.model_choice])
+            self.backend = CPU_MODEL_CHOICES[self.model_choice]
         # Check for CUDA availability for quantization
-        if torch.cuda.is_available():
+        elif torch.cuda.is_available():
             # INT8/4-bit quantization for memory efficiency (~2GB usage)
             bnb_config = BitsAndBytesConfig(
                 load_in_8bit=True,  # Using 8-bit for better compatibility, can change to 4-bit
@@ -60,91 +322,258 @@ class LLMHandler:
             )
             device_map = "auto"
             torch_dtype = "float16"
+            self.backend = "cuda-int8"
         else:
             # CPU-only: no quantization, use float32 for compatibility
             bnb_config = None
             device_map = None
             torch_dtype = "float32"
+            self.backend = "float32"
 
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_name,
-            quantization_config=bnb_config,
-            trust_remote_code=True,
-            device_map=device_map,
-            attn_implementation="eager",  # For smartphone/CPU compatibility
-            torch_dtype=torch_dtype
-        )
+        if self.model is None:
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModelForCausalLM.from_pretrained(
+                self.model_name,
+                quantization_config=bnb_config,
+                trust_remote_code=True,
+                device_map=device_map,
+                attn_implementation="eager",  # For smartphone/CPU compatibility
+                torch_dtype=torch_dtype
+            )
 
-        # Create optimized pipeline for MSME analytics queries
-        self.pipe = pipeline(
-            "text-generation",
-            model=self.model,
-            tokenizer=self.tokenizer,
-            max_new_tokens=256,  # Reduced for <3s response time
+        self.generation_kwargs = dict(
+            max_new_tokens=MAX_NEW_TOKENS,  # Reduced for <3s response time
             temperature=0.3,  # Lower temperature for factual business analytics
             do_sample=True,
             pad_token_id=self.tokenizer.eos_token_id
         )
 
-        self.llm = HuggingFacePipeline(pipeline=self.pipe)
+        # Batched prompts are left-padded so every row's new tokens start at the same position
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.scheduler = GenerationScheduler(self._generate_batch)
+        # System prompt keys/values for this model, prefilled once per language
+        if prefix_cache_enabled() and supports_prefix_cache(self.model):
+            self.prefix_cache = PrefixCache(self.model, self.tokenizer)
 
-    def generate_response(self, prompt, context=None, language="en"):
-        """Generate response with context from RAG and language support"""
-        # Initialize if not done
-        if self.llm is None:
-            try:
-                self._initialize_model()
-            except Exception as e:
-                return f"Model initialization failed: {e}. Please check requirements."
+    def _ready(self):
+        """Whether _initialize_model has finished: the API client or the local model's scheduler exists"""
+        return self.client is not None if self.model_choice == "grok4" else self.scheduler is not None
 
+    def _count_tokens(self, text):
+        """Tokens in text by the local model's tokenizer, estimated for API models"""
+        if self.tokenizer is None:
+            return approximate_tokens(text)
+        if self._token_counter is None:
+            self._token_counter = tokenizer_counter(self.tokenizer)
+        return self._token_counter(text)
+
+    def _build_prompt(self, prompt, context=None, language="en"):
+        """Return (system_prompt, user_prompt, formatted_prompt) for a question"""
         # Format prompt with instruction for MSME analytics
-        system_prompt = "You are an AI assistant specialized in MSME business analytics. Provide concise, accurate insights from the data. Use bullet points for lists and keep responses under 200 words."
+        system_prompt = SYSTEM_PROMPT
 
         if language == "hi":
-            system_prompt += " Respond in Hindi using simple language."
+            system_prompt += HINDI_INSTRUCTION
 
+        packed = None
         if context:
-            user_prompt = f"Data Context: {context[:1000]}\n\nQuestion: {prompt}"
+            packed, stats = self.context_builder.build(context)
+            tracing.current_span().set(context_tokens=stats["tokens"], context_dropped=stats["dropped"],
+                                       context_truncated=stats["truncated"])
+        if packed:
+            user_prompt = f"Data Context: {packed}\n\nQuestion: {prompt}"
         else:
             user_prompt = prompt
 
         # Phi-4/Grok instruction following format
-        if self.model_choice in ["phi4", "grok4"]:
+        if self.model_choice in ["phi4", "grok4"] or self.model_choice in CPU_MODEL_CHOICES:
             formatted_prompt = f"<|system|>\n{system_prompt}\n<|user|>\n{user_prompt}\n<|assistant|>\n"
         else:
             # Standard format for other models
             formatted_prompt = f"System: {system_prompt}\nUser: {user_prompt}\nAssistant:"
 
+        return system_prompt, user_prompt, formatted_prompt
+
+    @tracing.traced("llm.generate_response")
+    def generate_response(self, prompt, context=None, language="en"):
+        """Generate response with context from RAG and language support"""
+        trace = tracing.current_span()
+        cached = self.response_cache.get(self.cache_model, prompt, context, language)
+        trace.set(model=self.model_name, response_cache="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+        # Initialize if not done
+        if not self._ready():
+            try:
+                self._initialize_model()
+            except Exception as e:
+                return f"Model initialization failed: {e}. Please check requirements."
+
+        system_prompt, user_prompt, formatted_prompt = self._build_prompt(prompt, context, language)
+        trace.set(prompt_chars=len(formatted_prompt))
+
         try:
-            if self.llm == "grok_api":
+            if self.backend == "api":
                 # Use xAI API for Grok
-                completion = self.client.chat.completions.create(
-                    model="grok-beta",  # Fast model
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=256
-                )
+                completion = self.client.chat(**self._api_params(system_prompt, user_prompt))
                 response = completion.choices[0].message.content
+                if completion.usage is not None:
+                    trace.set(prompt_tokens=completion.usage.prompt_tokens,
+                              completion_tokens=completion.usage.completion_tokens)
             else:
-                response = self.llm.invoke(formatted_prompt)
+                # Queued with other sessions' prompts and generated as one batch
+                with tracing.span("llm.generate") as generation:
+                    request = self.scheduler.submit(formatted_prompt)
+                    response = request.result()
+                    generation.set(queue_ms=request.queue_ms, batch_size=request.batch_size)
 
                 # Clean response
                 response = response.replace(formatted_prompt, "").strip()
-                if "<|assistant|>" in response:
-                    response = response.split("<|assistant|>")[0].strip()
+                if ASSISTANT_MARKER in response:
+                    response = response.split(ASSISTANT_MARKER)[0].strip()
 
             # Ensure response is concise for mobile
-            return response[:500] if len(response) > 500 else response
+            response = response[:MAX_RESPONSE_CHARS] if len(response) > MAX_RESPONSE_CHARS else response
+            if trace.recording and self.tokenizer is not None:
+                trace.set(completion_tokens=len(self.tokenizer.encode(response)))
+            self.response_cache.put(self.cache_model, prompt, response, context, language)
+            return response
 
         except Exception as e:
+            trace.set(error=type(e).__name__)
             return f"Error generating response: {str(e)}. Please try again."
 
+    async def agenerate_response(self, prompt, context=None, language="en"):
+        """
+        Async generate_response: API requests from many callers are in flight at once
+        on the event loop; local models run generate_response in a worker thread.
+        """
+        if self.model_choice != "grok4":
+            return await asyncio.to_thread(self.generate_response, prompt, context, language)
+
+        cached = self.response_cache.get(self.cache_model, prompt, context, language)
+        if cached is not None:
+            return cached
+
+        if not self._ready():
+            try:
+                self._initialize_model()
+            except Exception as e:
+                return f"Model initialization failed: {e}. Please check requirements."
+
+        system_prompt, user_prompt, _ = self._build_prompt(prompt, context, language)
+        try:
+            completion = await self.client.achat(**self._api_params(system_prompt, user_prompt))
+            response = completion.choices[0].message.content[:MAX_RESPONSE_CHARS]
+            self.response_cache.put(self.cache_model, prompt, response, context, language)
+            return response
+        except Exception as e:
+            return f"Error generating response: {str(e)}. Please try again."
+
+    def stream_response(self, prompt, context=None, language="en"):
+        """
+        Yield the response in pieces as tokens are generated, with the same
+        cleanup and length cap as generate_response
+        """
+        # The span is not made current: a generator cannot hold a context variable across yields
+        with tracing.span("llm.stream_response", activate=False, model=self.model_name) as trace:
+            started = time.perf_counter()
+            for text in self._stream_response(prompt, context, language, trace):
+                if trace.recording and "first_piece_ms" not in trace.attrs:
+                    trace.set(first_piece_ms=round((time.perf_counter() - started) * 1000, 3))
+                trace.incr("pieces")
+                yield text
+
+    def _stream_response(self, prompt, context, language, trace):
+        cached = self.response_cache.get(self.cache_model, prompt, context, language)
+        trace.set(response_cache="hit" if cached is not None else "miss")
+        if cached is not None:
+            yield cached
+            return
+
+        if not self._ready():
+            try:
+                self._initialize_model()
+            except Exception as e:
+                yield f"Model initialization failed: {e}. Please check requirements."
+                return
+
+        system_prompt, user_prompt, formatted_prompt = self._build_prompt(prompt, context, language)
+
+        try:
+            if self.backend == "api":
+                pieces = self._stream_api(system_prompt, user_prompt)
+            else:
+                pieces = self._stream_local(formatted_prompt)
+            parts = []
+            for text in clean_stream(pieces):
+                parts.append(text)
+                yield text
+            # Only completed streams are cached; errors and abandoned streams are not
+            trace.set(response_chars=sum(len(part) for part in parts))
+            self.response_cache.put(self.cache_model, prompt, "".join(parts), context, language)
+        except Exception as e:
+            trace.set(error=type(e).__name__)
+            yield f"Error generating response: {str(e)}. Please try again."
+
+    @staticmethod
+    def _api_params(system_prompt, user_prompt):
+        return {
+            "model": API_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_tokens": MAX_NEW_TOKENS,
+        }
+
+    def _stream_api(self, system_prompt, user_prompt):
+        for chunk in self.client.chat_stream(**self._api_params(system_prompt, user_prompt)):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _stream_local(self, formatted_prompt):
+        # Pieces arrive as the batch this prompt joined generates them
+        yield from self.scheduler.submit(formatted_prompt)
+
+    def _generate_batch(self, requests):
+        """Run padded generate() calls over a batch of GenerationRequests, streaming each row"""
+        stop_token_ids = {self.tokenizer.eos_token_id}
+        configured = getattr(getattr(self.model, "generation_config", None), "eos_token_id", None)
+        if configured is not None:
+            stop_token_ids.update(configured if isinstance(configured, (list, tuple)) else [configured])
+
+        # Prompts with the same system prompt (language) share one cached prefix
+        groups = {}
+        for request in requests:
+            groups.setdefault(split_prompt(request.prompt)[0], []).append(request)
+        for group in groups.values():
+            self._generate_group(group, stop_token_ids)
+
+    def _generate_group(self, requests, stop_token_ids):
+        import torch
+
+        prompts = [request.prompt for request in requests]
+        inputs = self.prefix_cache.prepare(prompts) if self.prefix_cache is not None else None
+        if inputs is None:
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        streamer = _BatchStreamer(self.tokenizer, requests, stop_token_ids)
+        with torch.no_grad():
+            self.model.generate(**inputs, streamer=streamer, **self.generation_kwargs)
+
     def get_model_info(self):
         """Get model information for UI display"""
-        device_info = "GPU quantized (<3s response)" if torch.cuda.is_available() else "CPU inference (<30s response)"
+        if self.model_choice == "grok4":
+            device_info = "Cloud API (xAI)"
+        elif self.model_choice in CPU_MODEL_CHOICES:
+            device_info = f"CPU {CPU_MODEL_CHOICES[self.model_choice]} backend (~half float32 memory)"
+        else:
+            import torch
+
+            device_info = "GPU quantized (<3s response)" if torch.cuda.is_available() else "CPU inference (<30s response)"
         return {
             "model": self.model_name,
             "type": self.model_choice.upper(),
@@ -0,0 +1,129 @@
+# Prompt-prefix KV cache - prefill the constant system prompt once and reuse it
+#
+# Every local prompt starts with the same "<|system|> ... <|user|>" block (one per
+# language). Its attention keys/values are computed once and copied into each generate()
+# call, so prefill only runs over the context and question. Entries are keyed by the
+# prefix text, so an edited system prompt simply misses, and LLMHandler builds a new
+# cache whenever it loads a model. benchmarks/prefix_cache.py measures the saving.
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+PREFIX_MARKER = "<|user|>\n"
+DEFAULT_MAX_PREFIXES = 4
+
+
+def prefix_cache_enabled():
+    return os.getenv("PIRHO_PREFIX_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def split_prompt(prompt, marker=PREFIX_MARKER):
+    """(prefix, rest) of a formatted prompt, split after marker; (None, prompt) without one"""
+    cut = prompt.find(marker)
+    if cut == -1:
+        return None, prompt
+    cut += len(marker)
+    return prompt[:cut], prompt[cut:]
+
+
+def supports_prefix_cache(model):
+    """Only PyTorch models (float32, quantized or int8) accept past_key_values; ONNX Runtime ones do not"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return isinstance(model, torch.nn.Module)
+
+
+class PrefixCache:
+    def __init__(self, model, tokenizer, max_prefixes=None):
+        """Past key/values of prompt prefixes for one model, least recently used dropped first"""
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_prefixes = max_prefixes or int(os.getenv("PIRHO_PREFIX_CACHE_SIZE", DEFAULT_MAX_PREFIXES))
+        # prefix text -> (prefix token ids, DynamicCache)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prefill(self, prefix):
+        """(token ids, past key/values) of prefix, computed without touching the cache"""
+        import torch
+        from transformers import DynamicCache
+
+        ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+        with torch.no_grad():
+            outputs = self.model(input_ids=ids, attention_mask=torch.ones_like(ids),
+                                 past_key_values=DynamicCache(), use_cache=True)
+        return ids[0].tolist(), outputs.past_key_values
+
+    def lookup(self, prefix):
+        """(token ids, past key/values) of prefix, prefilled on first use"""
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None:
+                self._entries.move_to_end(prefix)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self.prefill(prefix)
+        with self._lock:
+            self._entries[prefix] = entry
+            while len(self._entries) > self.max_prefixes:
+                self._entries.popitem(last=False)
+        return entry
+
+    def prepare(self, prompts):
+        """
+        generate() inputs (input_ids, attention_mask, past_key_values) for prompts sharing
+        one cached prefix, or None when they do not and must be prefilled in full
+        """
+        import torch
+
+        prefixes = {split_prompt(prompt)[0] for prompt in prompts}
+        if len(prefixes) != 1 or None in prefixes:
+            return None
+        prefix_ids, cache = self.lookup(prefixes.pop())
+        if len(prompts) > 1 and not hasattr(cache, "batch_repeat_interleave"):
+            return None
+
+        suffixes = []
+        for prompt in prompts:
+            ids = self.tokenizer(prompt).input_ids
+            # Tokens can merge across the split; reuse only when the prefix tokenizes identically
+            if ids[:len(prefix_ids)] != prefix_ids or len(ids) == len(prefix_ids):
+                return None
+            suffixes.append(ids[len(prefix_ids):])
+
+        # Padding goes between prefix and question; the mask hides it and generate()
+        # derives position ids from the mask, so every row continues the prefix exactly
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        width = max(len(suffix) for suffix in suffixes)
+        input_ids = []
+        attention_mask = []
+        for suffix in suffixes:
+            gap = width - len(suffix)
+            input_ids.append(prefix_ids + [pad_id] * gap + suffix)
+            attention_mask.append([1] * len(prefix_ids) + [0] * gap + [1] * len(suffix))
+
+        # generate() appends to the cache it is given, so each call gets its own copy
+        past = copy.deepcopy(cache)
+        if len(prompts) > 1:
+            past.batch_repeat_interleave(len(prompts))
+        device = self.model.device
+        return {
+            "input_ids": torch.tensor(input_ids, device=device),
+            "attention_mask": torch.tensor(attention_mask, device=device),
+            "past_key_values": past,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"prefixes": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,228 @@
+# Dataset profile - summary statistics built incrementally, one chunk at a time
+#
+# Every statistic is mergeable, so a profile can be built while streaming chunks or by
+# combining profiles of separate parts. Distinct counts are estimated with a k-minimum-
+# values sketch of 64-bit value hashes; top values keep the heaviest TOP_CAPACITY
+# candidates per chunk, so both are exact for low-cardinality columns and approximate
+# beyond that.
+import numpy as np
+import pandas as pd
+
+SKETCH_SIZE = 1024
+TOP_CAPACITY = 64
+TOP_VALUES_SHOWN = 3
+PREVIEW_ROWS = 10
+HASH_SPACE = float(2 ** 64)
+
+
+def _extreme(current, value, pick):
+    """Apply min/max across chunks, ignoring values that cannot be compared"""
+    if value is None:
+        return current
+    if current is None:
+        return value
+    try:
+        return pick(current, value)
+    except TypeError:
+        return current
+
+
+def _value_hashes(series):
+    try:
+        return pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts); fall back to their string form
+        return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+
+
+class ColumnProfile:
+    def __init__(self, name, dtype):
+        self.name = name
+        self.dtype = dtype
+        self.count = 0
+        self.nulls = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        # Smallest distinct value hashes seen, sorted (k-minimum-values sketch)
+        self.sketch = np.empty(0, dtype=np.uint64)
+        # Candidate most frequent values of non-numeric columns -> count
+        self.top = {}
+
+    @property
+    def numeric(self):
+        return pd.api.types.is_numeric_dtype(self.dtype) and not pd.api.types.is_bool_dtype(self.dtype)
+
+    @property
+    def categorical(self):
+        """Text, categorical and boolean columns, whose most frequent values are tracked"""
+        return not (self.numeric or pd.api.types.is_datetime64_any_dtype(self.dtype)
+                    or pd.api.types.is_timedelta64_dtype(self.dtype))
+
+    @property
+    def mean(self):
+        if self.numeric and self.count:
+            return self.total / self.count
+        return None
+
+    @property
+    def distinct(self):
+        """Distinct non-null values; exact below SKETCH_SIZE, estimated above"""
+        if len(self.sketch) < SKETCH_SIZE:
+            return len(self.sketch)
+        return int((SKETCH_SIZE - 1) * HASH_SPACE / float(self.sketch[-1]))
+
+    def top_values(self, limit=TOP_VALUES_SHOWN):
+        """[(value, count)] of the most frequent values, most frequent first"""
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def update(self, series):
+        """Fold one chunk of this column into the running statistics"""
+        non_null = series.dropna()
+        self.count += len(non_null)
+        self.nulls += len(series) - len(non_null)
+        if non_null.empty:
+            return
+
+        self._update_sketch(_value_hashes(non_null))
+        if self.categorical:
+            self._merge_top(non_null.value_counts().head(TOP_CAPACITY).items())
+
+        if self.numeric:
+            self.total += float(non_null.sum())
+        try:
+            chunk_min, chunk_max = non_null.min(), non_null.max()
+        except TypeError:
+            # Mixed types in an object column have no ordering
+            return
+        self.min = _extreme(self.min, chunk_min, min)
+        self.max = _extreme(self.max, chunk_max, max)
+
+    def _update_sketch(self, hashes):
+        if len(self.sketch) >= SKETCH_SIZE:
+            # Only hashes below the current k-th smallest can enter the sketch
+            hashes = hashes[hashes < self.sketch[-1]]
+        # Hash-based dedupe and a partial sort keep this linear in the chunk size
+        hashes = pd.unique(hashes)
+        if len(hashes) > SKETCH_SIZE:
+            hashes = np.partition(hashes, SKETCH_SIZE - 1)[:SKETCH_SIZE]
+        if len(hashes):
+            self.sketch = np.union1d(self.sketch, hashes)[:SKETCH_SIZE]
+
+    def _merge_top(self, counts):
+        for value, count in counts:
+            self.top[value] = self.top.get(value, 0) + int(count)
+        if len(self.top) > TOP_CAPACITY:
+            self.top = dict(sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:TOP_CAPACITY])
+
+    def merge(self, other):
+        """Combine statistics from another profile of the same column"""
+        self.count += other.count
+        self.nulls += other.nulls
+        self.total += other.total
+        self.min = _extreme(self.min, other.min, min)
+        self.max = _extreme(self.max, other.max, max)
+        self._update_sketch(other.sketch)
+        self._merge_top(other.top.items())
+
+
+class DatasetProfile:
+    def __init__(self):
+        """Per-column statistics that can be updated chunk by chunk and merged"""
+        self.rows = 0
+        self.columns = {}
+        # First rows of the data and their rendered text, kept for previews
+        self.preview = None
+        self._preview_text = None
+
+    def update(self, df):
+        """Fold a dataframe chunk into the profile"""
+        self.rows += len(df)
+        for col in df.columns:
+            column = self.columns.get(col)
+            if column is None:
+                column = self.columns[col] = ColumnProfile(col, df[col].dtype)
+            elif column.dtype != df[col].dtype:
+                # Chunks can infer different dtypes for the same column; widen like pandas would
+                column.dtype = pd.api.types.pandas_dtype(
+                    object if column.dtype == object or df[col].dtype == object else "float64"
+                )
+            column.update(df[col])
+        self._extend_preview(df)
+        return self
+
+    def _extend_preview(self, df):
+        if self.preview is None:
+            self.preview = df.head(PREVIEW_ROWS).copy()
+        elif len(self.preview) < PREVIEW_ROWS:
+            self.preview = pd.concat([self.preview, df.head(PREVIEW_ROWS - len(self.preview))])
+        else:
+            return
+        self._preview_text = None
+
+    def merge(self, other):
+        """Combine another profile (e.g. of a different chunk) into this one"""
+        self.rows += other.rows
+        for col, other_column in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(other_column)
+            else:
+                self.columns[col] = other_column
+        if other.preview is not None:
+            self._extend_preview(other.preview)
+        return self
+
+    def preview_text(self):
+        """First rows as text, rendered once and reused"""
+        if self._preview_text is None:
+            self._preview_text = self.preview.to_string() if self.preview is not None else "No data loaded."
+        return self._preview_text
+
+    def describe(self):
+        """Column statistics as a dataframe, one column per dataset column"""
+        return pd.DataFrame({
+            col: {
+                "count": column.count,
+                "nulls": column.nulls,
+                "distinct": column.distinct,
+                "mean": column.mean,
+                "min": column.min,
+                "max": column.max,
+                "top": ", ".join(f"{value} ({count})" for value, count in column.top_values()) or None,
+            }
+            for col, column in self.columns.items()
+        })
+
+    def summary_text(self):
+        """Dataset overview in the same layout as the RAG summary document"""
+        return f"""
+        Dataset Overview:
+        - Total rows: {self.rows}
+        - Columns: {', '.join(str(col) for col in self.columns)}
+        - Data types: {[column.dtype for column in self.columns.values()]}
+
+        Column descriptions:
+        {self.describe().to_string()}
+        """
+
+    def context_text(self, max_columns=12):
+        """One compact line per column for the LLM prompt"""
+        lines = [f"Dataset: {self.rows} rows, {len(self.columns)} columns"]
+        for col, column in list(self.columns.items())[:max_columns]:
+            parts = [str(column.dtype)]
+            if column.nulls:
+                parts.append(f"{column.nulls} missing")
+            if column.numeric and column.count:
+                parts.append(f"{column.min:g} to {column.max:g}, mean {column.mean:g}")
+            elif not column.categorical and column.count:
+                parts.append(f"{column.min} to {column.max}")
+            else:
+                parts.append(f"~{column.distinct} distinct")
+                # Values seen once say nothing about the column
+                top = [(value, count) for value, count in column.top_values() if count > 1]
+                if top:
+                    parts.append("top " + ", ".join(str(value) for value, _ in top))
+            lines.append(f"- {col}: " + "; ".join(parts))
+        if len(self.columns) > max_columns:
+            lines.append(f"- ... {len(self.columns) - max_columns} more columns")
+        return "\n".join(lines)
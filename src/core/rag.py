@@ -1,81 +1,460 @@
 # RAG module for MSME data analysis
+import importlib.util
+import itertools
+import os
+import time
+import weakref
+import numpy as np
 import pandas as pd
-try:
-    from langchain.vectorstores import FAISS
-    from langchain_huggingface import HuggingFaceEmbeddings
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from langchain.schema import Document
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
 
-class RAGHandler:
-    def __init__(self):
-        if ML_AVAILABLE:
-            # Initialize embeddings as specified
-            self.embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Probe for the ML stack without importing it; langchain, FAISS and the embedding
+# model are only loaded once a vector store is actually built or opened
+ML_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None
+    for module in ("langchain", "langchain_huggingface", "faiss")
+)
+from src.core.analytics import AnalyticsEngine
+from src.core.context_builder import RetrievedContext
+from src.core.embedding import EmbeddingPipeline, document_id, row_document_id
+from src.core.hierarchy import (
+    Hierarchy, date_columns, group_labels, group_title, resolve_group_key, summarize_group
+)
+from src.core.index_cache import IndexCache, dataframe_fingerprint, file_fingerprint
+from src.core.lexical_index import LexicalIndex, lexical_index_enabled, reciprocal_rank_fusion
+from src.core.profile import DatasetProfile
+from src.core.registry import acquire_embeddings, release_embeddings
+from src.core import vector_index
+from src.data.snapshot import get_snapshot_store
+from src.utils import tracing
 
-            # Text splitter for chunking data
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                separators=["\n\n", "\n", " ", ""]
-            )
-        else:
-            self.embedding_model = None
-            self.text_splitter = None
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Above this fraction of changed rows a full rebuild is cheaper than a delta update
+MAX_DELTA_FRACTION = 0.5
+# "rows": one document per row; "grouped": chunks of rows per group plus group summaries
+INDEX_MODES = ("rows", "grouped")
+# Group summaries followed into their chunks by a grouped-mode query
+HIERARCHY_GROUPS = 3
+# Vector and BM25 candidates per result fused by a hybrid query
+HYBRID_CANDIDATES = 2
+# Rows returned for a question naming exact column values
+EXACT_CONTEXT_ROWS = 20
 
+class RAGHandler:
+    def __init__(self, embedding_batch_size=256, embedding_workers=None, index_strategy=None,
+                 index_mode=None, group_by=None):
+        self._embedding_model = None
+        self._text_splitter = None
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers
+        # "auto" (default, or PIRHO_INDEX_STRATEGY) or one of vector_index.INDEX_STRATEGIES
+        self.index_strategy = index_strategy
+        # Document layout (PIRHO_INDEX_MODE); group_by fixes the grouping column in grouped mode
+        self.index_mode = (index_mode or os.getenv("PIRHO_INDEX_MODE", "rows")).lower()
+        if self.index_mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode '{self.index_mode}'. Use one of {', '.join(INDEX_MODES)}.")
+        self.group_by = group_by
+        self.group_key = None
+        self.hierarchy = None
+        self.index_cache = IndexCache()
+        self.snapshots = get_snapshot_store()
         self.vectorstore = None
         self.df = None
+        self.analytics = None
+        # Single-pass statistics and preview rows of the loaded data, built once per load
+        self.profile = None
+        # BM25 and exact-value index over row values (PIRHO_LEXICAL_INDEX), beside the vector store
+        self.lexical = None
+        # Per-row content hashes and columns of the indexed data, for delta updates
+        self.row_hashes = None
+        self.indexed_columns = None
 
-    def load_csv(self, file_path=None, df=None):
-        """Load CSV/Excel data and create vector store (if ML available)"""
+    @tracing.traced("rag.load_csv")
+    def load_csv(self, file_path=None, df=None, progress_callback=None, incremental=False, chunksize=None,
+                 columns=None):
+        """
+        Load CSV/Excel data and create vector store (if ML available).
+        progress_callback(done, total) is called as embedding batches finish.
+        With incremental=True, only rows added, changed or removed since the
+        previous load are re-embedded when the columns are unchanged.
+        With chunksize set, a CSV file is streamed chunk by chunk and the full
+        dataframe is never held in memory (self.df stays None).
+        Files are parsed once into a columnar snapshot that later loads reopen;
+        columns restricts loading to those columns.
+        """
+        if chunksize and df is None and file_path and file_path.endswith('.csv'):
+            return self._load_csv_streaming(file_path, chunksize, progress_callback, columns)
+
+        self.profile = None
+        self.lexical = None
         if df is not None:
-            self.df = df
+            self.df = df if columns is None else df[list(columns)]
         elif file_path:
-            if file_path.endswith('.csv'):
-                self.df = pd.read_csv(file_path)
-            elif file_path.endswith(('.xlsx', '.xls')):
-                self.df = pd.read_excel(file_path)
-            else:
-                raise ValueError("Unsupported file format. Use CSV or Excel.")
+            self.df = self.snapshots.read(file_path, columns)
 
         # Validate data
         validation_errors = self.validate_data(self.df)
         if validation_errors:
             return f"Data validation errors: {', '.join(validation_errors)}"
+        trace = tracing.current_span()
+        trace.set(rows=len(self.df), columns=len(self.df.columns))
+        self.profile = DatasetProfile().update(self.df)
+        if lexical_index_enabled():
+            with tracing.span("lexical.build", rows=len(self.df)):
+                self.lexical = LexicalIndex().add(self.df).finish()
 
         if ML_AVAILABLE:
-            # Convert dataframe to documents
-            documents = self._dataframe_to_documents(self.df)
-            self.vectorstore = FAISS.from_documents(documents, self.embedding_model)
+            row_hashes = self._row_hashes(self.df)
+            if incremental and self._can_update_incrementally(row_hashes):
+                result = self._apply_delta(row_hashes, progress_callback)
+                if result is not None:
+                    trace.set(mode="delta")
+                    return result
+
+            # Reopen a previously built index for identical data, model, chunking and index type
+            self.group_key = resolve_group_key(self.df, self.group_by) if self.index_mode == "grouped" else None
+            expected_documents = self._estimate_documents(self.df, len(self.df))
+            strategy = vector_index.resolve_strategy(self.index_strategy, expected_documents)
+            cache_key = self._cache_key(dataframe_fingerprint(self.df), index=strategy)
+            cached = self.index_cache.load(cache_key, self.embedding_model)
+            trace.set(index_cache="hit" if cached is not None else "miss", index=strategy, layout=self.index_mode)
+            if cached is not None:
+                self.vectorstore = self._with_search_settings(cached)
+                self._set_hierarchy()
+                self.row_hashes = row_hashes
+                self.indexed_columns = list(self.df.columns)
+                return f"Successfully loaded {cached.index.ntotal} data chunks from {len(self.df)} rows (cached index)."
+
+            # Stream document batches through the embedding pool; the full list is never held at once
+            if self.group_key:
+                documents, total = self.iter_grouped_documents(self.df, batch_size=self.embedding_batch_size), None
+            else:
+                documents, total = self.iter_documents(self.df, batch_size=self.embedding_batch_size), len(self.df) + 1
+            self.vectorstore, num_documents = self._embedding_pipeline(
+                progress_callback, strategy, expected_documents
+            ).build(documents, total=total)
+            self._set_hierarchy()
+            self.row_hashes = row_hashes
+            self.indexed_columns = list(self.df.columns)
 
-            return f"Successfully loaded {len(documents)} data chunks from {len(self.df)} rows."
+            self.index_cache.save(cache_key, self.vectorstore, rows=len(self.df), model=EMBEDDING_MODEL_NAME)
+            return f"Successfully loaded {num_documents} data chunks from {len(self.df)} rows."
         else:
             return f"Successfully loaded {len(self.df)} rows. RAG features disabled (ML libraries not available)."
 
-    def _dataframe_to_documents(self, df):
-        """Convert dataframe to LangChain documents"""
-        documents = []
-        
-        # Create summary document with general stats
-        summary_text = f"""
-        Dataset Overview:
-        - Total rows: {len(df)}
-        - Columns: {', '.join(df.columns.tolist())}
-        - Data types: {[df[col].dtype for col in df.columns]}
-        
-        Column descriptions:
-        {df.describe(include='all').to_string()}
-        """
-        documents.append(Document(page_content=summary_text, metadata={"type": "summary"}))
-        
-        # Create documents for each row/group
-        for idx, row in df.iterrows():
-            row_text = f"Row {idx}: " + ", ".join([f"{col}: {row[col]}" for col in df.columns])
-            documents.append(Document(page_content=row_text, metadata={"row_index": idx, "type": "data"}))
-        
-        return documents
+    @property
+    def embedding_model(self):
+        """Shared embedding model, loaded on first use"""
+        if self._embedding_model is None and ML_AVAILABLE:
+            # Embeddings are shared process-wide; release our reference when this handler is collected
+            self._embedding_model = acquire_embeddings(EMBEDDING_MODEL_NAME)
+            weakref.finalize(self, release_embeddings, EMBEDDING_MODEL_NAME)
+        return self._embedding_model
+
+    @property
+    def text_splitter(self):
+        """Text splitter for chunking data, created on first use"""
+        if self._text_splitter is None and ML_AVAILABLE:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
+
+    def _load_csv_streaming(self, file_path, chunksize, progress_callback=None, columns=None):
+        """Validate, serialize and embed a CSV one chunk at a time with bounded memory"""
+        self.df = None
+        self.row_hashes = None
+        self.indexed_columns = None
+        self.profile = DatasetProfile()
+        self.hierarchy = None
+        self.lexical = None
+
+        try:
+            reader = pd.read_csv(file_path, chunksize=chunksize, usecols=columns)
+            first_chunk = next(reader, None)
+        except pd.errors.EmptyDataError:
+            first_chunk = None
+        if first_chunk is None:
+            return "Data validation errors: File is empty"
+
+        validation_errors = self.validate_data(first_chunk)
+        if validation_errors:
+            return f"Data validation errors: {', '.join(validation_errors)}"
+        trace = tracing.current_span()
+        trace.set(mode="streaming", chunksize=chunksize)
+
+        if not ML_AVAILABLE:
+            for chunk in itertools.chain([first_chunk], reader):
+                self.profile.update(chunk)
+            trace.set(rows=self.profile.rows)
+            return f"Successfully loaded {self.profile.rows} rows. RAG features disabled (ML libraries not available)."
+
+        # Rows are unknown until the file is read through, so the index is sized from an estimate
+        # The grouping is decided from the first chunk and applied to every later one
+        self.group_key = resolve_group_key(first_chunk, self.group_by) if self.index_mode == "grouped" else None
+        expected_documents = self._estimate_documents(first_chunk, self._estimate_rows(file_path))
+        strategy = vector_index.resolve_strategy(self.index_strategy, expected_documents)
+        cache_key = self._cache_key(file_fingerprint(file_path), streaming=True, index=strategy)
+        cached = self.index_cache.load(cache_key, self.embedding_model)
+        trace.set(index_cache="hit" if cached is not None else "miss", index=strategy, layout=self.index_mode)
+        # Lexical hits are read back from the row documents, which only the per-row layout has
+        lexical = LexicalIndex() if lexical_index_enabled() and not self.group_key else None
+        if cached is not None:
+            for chunk in itertools.chain([first_chunk], reader):
+                if lexical is not None:
+                    lexical.add(chunk, self.profile.rows)
+                self.profile.update(chunk)
+            trace.set(rows=self.profile.rows)
+            self.vectorstore = self._with_search_settings(cached)
+            self._set_hierarchy()
+            self.lexical = lexical.finish() if lexical is not None else None
+            return f"Successfully loaded {cached.index.ntotal} data chunks from {self.profile.rows} rows (cached index)."
+
+        def row_batches():
+            for part, chunk in enumerate(itertools.chain([first_chunk], reader)):
+                offset = self.profile.rows
+                self.profile.update(chunk)
+                if lexical is not None:
+                    lexical.add(chunk, offset)
+                if self.group_key:
+                    yield from self.iter_grouped_documents(chunk, batch_size=self.embedding_batch_size,
+                                                           include_summary=False, part=part, offset=offset)
+                else:
+                    yield from self.iter_documents(chunk, batch_size=self.embedding_batch_size, include_summary=False)
+
+        pipeline = self._embedding_pipeline(progress_callback, strategy, expected_documents)
+        vectorstore, num_documents = pipeline.build(row_batches())
+
+        from langchain.schema import Document
+
+        # The summary can only be written once every chunk has been profiled
+        summary = Document(page_content=self.profile.summary_text(), metadata={"type": "summary"})
+        self.vectorstore, _ = pipeline.build([[summary]], vectorstore=vectorstore)
+        self._set_hierarchy()
+        self.lexical = lexical.finish() if lexical is not None else None
+
+        trace.set(rows=self.profile.rows)
+        self.index_cache.save(cache_key, self.vectorstore, rows=self.profile.rows, model=EMBEDDING_MODEL_NAME)
+        return f"Successfully loaded {num_documents + 1} data chunks from {self.profile.rows} rows (streamed)."
+
+    def _embedding_pipeline(self, progress_callback=None, index_strategy="flat", expected_rows=None):
+        return EmbeddingPipeline(
+            self.embedding_model,
+            batch_size=self.embedding_batch_size,
+            max_workers=self.embedding_workers,
+            progress_callback=progress_callback,
+            index_strategy=index_strategy,
+            expected_rows=expected_rows
+        )
+
+    def _set_hierarchy(self):
+        self.hierarchy = Hierarchy.from_vectorstore(self.vectorstore) if self.index_mode == "grouped" else None
+
+    def _estimate_documents(self, sample, rows):
+        """Documents a dataset of rows rows will produce, judged from a sample of them"""
+        if not self.group_key or sample.empty:
+            return rows + 1
+        sample = sample.head(1000)
+        chars = sum(len(text) + 1 for text in self._serialize_rows(sample)) * rows / len(sample)
+        groups = group_labels(sample, *self.group_key).nunique()
+        return int(chars / (CHUNK_SIZE - CHUNK_OVERLAP)) + groups * 2 + 1
+
+    @staticmethod
+    def _with_search_settings(vectorstore):
+        """Re-apply nprobe/efSearch from the environment to a reopened index"""
+        vector_index.configure_search(vectorstore.index)
+        return vectorstore
+
+    @staticmethod
+    def _estimate_rows(file_path, sample_bytes=1024 * 1024):
+        """Approximate CSV row count from the line length of the first sample_bytes"""
+        with open(file_path, "rb") as f:
+            sample = f.read(sample_bytes)
+        lines = sample.count(b"\n")
+        if len(sample) < sample_bytes or lines == 0:
+            return max(lines - 1, 1)
+        return int(os.path.getsize(file_path) * lines / len(sample))
+
+    @staticmethod
+    def _row_hashes(df):
+        """Hash each row's values (not its label) so edits can be detected per row"""
+        try:
+            return pd.util.hash_pandas_object(df, index=False)
+        except TypeError:
+            return pd.util.hash_pandas_object(df.astype(str), index=False)
+
+    def _can_update_incrementally(self, row_hashes):
+        """
+        A delta update needs an existing index over the same columns and unique row labels,
+        and an index that supports deleting rows (flat only; others are rebuilt)
+        """
+        return (
+            self.vectorstore is not None
+            and self.index_mode == "rows"
+            and vector_index.supports_removal(self.vectorstore.index)
+            and vector_index.resolve_strategy(self.index_strategy, len(self.df) + 1) == "flat"
+            and self.row_hashes is not None
+            and row_hashes.index.is_unique
+            and self.indexed_columns == list(self.df.columns)
+        )
+
+    def _apply_delta(self, row_hashes, progress_callback=None):
+        """
+        Embed only added/changed rows and drop removed/stale ones from the existing index.
+        Returns None when the change is large enough that a full rebuild is cheaper.
+        """
+        previous = self.row_hashes
+        common = row_hashes.index.intersection(previous.index)
+        changed = common[row_hashes.loc[common].to_numpy() != previous.loc[common].to_numpy()]
+        added = row_hashes.index.difference(previous.index)
+        removed = previous.index.difference(row_hashes.index)
+
+        if len(changed) == 0 and len(added) == 0 and len(removed) == 0:
+            return f"No changes detected; index for {len(self.df)} rows is up to date."
+        if len(changed) + len(added) > MAX_DELTA_FRACTION * len(self.df):
+            return None
+
+        # Stale row documents plus the summary, which is always regenerated
+        stale = [row_document_id(idx) for idx in changed.append(removed)] + ["summary"]
+        existing = set(self.vectorstore.index_to_docstore_id.values())
+        stale = [doc_id for doc_id in stale if doc_id in existing]
+        if stale:
+            self.vectorstore.delete(stale)
+
+        updated_rows = self.df[self.df.index.isin(changed.append(added))]
+        document_batches = itertools.chain(
+            [[self._summary_document(self.df)]],
+            self.iter_documents(updated_rows, batch_size=self.embedding_batch_size, include_summary=False)
+        )
+        self.vectorstore, _ = self._embedding_pipeline(progress_callback).build(
+            document_batches, vectorstore=self.vectorstore, total=len(updated_rows) + 1
+        )
+        self.row_hashes = row_hashes
+        self.indexed_columns = list(self.df.columns)
+
+        cache_key = self._cache_key(dataframe_fingerprint(self.df), index="flat")
+        self.index_cache.save(cache_key, self.vectorstore, rows=len(self.df), model=EMBEDDING_MODEL_NAME)
+        return (
+            f"Updated index for {len(self.df)} rows: {len(added)} added, "
+            f"{len(changed)} changed, {len(removed)} removed."
+        )
+
+    def _cache_key(self, fingerprint, **extra):
+        return self.index_cache.make_key(fingerprint, EMBEDDING_MODEL_NAME, **self._chunking_params(), **extra)
+
+    def _chunking_params(self):
+        """Parameters that change the indexed documents, used in the index cache key"""
+        params = {
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+        }
+        if self.group_key:
+            params["group_key"] = list(self.group_key)
+        return params
+
+    def iter_documents(self, df, batch_size=1000, include_summary=True):
+        """Yield lists of documents, serializing at most batch_size rows at a time"""
+        from langchain.schema import Document
+
+        if include_summary:
+            yield [self._summary_document(df)]
+
+        trace = tracing.current_span()
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start:start + batch_size]
+            texts = self._timed(trace, "serialize_ms", self._serialize_rows, chunk)
+            trace.incr("rows_serialized", len(texts))
+            yield [
+                Document(page_content=text, metadata={"row_index": idx, "type": "data"})
+                for idx, text in zip(chunk.index.tolist(), texts)
+            ]
+
+    def iter_grouped_documents(self, df, batch_size=1000, include_summary=True, part=0, offset=0):
+        """
+        Yield lists of documents for grouped mode: per group, a summary document and the
+        group's rows packed into chunk-sized documents by the text splitter.
+        part and offset identify a streamed chunk so document ids stay unique.
+        """
+        from langchain.schema import Document
+
+        if include_summary:
+            yield [self._summary_document(df)]
+
+        column, kind, freq = self.group_key
+        labels = group_labels(df, column, kind, freq, offset)
+        dates = date_columns(df)
+        trace = tracing.current_span()
+        batch = []
+        for number, (label, rows) in enumerate(df.groupby(labels, sort=False)):
+            title = group_title(column, kind, label)
+            batch.append(Document(
+                page_content=self._timed(trace, "group_summary_ms", summarize_group, title, rows, dates),
+                metadata={"type": "group_summary", "group": label, "rows": len(rows),
+                          "doc_id": f"group-{part}-{number}"}
+            ))
+            texts = self._timed(trace, "serialize_ms", self._serialize_rows, rows)
+            trace.incr("rows_serialized", len(texts))
+            chunks = self._timed(trace, "split_ms", self.text_splitter.split_text, "\n".join(texts))
+            for position, text in enumerate(chunks):
+                batch.append(Document(
+                    page_content=f"[{title}]\n{text}",
+                    metadata={"type": "chunk", "group": label, "doc_id": f"chunk-{part}-{number}-{position}"}
+                ))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _timed(trace, key, func, *args):
+        """
+        func(*args), adding its milliseconds to trace's key. Document building is
+        interleaved with embedding, so it is accumulated on the active (embedding) span.
+        """
+        if not trace.recording:
+            return func(*args)
+        started = time.perf_counter()
+        result = func(*args)
+        trace.incr(key, (time.perf_counter() - started) * 1000)
+        return result
+
+    def _summary_document(self, df):
+        """Create summary document with general stats, from the load's profile when df is the loaded frame"""
+        from langchain.schema import Document
+
+        profile = self.profile if df is self.df and self.profile is not None else DatasetProfile().update(df)
+        return Document(page_content=profile.summary_text(), metadata={"type": "summary"})
+
+    @staticmethod
+    def _serialize_rows(df):
+        """Format rows as 'Row {idx}: col: val, ...' strings, one column at a time"""
+        if df.empty:
+            return []
+
+        # iterrows() upcasts all-numeric rows to a common dtype (e.g. ints print as floats
+        # next to a float column); mirror that so the text matches the row-wise path
+        if all(isinstance(dtype, np.dtype) and dtype.kind in "iuf" for dtype in df.dtypes):
+            df = df.astype(np.result_type(*df.dtypes))
+
+        prefixes = [f"Row {idx}: " for idx in df.index.tolist()]
+        cells = []
+        for col in df.columns:
+            values = df[col]
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iubf":
+                strings = values.to_numpy().astype(str).tolist()
+            else:
+                # objects, datetimes and extension types: match str() of the boxed scalar
+                strings = list(map(str, values.astype(object)))
+            label = f"{col}: "
+            cells.append([label + value for value in strings])
+
+        return [prefix + ", ".join(row) for prefix, row in zip(prefixes, zip(*cells))]
 
     def validate_data(self, df):
         """Validate uploaded data"""
@@ -87,17 +466,165 @@ class RAGHandler:
         # Add more validation as needed
         return errors
 
+    @tracing.traced("rag.query_data")
     def query_data(self, query, k=5):
-        """Query the data using RAG"""
+        """
+        Query the data: aggregation, filter, top-N and group-by questions are computed
+        exactly over the dataframe; questions naming exact column values (a customer, SKU
+        or invoice number) are answered from the lexical index without an embedding call;
+        everything else uses similarity search fused with BM25.
+        """
+        if self.df is not None:
+            if self.analytics is None or self.analytics.df is not self.df:
+                self.analytics = AnalyticsEngine(self.df)
+            with tracing.span("analytics.answer"):
+                computed = self.analytics.answer(query)
+            if computed:
+                tracing.current_span().set(route="analytics", context_chars=len(computed))
+                return computed
+
+        if self.lexical is not None:
+            exact = self._exact_context(query)
+            if exact is not None:
+                return exact
+
         if not self.vectorstore:
+            if self.lexical is not None and self.df is not None:
+                # Without a vector index (ML libraries missing) BM25 still finds matching rows
+                context = self._context(self._hybrid_sections(query, [], k))
+                tracing.current_span().set(route="lexical", context_chars=len(context))
+                return context
+            if self.profile is not None and self.profile.rows:
+                # Without a vector index (ML libraries missing) the profile is the best context
+                context = self.profile.context_text()
+                tracing.current_span().set(route="profile", context_chars=len(context))
+                return context
             return "No data loaded yet. Please upload a CSV or Excel file first."
-        
-        docs = self.vectorstore.similarity_search(query, k=k)
-        context = "\n\n".join([doc.page_content for doc in docs])
+
+        if self.hierarchy is not None:
+            scored = self._hierarchical_search(query, k)
+        else:
+            candidates = k * HYBRID_CANDIDATES if self.lexical is not None else k
+            with tracing.span("vector.similarity_search", k=candidates) as search:
+                scored = self.vectorstore.similarity_search_with_score(query, k=candidates)
+                search.set(documents=len(scored))
+        if self.lexical is not None:
+            # Grouped searches return group summaries on top of k chunks; keep as many results
+            sections = self._hybrid_sections(query, scored, len(scored) if self.hierarchy is not None else k)
+        else:
+            sections = [(doc.page_content, float(distance)) for doc, distance in scored]
+        context = self._context(sections)
+        tracing.current_span().set(route="hybrid" if self.lexical is not None else "vector",
+                                   context_chars=len(context))
         return context
 
-    def get_preview(self):
-        """Get data preview"""
+    def _context(self, sections):
+        """
+        RetrievedContext of retrieved sections plus the dataset profile. Scored sections
+        let the LLM's context builder drop weak matches and fit its budget.
+        """
+        columns = []
+        if self.profile is not None and self.profile.rows:
+            sections = sections + [(self.profile.context_text(), None)]
+            columns = list(self.profile.columns)
+        return RetrievedContext("\n\n".join(text for text, _ in sections), sections, columns)
+
+    def _exact_context(self, query):
+        """Rows holding column values named in query, found without embedding it; None if it names none"""
+        with tracing.span("lexical.match_entities") as search:
+            matches = self.lexical.match_entities(query)
+            search.set(matches=len(matches))
+        if not matches:
+            return None
+        positions = np.unique(np.concatenate([positions for _, _, positions in matches]))[:EXACT_CONTEXT_ROWS]
+        texts = self._row_texts(positions)
+        if not texts:
+            return None
+        context = self._context([(texts[position], None) for position in positions if position in texts])
+        # Only counts and column names go into traces; matched values are the user's data
+        tracing.current_span().set(route="exact", entities=len(matches),
+                                   entity_columns=", ".join(sorted({str(col) for col, _, _ in matches})),
+                                   context_chars=len(context))
+        return context
+
+    def _hybrid_sections(self, query, scored, limit):
+        """
+        [(text, distance)] of vector results scored and BM25 rows fused by reciprocal rank.
+        Rows found only by BM25 have no distance.
+        """
+        with tracing.span("lexical.search", k=limit) as search:
+            positions, _ = self.lexical.search(query, max(limit, len(scored)))
+            search.set(documents=len(positions))
+        vector = {self._document_key(doc): (doc.page_content, float(distance)) for doc, distance in scored}
+        lexical = {self._row_key(position): position for position in positions.tolist()}
+        fused = reciprocal_rank_fusion([list(vector), list(lexical)])[:limit]
+
+        texts = self._row_texts([lexical[key] for key in fused if key not in vector])
+        sections = []
+        for key in fused:
+            if key in vector:
+                sections.append(vector[key])
+            elif lexical[key] in texts:
+                sections.append((texts[lexical[key]], None))
+        return sections
+
+    @staticmethod
+    def _document_key(doc):
+        """Identity of a retrieved document, shared by a row document and the same row found by BM25"""
+        if doc.metadata.get("type") == "data":
+            return ("row", doc.metadata["row_index"])
+        return ("document", document_id(doc))
+
+    def _row_key(self, position):
+        return ("row", self.df.index[position] if self.df is not None else position)
+
+    def _row_texts(self, positions):
+        """{position: serialized row} from the dataframe, or from the row documents when streamed"""
+        positions = list(positions)
         if self.df is not None:
-            return self.df.head(10).to_string()
+            return dict(zip(positions, self._serialize_rows(self.df.iloc[positions])))
+        texts = {}
+        if self.vectorstore is not None:
+            for position in positions:
+                # Streamed chunks keep a running index, so row labels are positions
+                doc = self.vectorstore.docstore.search(row_document_id(position))
+                if hasattr(doc, "page_content"):
+                    texts[position] = doc.page_content
+        return texts
+
+    def _hierarchical_search(self, query, k):
+        """
+        Closest group summaries first, then the k closest chunks within those groups.
+        Returns [(document, distance)].
+        """
+        with tracing.span("vector.hierarchical_search", k=k) as search:
+            vector = self.embedding_model.embed_query(query)
+            index = self.vectorstore.index
+            distances, positions = vector_index.search_subset(
+                index, vector, HIERARCHY_GROUPS, self.hierarchy.summary_positions
+            )
+            summaries = [
+                (self._document_at(position), distance)
+                for distance, position in zip(distances, positions) if position >= 0
+            ]
+
+            groups = list(dict.fromkeys(doc.metadata["group"] for doc, _ in summaries if "group" in doc.metadata))
+            members = [position for group in groups for position in self.hierarchy.chunk_positions.get(group, [])]
+            chunks = []
+            if members:
+                distances, positions = vector_index.search_subset(index, vector, k, members)
+                chunks = [
+                    (self._document_at(position), distance)
+                    for distance, position in zip(distances, positions) if position >= 0
+                ]
+            search.set(groups=len(groups), documents=len(summaries) + len(chunks))
+        return summaries + chunks
+
+    def _document_at(self, position):
+        return self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+
+    def get_preview(self):
+        """Get data preview, rendered once per load"""
+        if self.profile is not None:
+            return self.profile.preview_text()
         return "No data loaded."
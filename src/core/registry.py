@@ -0,0 +1,189 @@
+# Model registry - process-wide shared model instances with reference counting
+import importlib.util
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+DEFAULT_MEMORY_BUDGET_MB = 16384
+
+
+def estimate_model_bytes(obj):
+    """
+    Best-effort size of the weights held by a handler, embeddings wrapper or model:
+    torch parameters and buffers (int8 dynamic-quantized Linear weights included)
+    or the files of an ONNX Runtime model. 0 until a lazily loaded model is loaded.
+    """
+    for attr in ("model", "client", "_client"):
+        inner = getattr(obj, attr, None)
+        if inner is None:
+            continue
+        try:
+            if hasattr(inner, "parameters"):
+                return _torch_bytes(inner)
+            if getattr(inner, "model_path", None) is not None:
+                return _onnx_bytes(inner.model_path)
+        except Exception:
+            return 0
+    return 0
+
+
+def _torch_bytes(model):
+    tensors = itertools.chain(model.parameters(), model.buffers())
+    size = sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    for module in model.modules():
+        # Quantized Linear layers keep their weights in packed params, not parameters()
+        if callable(getattr(module, "weight", None)) and hasattr(module, "_packed_params"):
+            weight = module.weight()
+            size += weight.numel() * weight.element_size()
+    return size
+
+
+def _onnx_bytes(model_path):
+    """The graph plus any external weight files stored beside it"""
+    directory = os.path.dirname(str(model_path))
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, name))
+    )
+
+
+class _Entry:
+    def __init__(self, value, size_fn):
+        self.value = value
+        self.size_fn = size_fn
+        self.size_bytes = 0
+        self.refs = 0
+        self.measure()
+
+    def measure(self):
+        """Re-estimate the size; models that load lazily only count once loaded"""
+        if self.size_fn is not None:
+            self.size_bytes = self.size_fn(self.value)
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=None):
+        """
+        Hands out one shared instance per key to every caller in the process.
+        Instances nobody holds are kept for reuse and evicted least recently used
+        once the estimated total exceeds the memory budget.
+        """
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("PIRHO_MODEL_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def acquire(self, key, factory, size_fn=estimate_model_bytes):
+        """Return the shared instance for key, building it with factory() on first use"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                loading_lock = self._loading.setdefault(key, threading.Lock())
+            else:
+                entry.refs += 1
+                self._entries.move_to_end(key)
+                return entry.value
+
+        # Build outside the registry lock so other models stay available while one loads
+        with loading_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refs += 1
+                    self._entries.move_to_end(key)
+                    return entry.value
+
+            try:
+                value = factory()
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            entry = _Entry(value, size_fn)
+
+            with self._lock:
+                entry.refs = 1
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                self._evict_locked()
+            return value
+
+    def release(self, key):
+        """Drop one reference; the instance stays cached until evicted"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return
+        # Measured outside the lock; the instance may have loaded its model since acquire
+        entry.measure()
+        with self._lock:
+            entry.refs = max(0, entry.refs - 1)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs == 0:
+                total -= entry.size_bytes
+                del self._entries[key]
+
+    def stats(self):
+        """Per-key reference counts and estimated sizes in MB"""
+        with self._lock:
+            return {
+                key: {"refs": entry.refs, "size_mb": round(entry.size_bytes / (1024 * 1024), 1)}
+                for key, entry in self._entries.items()
+            }
+
+
+# Shared by every Streamlit session in this process
+registry = ModelRegistry()
+
+
+def acquire_llm(model_choice="phi4"):
+    """Shared LLMHandler for a model choice; pair with release_llm when switching away"""
+    from src.core.llm import LLMHandler
+
+    model_choice = model_choice.lower()
+    return registry.acquire(("llm", model_choice), lambda: LLMHandler(model_choice))
+
+
+def release_llm(model_choice):
+    registry.release(("llm", model_choice.lower()))
+
+
+class LLMLease:
+    def __init__(self, model_choice="phi4"):
+        """
+        One session's hold on the shared LLMHandler for model_choice. The reference is
+        released by release() or, at the latest, when the lease is garbage collected
+        (e.g. with the Streamlit session state that holds it).
+        """
+        self.model_choice = model_choice.lower()
+        self.handler = acquire_llm(self.model_choice)
+        self._finalizer = weakref.finalize(self, release_llm, self.model_choice)
+
+    def release(self):
+        """Release the handler now; safe to call more than once"""
+        self._finalizer()
+
+
+def acquire_embeddings(model_name):
+    """Shared HuggingFaceEmbeddings instance for a sentence-transformers model name"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from src.core.cpu_backend import configure_cpu_threads
+
+    if importlib.util.find_spec("torch") is not None:
+        configure_cpu_threads()
+    return registry.acquire(("embeddings", model_name), lambda: HuggingFaceEmbeddings(model_name=model_name))
+
+
+def release_embeddings(model_name):
+    registry.release(("embeddings", model_name))
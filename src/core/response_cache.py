@@ -0,0 +1,226 @@
+# Response cache - reuse LLM answers for repeated questions over the same data
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# The append-only file is rewritten with just the live entries once it holds this many times more
+COMPACT_FACTOR = 2
+
+
+def normalize_prompt(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", prompt.strip().lower()).rstrip(" ?.!")
+
+
+def _cosine(a, b):
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / norm if norm else 0.0
+
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, path=None,
+                 embedding_model=None, similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD):
+        """
+        LRU + TTL cache of generated responses keyed on model, normalized prompt,
+        context hash and language. With an embedding_model, a miss falls back to
+        the most similar cached prompt for the same model, context and language.
+        With a path, each new entry is appended to it as a JSON line (rewritten with the
+        live entries now and then) and the entries are reloaded on startup.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # File writes happen outside _lock so lookups never wait on disk
+        self._file_lock = threading.Lock()
+        self._logged = 0
+        if path:
+            self._load()
+
+    @staticmethod
+    def _scope(model_name, context, language):
+        context_hash = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+        return f"{model_name}|{context_hash}|{language}"
+
+    def _key(self, scope, prompt):
+        return hashlib.sha256(f"{scope}|{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def get(self, model_name, prompt, context=None, language="en"):
+        """Cached response text, or None on a miss"""
+        scope = self._scope(model_name, context, language)
+        key = self._key(scope, prompt)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["response"]
+
+        if self.embedding_model is not None:
+            response = self._similar(scope, prompt, now)
+            if response is not None:
+                return response
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _similar(self, scope, prompt, now):
+        """Near-duplicate lookup over cached prompts that share the same scope"""
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry["scope"] == scope and entry.get("embedding") and not self._expired(entry, now)
+            ]
+        if not candidates:
+            return None
+
+        query = self.embedding_model.embed_query(normalize_prompt(prompt))
+        best_key, best_entry, best_score = None, None, self.similarity_threshold
+        for key, entry in candidates:
+            score = _cosine(query, entry["embedding"])
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        if best_entry is None:
+            return None
+
+        with self._lock:
+            if best_key in self._entries:
+                self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.semantic_hits += 1
+        return best_entry["response"]
+
+    def put(self, model_name, prompt, response, context=None, language="en"):
+        """Store a successful response"""
+        scope = self._scope(model_name, context, language)
+        key = self._key(scope, prompt)
+        entry = {"scope": scope, "response": response, "created": time.time()}
+        if self.embedding_model is not None:
+            entry["embedding"] = list(self.embedding_model.embed_query(normalize_prompt(prompt)))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if not self.path:
+                return
+            self._logged += 1
+            live = None
+            if self._logged > COMPACT_FACTOR * max(self.max_entries, 1):
+                live = list(self._entries.items())
+                self._logged = len(live)
+
+        if live is None:
+            self._write([(key, entry)], "a")
+        else:
+            self._write(live, "w")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._logged = 0
+        if self.path:
+            self._write([], "w")
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        now = time.time()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash mid-write
+                continue
+            key = record.pop("key", None)
+            if key is None:
+                continue
+            self._entries.pop(key, None)
+            if not self._expired(record, now):
+                self._entries[key] = record
+        self._logged = len(lines)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _write(self, items, mode):
+        """Append (mode "a") or rewrite (mode "w", atomically) the JSON-lines file"""
+        lines = "".join(json.dumps({"key": key, **entry}) + "\n" for key, entry in items)
+        with self._file_lock:
+            directory = os.path.dirname(self.path)
+            try:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if mode == "a":
+                    with open(self.path, "a") as f:
+                        f.write(lines)
+                    return
+                staging = f"{self.path}.tmp"
+                with open(staging, "w") as f:
+                    f.write(lines)
+                os.replace(staging, self.path)
+            except OSError as e:
+                print(f"Warning: Could not persist response cache: {e}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide response cache configured from PIRHO_RESPONSE_CACHE_* environment variables"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            embedding_model = None
+            if os.getenv("PIRHO_RESPONSE_CACHE_SEMANTIC", "0") == "1":
+                from src.core.rag import EMBEDDING_MODEL_NAME
+                from src.core.registry import acquire_embeddings
+
+                embedding_model = acquire_embeddings(EMBEDDING_MODEL_NAME)
+            _default_cache = ResponseCache(
+                max_entries=int(os.getenv("PIRHO_RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.getenv("PIRHO_RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                path=os.getenv("PIRHO_RESPONSE_CACHE_PATH") or None,
+                embedding_model=embedding_model
+            )
+        return _default_cache
@@ -0,0 +1,243 @@
+# Vector index strategies - exact, graph and quantized FAISS indexes chosen by dataset size
+#
+#   flat    exact brute force; 4 * dim bytes per vector
+#   hnsw    HNSW graph; flat vectors plus ~2 * M links per vector, no training
+#   ivf     inverted lists over trained k-means centroids; flat vectors, scans nprobe lists
+#   ivfsq   inverted lists with 8-bit scalar-quantized vectors; dim bytes per vector
+#   ivfpq   inverted lists with product-quantized codes; dim / 4 bytes per vector
+#
+# "auto" picks flat for small datasets, HNSW while full vectors still fit comfortably,
+# then IVF-SQ8 and finally IVF-PQ, trading some recall for bounded memory at millions
+# of rows. benchmarks/vector_index.py reports the recall each one gives.
+import os
+import time
+import numpy as np
+
+INDEX_STRATEGIES = ("flat", "hnsw", "ivf", "ivfsq", "ivfpq")
+FLAT_MAX_ROWS = 20_000
+HNSW_MAX_ROWS = 250_000
+SQ_MAX_ROWS = 2_000_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+DEFAULT_EF_SEARCH = 64
+DEFAULT_NPROBE = 16
+# Coarse quantizers with this many centroids are searched through HNSW instead of brute force
+HNSW_QUANTIZER_MIN_LISTS = 4096
+# Training sample per centroid; FAISS warns below 39
+TRAINING_POINTS_PER_LIST = 64
+PQ_CODEBOOK_SIZE = 256
+
+
+def resolve_strategy(strategy, rows):
+    """Concrete strategy for strategy ("auto" or one of INDEX_STRATEGIES) and a row count"""
+    strategy = (strategy or os.getenv("PIRHO_INDEX_STRATEGY", "auto")).lower()
+    if strategy != "auto":
+        if strategy not in INDEX_STRATEGIES:
+            raise ValueError(f"Unknown index strategy '{strategy}'. Use auto or one of {', '.join(INDEX_STRATEGIES)}.")
+        return strategy
+    if rows is None or rows <= FLAT_MAX_ROWS:
+        return "flat"
+    if rows <= HNSW_MAX_ROWS:
+        return "hnsw"
+    if rows <= SQ_MAX_ROWS:
+        return "ivfsq"
+    return "ivfpq"
+
+
+def num_lists(rows):
+    """Number of IVF centroids: about 4 * sqrt(rows), with enough rows to train each one"""
+    return max(1, min(int(4 * np.sqrt(max(rows, 1))), rows // TRAINING_POINTS_PER_LIST))
+
+
+def pq_subquantizers(dim):
+    """Largest divisor of dim giving at least 4 dimensions per sub-quantizer (96 for 384-d)"""
+    for m in range(max(1, dim // 4), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def factory_string(strategy, dim, rows):
+    """faiss.index_factory description for a strategy at a given dataset size"""
+    if strategy == "flat":
+        return "Flat"
+    if strategy == "hnsw":
+        return f"HNSW{HNSW_M}"
+    nlist = num_lists(rows)
+    quantizer = f"IVF{nlist}_HNSW{HNSW_M}" if nlist >= HNSW_QUANTIZER_MIN_LISTS else f"IVF{nlist}"
+    if strategy == "ivf":
+        return f"{quantizer},Flat"
+    if strategy == "ivfsq":
+        return f"{quantizer},SQ8"
+    return f"{quantizer},PQ{pq_subquantizers(dim)}"
+
+
+def create_index(strategy, dim, rows):
+    """Empty (possibly untrained) L2 index for strategy sized for rows vectors"""
+    import faiss
+
+    index = faiss.index_factory(dim, factory_string(strategy, dim, rows), faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    return configure_search(index)
+
+
+def strategy_of(index):
+    """Strategy name of a FAISS index built by create_index (or a plain flat index)"""
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivfsq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def training_size(index, rows):
+    """Vectors to collect before training index (0 if it needs no training)"""
+    if index.is_trained:
+        return 0
+    return min(rows, max(TRAINING_POINTS_PER_LIST * index.nlist, PQ_CODEBOOK_SIZE * 39))
+
+
+def min_training_size(index):
+    """Fewest vectors index can be trained on; k-means needs a point per centroid"""
+    if index.is_trained:
+        return 0
+    minimum = index.nlist
+    if strategy_of(index) == "ivfpq":
+        minimum = max(minimum, PQ_CODEBOOK_SIZE)
+    return minimum
+
+
+def train_index(index, vectors):
+    """Train index's centroids (and PQ codebooks) on a float32 sample"""
+    if not index.is_trained:
+        index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+    return index
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    """
+    Apply query-time accuracy/speed knobs: nprobe inverted lists scanned for IVF
+    indexes, efSearch candidates for HNSW graphs (PIRHO_INDEX_NPROBE, PIRHO_INDEX_EF_SEARCH)
+    """
+    import faiss
+
+    nprobe = nprobe or int(os.getenv("PIRHO_INDEX_NPROBE", DEFAULT_NPROBE))
+    ef_search = ef_search or int(os.getenv("PIRHO_INDEX_EF_SEARCH", DEFAULT_EF_SEARCH))
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(nprobe, index.nlist)
+        quantizer = faiss.downcast_index(index.quantizer)
+        if isinstance(quantizer, faiss.IndexHNSW):
+            # The quantizer must return at least nprobe centroids
+            quantizer.hnsw.efSearch = max(ef_search, index.nprobe)
+    return index
+
+
+def search_subset(index, query_vector, k, ids):
+    """
+    k nearest neighbours of query_vector among the given index positions only.
+    Returns (distances, positions) arrays with -1 positions padding missing results.
+    """
+    import faiss
+
+    selector = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(index.hnsw.efSearch, k))
+    elif isinstance(index, faiss.IndexIVF):
+        # Members of a small subset are spread over few lists; probe more of them
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=min(index.nlist, index.nprobe * 4))
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    query = np.asarray([query_vector], dtype=np.float32)
+    distances, positions = index.search(query, min(k, len(ids)), params=params)
+    return distances[0], positions[0]
+
+
+def supports_removal(index):
+    """
+    Whether rows can be deleted in place. HNSW has no remove_ids, and IVF keeps
+    explicit ids that langchain's delete() would renumber, so only flat indexes qualify.
+    """
+    return strategy_of(index) == "flat"
+
+
+def index_memory_bytes(index):
+    """Serialized size of index, a close proxy for its resident memory"""
+    import faiss
+
+    return int(faiss.serialize_index(index).size)
+
+
+def estimate_index_bytes(index):
+    """Resident size from the per-vector costs above, without serializing the index"""
+    import faiss
+
+    strategy = strategy_of(index)
+    if strategy == "flat":
+        per_vector = 4 * index.d
+    elif strategy == "hnsw":
+        # Full vectors plus about 2 * M neighbour ids on the base layer
+        per_vector = 4 * index.d + 2 * HNSW_M * 4
+    else:
+        # Codes plus the 64-bit id stored with each in its inverted list
+        per_vector = faiss.extract_index_ivf(index).code_size + 8
+    return index.ntotal * per_vector
+
+
+def recall_report(vectors, queries, strategies=INDEX_STRATEGIES, k=10, nprobes=(DEFAULT_NPROBE,),
+                  ef_searches=(DEFAULT_EF_SEARCH,)):
+    """
+    Recall@k and per-query latency of each strategy against an exact flat index.
+    Returns one dict per (strategy, setting) with recall, ms_per_query, build_s and memory_mb.
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    rows, dim = vectors.shape
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for strategy in strategies:
+        started = time.perf_counter()
+        index = create_index(strategy, dim, rows)
+        if not index.is_trained:
+            sample = vectors[np.random.default_rng(0).choice(rows, training_size(index, rows), replace=False)]
+            train_index(index, sample)
+        index.add(vectors)
+        build_s = time.perf_counter() - started
+
+        if strategy == "hnsw":
+            settings = [{"ef_search": ef} for ef in ef_searches]
+        elif strategy.startswith("ivf"):
+            settings = [{"nprobe": nprobe} for nprobe in nprobes]
+        else:
+            settings = [{}]
+
+        for setting in settings:
+            configure_search(index, **setting)
+            started = time.perf_counter()
+            # One query at a time, as the chat path searches
+            found = np.vstack([index.search(queries[i:i + 1], k)[1] for i in range(len(queries))])
+            elapsed = time.perf_counter() - started
+            hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+            report.append({
+                "strategy": strategy,
+                **setting,
+                "recall": round(hits / (k * len(queries)), 4),
+                "ms_per_query": round(elapsed * 1000 / len(queries), 3),
+                "build_s": round(build_s, 2),
+                "memory_mb": round(index_memory_bytes(index) / (1024 * 1024), 1),
+            })
+    return report
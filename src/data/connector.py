@@ -1,6 +1,11 @@
 # Data connector - integrates Google Drive and local file access
 import pandas as pd
 import os
+import shutil
+import time
+from src.data.downloader import StreamingDownloader
+from src.data.drive_cache import file_md5, get_drive_cache, same_version
+from src.data.snapshot import get_snapshot_store
 from src.utils.cx_helpers import load_environment_variables
 
 # Google Drive integration (adapted from google-drive-web-app)
@@ -8,16 +13,33 @@ try:
     import google.oauth2.credentials
     import google_auth_oauthlib.flow
     from googleapiclient.discovery import build
-    from googleapiclient.http import MediaIoBaseDownload
-    import io
     DRIVE_AVAILABLE = True
 except ImportError:
     DRIVE_AVAILABLE = False
 
+# Public download endpoints; overridable to point at a mirror or a local stand-in
+DRIVE_DOWNLOAD_URL = os.getenv(
+    "PIRHO_DRIVE_DOWNLOAD_URL",
+    "https://drive.usercontent.google.com/download?id={file_id}&export=download&confirm=t"
+)
+SHEETS_EXPORT_URL = os.getenv(
+    "PIRHO_SHEETS_EXPORT_URL",
+    "https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+)
+# Metadata-only lookups used to tell whether a cached Drive source changed
+DRIVE_METADATA_URL = os.getenv(
+    "PIRHO_DRIVE_METADATA_URL",
+    "https://www.googleapis.com/drive/v3/files/{file_id}"
+)
+DRIVE_METADATA_FIELDS = "id,name,size,md5Checksum,modifiedTime"
+DRIVE_METADATA_TIMEOUT = (5, 15)
+
 class DataConnector:
     def __init__(self):
         self.drive_service = None
         self.env = load_environment_variables()
+        self.snapshots = get_snapshot_store()
+        self.drive_cache = get_drive_cache()
 
     def authenticate_google_drive(self):
         """Authenticate with Google Drive API"""
@@ -71,60 +93,162 @@ class DataConnector:
 
         return "Google Drive authenticated successfully"
 
-    def download_drive_file(self, file_id):
-        """Download file from Google Drive"""
-        if not self.drive_service:
-            return None, "Not authenticated with Google Drive"
+    @staticmethod
+    def extract_file_id(sharing_url):
+        """Extract the file ID from a Google Drive or Sheets sharing URL"""
+        if 'drive.google.com/file/d/' in sharing_url:
+            return sharing_url.split('/file/d/')[1].split('/')[0]
+        elif 'docs.google.com/spreadsheets/d/' in sharing_url:
+            return sharing_url.split('/spreadsheets/d/')[1].split('/')[0]
+        elif 'id=' in sharing_url:
+            return sharing_url.split('id=')[1].split('&')[0]
+        return None
+
+    def load_file(self, file_path, columns=None):
+        """Load a local CSV/Excel file, reopening its columnar snapshot when it was seen before"""
+        return self.snapshots.read(file_path, columns)
+
+    def _drive_metadata(self, file_id, etag=None):
+        """
+        Metadata-only Drive lookup. Returns (status, metadata, etag) where status is
+        "not_modified" (304 for etag), "ok", or "unavailable" (no API access, e.g. no key).
+        """
+        import requests
 
+        params = {"fields": DRIVE_METADATA_FIELDS, "supportsAllDrives": "true"}
+        api_key = os.getenv("PIRHO_DRIVE_API_KEY")
+        if api_key:
+            params["key"] = api_key
+        headers = {"If-None-Match": etag} if etag else {}
         try:
-            request = self.drive_service.files().get_media(fileId=file_id)
-            file_data = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_data, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-
-            file_data.seek(0)
-            return file_data, None
-        except Exception as e:
-            return None, f"Download failed: {str(e)}"
+            response = requests.get(DRIVE_METADATA_URL.format(file_id=file_id), params=params,
+                                    headers=headers, timeout=DRIVE_METADATA_TIMEOUT)
+        except requests.RequestException:
+            return "unavailable", None, None
+        if response.status_code == 304:
+            return "not_modified", None, etag
+        if response.status_code != 200:
+            return "unavailable", None, None
+        try:
+            return "ok", response.json(), response.headers.get("ETag")
+        except ValueError:
+            return "unavailable", None, None
+
+    def fetch_drive_source(self, sharing_url, progress_callback=None):
+        """
+        Local copy of a Drive file, downloaded only when it changed since the last fetch.
+        A metadata lookup (md5Checksum, modifiedTime, size, ETag) decides first; without
+        API access the download itself is made conditional on the stored ETag.
+        Returns (path, message, changed); path is None on failure. The copy stays in the
+        Drive cache directory, so callers must not delete it.
+        """
+        file_id = self.extract_file_id(sharing_url)
+        if not file_id:
+            return None, "Invalid Google Drive sharing URL", False
+
+        entry = self.drive_cache.get(file_id)
+        is_sheet = 'docs.google.com/spreadsheets/d/' in sharing_url
+        metadata, metadata_etag = None, None
+        if not is_sheet:
+            status, metadata, metadata_etag = self._drive_metadata(
+                file_id, entry.get("metadata_etag") if entry else None
+            )
+            if entry and (status == "not_modified" or (status == "ok" and same_version(entry, metadata))):
+                entry.update(checked_at=time.time(), metadata_etag=metadata_etag or entry.get("metadata_etag"))
+                self.drive_cache.put(file_id, entry)
+                return entry["local_path"], "Google Drive file unchanged; using cached copy", False
+
+        # Only fall back to a conditional download when metadata could not tell
+        headers = {}
+        if entry and metadata is None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if is_sheet:
+            download_url, filename = SHEETS_EXPORT_URL.format(file_id=file_id), f"{file_id}.csv"
+        else:
+            download_url, filename = DRIVE_DOWNLOAD_URL.format(file_id=file_id), None
 
-    def load_csv_from_drive(self, sharing_url, file_name=None):
-        """Load CSV from Google Drive sharing URL"""
-        import gdown
         try:
-            # Extract file ID from sharing URL
-            file_id = None
-            if 'drive.google.com/file/d/' in sharing_url:
-                file_id = sharing_url.split('/file/d/')[1].split('/')[0]
-            elif 'docs.google.com/spreadsheets/d/' in sharing_url:
-                file_id = sharing_url.split('/spreadsheets/d/')[1].split('/')[0]
-            elif 'id=' in sharing_url:
-                file_id = sharing_url.split('id=')[1].split('&')[0]
-
-            if not file_id:
-                return pd.DataFrame(), "Invalid Google Drive sharing URL"
-
-            if file_name is None:
-                file_name = f"drive_{file_id}"
-
-            # Download using gdown
-            download_url = f"https://drive.google.com/uc?id={file_id}"
-            downloaded = gdown.download(download_url, quiet=True)
-
-            if not downloaded:
-                return pd.DataFrame(), "Failed to download from Google Drive"
-
-            # Load the downloaded file
-            if downloaded.endswith('.csv'):
-                df = pd.read_csv(downloaded)
-            elif downloaded.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(downloaded)
-            else:
-                return pd.DataFrame(), "Unsupported file type"
-
-            # Clean up
+            downloaded, info = StreamingDownloader().download(
+                download_url, filename=filename, headers=headers, progress_callback=progress_callback
+            )
+        except Exception as e:
+            return None, f"Error downloading from Drive: {str(e)}", False
+
+        if info["not_modified"]:
+            entry["checked_at"] = time.time()
+            self.drive_cache.put(file_id, entry)
+            return entry["local_path"], "Google Drive file unchanged; using cached copy", False
+
+        # Drive answers private or missing files with an HTML sign-in page
+        if info["content_type"].startswith("text/html"):
+            os.remove(downloaded)
+            return None, "Failed to download from Google Drive (is the file shared publicly?)", False
+        if not downloaded.endswith(('.csv', '.xlsx', '.xls')):
+            os.remove(downloaded)
+            return None, "Unsupported file type", False
+
+        md5 = file_md5(downloaded)
+        if entry and entry.get("md5") == md5:
+            # Same bytes under a new validator (e.g. a re-exported Sheet)
             os.remove(downloaded)
+            changed = False
+            local_path = entry["local_path"]
+        else:
+            changed = True
+            local_path = self.drive_cache.local_path(file_id, info["filename"])
+            shutil.move(downloaded, local_path)
+            if entry and entry["local_path"] != local_path and os.path.exists(entry["local_path"]):
+                os.remove(entry["local_path"])
+
+        metadata = metadata or {}
+        self.drive_cache.put(file_id, {
+            "file_id": file_id,
+            "url": sharing_url,
+            "name": metadata.get("name") or info["filename"],
+            "local_path": local_path,
+            "size": metadata.get("size") or info["size"] or os.path.getsize(local_path),
+            "md5": md5,
+            "modified_time": metadata.get("modifiedTime"),
+            "etag": info["etag"],
+            "metadata_etag": metadata_etag,
+            "checked_at": time.time(),
+        })
+        if changed:
+            return local_path, "Successfully downloaded from Google Drive", True
+        return local_path, "Google Drive file unchanged; using cached copy", False
+
+    def sync_drive_sources(self, file_ids, progress_callback=None):
+        """
+        Re-check the given cached Drive sources and download only those that changed.
+        Returns a list of {file_id, name, status, path, message}; status is
+        "updated", "unchanged" or "error".
+        """
+        results = []
+        entries = self.drive_cache.entries()
+        for file_id in file_ids:
+            entry = entries.get(file_id)
+            if entry is None:
+                continue
+            path, message, changed = self.fetch_drive_source(entry["url"], progress_callback)
+            status = "error" if path is None else "updated" if changed else "unchanged"
+            results.append({
+                "file_id": file_id,
+                "name": entry.get("name"),
+                "status": status,
+                "path": path,
+                "message": message,
+            })
+        return results
+
+    def load_csv_from_drive(self, sharing_url, file_name=None, columns=None):
+        """Load CSV from Google Drive sharing URL, reusing the cached copy when unchanged"""
+        local_path, message, _ = self.fetch_drive_source(sharing_url)
+        if not local_path:
+            return pd.DataFrame(), message
+
+        try:
+            # Identical contents reopen the earlier snapshot instead of re-parsing
+            df = self.load_file(local_path, columns)
 
             return df, "Successfully loaded from Google Drive"
 
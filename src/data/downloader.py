@@ -0,0 +1,224 @@
+# Downloader - streaming, resumable and parallel ranged HTTP downloads straight to disk
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+# Files at least this large are fetched as parallel byte ranges when the server allows it
+DEFAULT_PARALLEL_THRESHOLD = 32 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) seconds
+
+
+class DownloadError(Exception):
+    pass
+
+
+def filename_from_headers(headers):
+    """File name from a Content-Disposition header, or None"""
+    disposition = headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition, re.IGNORECASE)
+    if match:
+        return os.path.basename(unquote(match.group(1).strip().strip('"')))
+    match = re.search(r'filename="?([^";]+)"?', disposition, re.IGNORECASE)
+    if match:
+        return os.path.basename(match.group(1).strip())
+    return None
+
+
+class StreamingDownloader:
+    def __init__(self, chunk_size=None, part_size=None, parallel_threshold=None, max_workers=None,
+                 max_retries=DEFAULT_MAX_RETRIES, timeout=DEFAULT_TIMEOUT):
+        """
+        Download URLs to disk in chunk_size pieces without buffering the file in memory.
+        Large files on servers that accept byte ranges are split into part_size ranges
+        fetched by max_workers threads. A dropped connection resumes from the last
+        byte written (If-Range guards against the file changing in between).
+        """
+        self.chunk_size = chunk_size or int(os.getenv("PIRHO_DOWNLOAD_CHUNK_BYTES", DEFAULT_CHUNK_SIZE))
+        self.part_size = part_size or DEFAULT_PART_SIZE
+        self.parallel_threshold = parallel_threshold or int(
+            os.getenv("PIRHO_DOWNLOAD_PARALLEL_BYTES", DEFAULT_PARALLEL_THRESHOLD))
+        self.max_workers = max_workers or int(os.getenv("PIRHO_DOWNLOAD_WORKERS", DEFAULT_MAX_WORKERS))
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # One keep-alive session per thread; requests.Session is not thread-safe
+        self._local = threading.local()
+
+    def _session(self):
+        import requests
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    @staticmethod
+    def _retryable():
+        import requests
+
+        return (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, DownloadError)
+
+    def _backoff(self, attempt):
+        time.sleep(min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def download(self, url, dest_dir=None, filename=None, headers=None, progress_callback=None):
+        """
+        Download url into dest_dir (the temp directory by default).
+        Returns (path, info) where info has size, etag, last_modified, content_type,
+        filename, parts and resumes. progress_callback(done_bytes, total_bytes) is
+        called as data arrives; total_bytes may be None. For a conditional request
+        (If-None-Match) answered 304, path is None and info["not_modified"] is True.
+        """
+        headers = dict(headers or {})
+        response = self._session().get(url, headers=headers, stream=True, timeout=self.timeout)
+        if response.status_code == 304:
+            response.close()
+            return None, {"not_modified": True, "etag": response.headers.get("ETag")}
+        response.raise_for_status()
+
+        info = {
+            "not_modified": False,
+            "filename": filename or filename_from_headers(response.headers)
+            or os.path.basename(unquote(urlparse(url).path)) or "download",
+            "parts": 1,
+            "resumes": 0,
+        }
+        ranges = self._describe(response, info)
+        size = info["size"]
+
+        # A unique prefix keeps concurrent sessions downloading the same file apart
+        path = os.path.join(dest_dir or tempfile.gettempdir(), f"pirho-{uuid.uuid4().hex[:8]}-{info['filename']}")
+        partial = path + ".part"
+        try:
+            if ranges and size >= self.parallel_threshold:
+                response.close()
+                self._download_parts(url, partial, size, info, headers, progress_callback)
+            else:
+                self._download_stream(response, url, partial, size, ranges, info, headers, progress_callback)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return path, info
+
+    @staticmethod
+    def _describe(response, info):
+        """Record size, validators and type of a full (200) response; return whether ranges are supported"""
+        encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+        length = response.headers.get("Content-Length")
+        info["size"] = int(length) if length and not encoded else None
+        info["etag"] = response.headers.get("ETag")
+        info["last_modified"] = response.headers.get("Last-Modified")
+        info["content_type"] = response.headers.get("Content-Type", "")
+        return response.headers.get("Accept-Ranges", "").lower() == "bytes" and info["size"] is not None
+
+    @staticmethod
+    def _unconditional(headers):
+        # Once a body is being fetched, retries must not be answered with 304
+        return {name: value for name, value in headers.items() if name.lower() != "if-none-match"}
+
+    def _range_headers(self, headers, start, end, etag):
+        ranged = dict(self._unconditional(headers), Range=f"bytes={start}-{'' if end is None else end}")
+        if etag:
+            ranged["If-Range"] = etag
+        return ranged
+
+    def _download_stream(self, response, url, partial, size, ranges, info, headers, progress_callback):
+        written = 0
+        attempt = 0
+        with open(partial, "wb") as f:
+            while True:
+                try:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                        if progress_callback:
+                            progress_callback(written, size)
+                    if size is not None and written < size:
+                        raise DownloadError(f"Connection closed after {written} of {size} bytes")
+                    return
+                except self._retryable() as e:
+                    response.close()
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise DownloadError(f"Download failed after {self.max_retries} retries: {e}") from e
+                    self._backoff(attempt)
+
+                    if ranges and written:
+                        response = self._session().get(
+                            url, headers=self._range_headers(headers, written, None, info["etag"]),
+                            stream=True, timeout=self.timeout
+                        )
+                        if response.status_code == 206:
+                            info["resumes"] += 1
+                            continue
+                        # 200: the file changed (If-Range failed) or ranges stopped working; start over
+                    else:
+                        response = self._session().get(url, headers=self._unconditional(headers),
+                                                       stream=True, timeout=self.timeout)
+                    response.raise_for_status()
+                    ranges = self._describe(response, info)
+                    size = info["size"]
+                    f.seek(0)
+                    f.truncate()
+                    written = 0
+
+    def _download_parts(self, url, partial, size, info, headers, progress_callback):
+        with open(partial, "wb") as f:
+            f.truncate(size)
+
+        parts = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+        info["parts"] = len(parts)
+        lock = threading.Lock()
+        done = [0]
+
+        def advance(count):
+            with lock:
+                done[0] += count
+                if progress_callback:
+                    progress_callback(done[0], size)
+
+        def fetch(part):
+            start, end = part
+            offset = start
+            attempt = 0
+            with open(partial, "r+b") as f:
+                while offset <= end:
+                    try:
+                        response = self._session().get(
+                            url, headers=self._range_headers(headers, offset, end, info["etag"]),
+                            stream=True, timeout=self.timeout
+                        )
+                        if response.status_code != 206:
+                            response.close()
+                            raise DownloadError(f"Expected a partial response, got HTTP {response.status_code}")
+                        if offset > start:
+                            with lock:
+                                info["resumes"] += 1
+                        f.seek(offset)
+                        for chunk in response.iter_content(self.chunk_size):
+                            chunk = chunk[:end + 1 - offset]
+                            f.write(chunk)
+                            offset += len(chunk)
+                            advance(len(chunk))
+                        if offset <= end:
+                            raise DownloadError(f"Range {start}-{end} closed at byte {offset}")
+                    except self._retryable() as e:
+                        attempt += 1
+                        if attempt > self.max_retries:
+                            raise DownloadError(f"Download failed after {self.max_retries} retries: {e}") from e
+                        self._backoff(attempt)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(parts))) as executor:
+            # list() re-raises the first failed part
+            list(executor.map(fetch, parts))
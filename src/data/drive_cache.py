@@ -0,0 +1,108 @@
+# Drive source cache - local copies of Drive files plus the metadata needed to detect changes
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_DRIVE_CACHE_DIR = os.path.join(".cache", "drive")
+INDEX_FILE = "sources.json"
+
+
+def file_md5(file_path, block_size=1024 * 1024):
+    """MD5 of a file's bytes, comparable with Drive's md5Checksum"""
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def same_version(entry, metadata):
+    """Whether Drive metadata describes the same file contents as a cache entry"""
+    if metadata.get("md5Checksum") and entry.get("md5"):
+        return metadata["md5Checksum"] == entry["md5"]
+    # Google Docs formats have no checksum; fall back to modification time and size
+    return (
+        metadata.get("modifiedTime") == entry.get("modified_time")
+        and str(metadata.get("size")) == str(entry.get("size"))
+    )
+
+
+class DriveSourceCache:
+    def __init__(self, cache_dir=None):
+        """
+        Per-file-ID record of Drive sources: sharing URL, local copy, size, md5,
+        modifiedTime and ETags, persisted as JSON next to the local copies.
+        """
+        self.cache_dir = cache_dir or os.getenv("PIRHO_DRIVE_CACHE_DIR", DEFAULT_DRIVE_CACHE_DIR)
+        self.files_dir = os.path.join(self.cache_dir, "files")
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _refresh_locked(self):
+        """Pick up entries another process wrote since the last read, before changing the file"""
+        on_disk = self._load()
+        if on_disk:
+            self._entries = {**self._entries, **on_disk}
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_locked(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = f"{self.index_path}.tmp"
+        try:
+            with open(staging, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(staging, self.index_path)
+        except OSError as e:
+            print(f"Warning: Could not persist Drive source cache: {e}")
+
+    def get(self, file_id):
+        """Entry for file_id if its local copy still exists, else None"""
+        with self._lock:
+            entry = self._entries.get(file_id)
+        if entry is None or not os.path.exists(entry.get("local_path", "")):
+            return None
+        return dict(entry)
+
+    def put(self, file_id, entry):
+        with self._lock:
+            self._refresh_locked()
+            self._entries[file_id] = entry
+            self._save_locked()
+
+    def entries(self):
+        with self._lock:
+            return {file_id: dict(entry) for file_id, entry in self._entries.items()}
+
+    def remove(self, file_id):
+        """Forget a source and delete its local copy"""
+        with self._lock:
+            self._refresh_locked()
+            entry = self._entries.pop(file_id, None)
+            self._save_locked()
+        if entry and os.path.exists(entry.get("local_path", "")):
+            os.remove(entry["local_path"])
+
+    def local_path(self, file_id, name):
+        os.makedirs(self.files_dir, exist_ok=True)
+        return os.path.join(self.files_dir, f"{file_id}-{os.path.basename(name)}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_drive_cache():
+    """Process-wide Drive source cache, so concurrent sessions share one view of sources.json"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DriveSourceCache()
+        return _default_cache
@@ -0,0 +1,196 @@
+# Snapshot store - parse each ingested file once into a memory-mapped Arrow IPC snapshot
+#
+# Snapshots are uncompressed Arrow IPC files named by the source file's content hash, so
+# the same bytes uploaded again, re-downloaded from Drive or loaded by another session
+# reopen without re-parsing CSV/Excel text. Files are memory-mapped: only the projected
+# columns are read, and the OS page cache is shared by every process opening them.
+# pyarrow is optional; without it files are parsed as before.
+import hashlib
+import importlib.util
+import os
+import threading
+import uuid
+import pandas as pd
+from src.core.index_cache import file_fingerprint
+
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(".cache", "snapshots")
+DEFAULT_MAX_SNAPSHOT_MB = 2048
+SNAPSHOT_SUFFIX = ".arrow"
+# Bump when the parsing options below change, so old snapshots are not reused
+SNAPSHOT_VERSION = "1"
+
+
+def parse_file(file_path, columns=None):
+    """Parse a CSV or Excel file with pandas, reading only columns if given"""
+    if file_path.endswith('.csv'):
+        return pd.read_csv(file_path, usecols=columns)
+    elif file_path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(file_path, usecols=columns)
+    raise ValueError("Unsupported file format. Use CSV or Excel.")
+
+
+class SnapshotStore:
+    def __init__(self, snapshot_dir=None, max_size_mb=None):
+        """
+        Content-addressed Arrow snapshots of parsed CSV/Excel files.
+        Least recently used snapshots are removed once the store exceeds max_size_mb.
+        """
+        self.snapshot_dir = snapshot_dir or os.getenv("PIRHO_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+        if max_size_mb is None:
+            max_size_mb = float(os.getenv("PIRHO_SNAPSHOT_MB", DEFAULT_MAX_SNAPSHOT_MB))
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        # (path, size, mtime) -> content hash, so an unchanged file is hashed once per process
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def key_for(self, file_path):
+        """Snapshot key: content hash of the file plus the parser kind and version"""
+        stat = os.stat(file_path)
+        stamp = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            fingerprint = self._fingerprints.get(stamp)
+        if fingerprint is None:
+            fingerprint = file_fingerprint(file_path)
+            with self._lock:
+                self._fingerprints[stamp] = fingerprint
+
+        kind = "csv" if file_path.endswith('.csv') else "excel"
+        return hashlib.sha256(f"{fingerprint}|{kind}|{SNAPSHOT_VERSION}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, key + SNAPSHOT_SUFFIX)
+
+    def read(self, file_path, columns=None):
+        """
+        DataFrame for file_path, from its snapshot when one exists; otherwise the
+        file is parsed once and snapshotted. columns limits the columns returned.
+        """
+        if not ARROW_AVAILABLE:
+            return parse_file(file_path, columns)
+
+        key = self.key_for(file_path)
+        df = self.load(key, columns)
+        if df is not None:
+            return df
+
+        df = parse_file(file_path)
+        self.save(key, df)
+        return df[list(columns)] if columns is not None else df
+
+    def has(self, key):
+        """Whether a snapshot is stored under key"""
+        return ARROW_AVAILABLE and os.path.exists(self._path(key))
+
+    def load(self, key, columns=None):
+        """
+        Open a snapshot memory-mapped and convert only the projected columns, or None on a
+        miss. Raises KeyError for columns the snapshot does not have, keeping the snapshot.
+        """
+        import pyarrow as pa
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            # Columns that convert without copying keep referencing the mapping after this returns
+            table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        except (OSError, pa.ArrowException) as e:
+            print(f"Warning: Discarding unreadable snapshot {key}: {e}")
+            self._remove(path)
+            return None
+
+        if columns is not None:
+            missing = [col for col in columns if col not in table.schema.names]
+            if missing:
+                raise KeyError(f"Columns not found in data: {', '.join(map(str, missing))}")
+            # Keep the pandas metadata so the index and dtypes are restored
+            table = table.select(list(columns)).replace_schema_metadata(table.schema.metadata)
+        try:
+            df = table.to_pandas(split_blocks=True)
+        except pa.ArrowException as e:
+            print(f"Warning: Discarding unreadable snapshot {key}: {e}")
+            self._remove(path)
+            return None
+
+        self._touch(path)
+        return df
+
+    def save(self, key, df):
+        """Write a snapshot atomically, then evict old ones over the size budget"""
+        import pyarrow as pa
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self._path(key)
+        staging = os.path.join(self.snapshot_dir, f".tmp-{uuid.uuid4().hex}")
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=None)
+            with pa.OSFile(staging, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(staging, path)
+        except (OSError, pa.ArrowException) as e:
+            # Mixed-type object columns cannot be stored; the parsed frame is still returned
+            print(f"Warning: Could not write snapshot {key}: {e}")
+            self._remove(staging)
+            return
+
+        self.evict(keep=path)
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        """Remove least recently used snapshots until the store fits in max_bytes"""
+        if not os.path.isdir(self.snapshot_dir):
+            return
+        entries = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(SNAPSHOT_SUFFIX):
+                path = os.path.join(self.snapshot_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Delete every snapshot"""
+        if os.path.isdir(self.snapshot_dir):
+            for name in os.listdir(self.snapshot_dir):
+                self._remove(os.path.join(self.snapshot_dir, name))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Process-wide snapshot store configured from PIRHO_SNAPSHOT_* environment variables"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SnapshotStore()
+        return _default_store
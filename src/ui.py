@@ -1,16 +1,23 @@
+import os
+import shutil
+import uuid
 import streamlit as st
 import pandas as pd
+from src.utils import tracing
 try:
     from src.core.llm import LLMHandler
     from src.core.rag import RAGHandler
+    from src.core.registry import LLMLease
+    from src.core.catalog import DatasetCatalog
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
+    DatasetCatalog = None
     class RAGHandler:
         def __init__(self):
             self.df = None
             self._validate_data = lambda df: []
-        def load_csv(self, file_path=None, df=None):
+        def load_csv(self, file_path=None, df=None, progress_callback=None, incremental=False, chunksize=None):
             import pandas as pd
             if df is not None:
                 self.df = df
@@ -41,9 +48,72 @@ except ImportError:
             self.model_choice = model_choice
         def generate_response(self, prompt, context=None, language="en"):
             return "AI model not available. Please install ML dependencies for chat functionality."
+        def stream_response(self, prompt, context=None, language="en"):
+            yield self.generate_response(prompt, context, language)
         def get_model_info(self):
             return {"type": "None", "optimized_for": "Not available", "features": ["None"]}
 
+    class LLMLease:
+        def __init__(self, model_choice="phi4"):
+            self.handler = LLMHandler(model_choice)
+        def release(self):
+            pass
+
+# Files above this size are ingested in streaming mode with bounded memory
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 50_000
+COPY_BLOCK_SIZE = 1024 * 1024
+
+def streaming_chunksize(file_path):
+    """Chunk size for load_csv: stream large CSVs, load small files whole"""
+    if file_path.endswith('.csv') and os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES:
+        return STREAMING_CHUNK_ROWS
+    return None
+
+def load_dataset(name, file_path, **options):
+    """
+    Load a file as the active dataset. With a catalog, each file keeps its own index
+    under name so questions can span everything loaded in this session.
+    """
+    catalog = st.session_state.get("catalog")
+    if catalog is None:
+        return st.session_state.rag.load_csv(file_path, **options)
+    handler, result = catalog.load(name, file_path, **options)
+    if catalog.active != name:
+        # Failed loads come back as messages; keep the previous dataset on screen
+        raise ValueError(result)
+    st.session_state.rag = handler
+    return result
+
+def lease_llm(model_choice):
+    """
+    Shared LLM handler for model_choice, held for this session until it switches model
+    or ends; the previous hold is released first
+    """
+    previous = st.session_state.get("llm_lease")
+    if previous is not None:
+        previous.release()
+    st.session_state.llm_lease = LLMLease(model_choice)
+    return st.session_state.llm_lease.handler
+
+def query_context(prompt):
+    """Context for a question from the datasets selected in the sidebar, or the active one"""
+    catalog = st.session_state.get("catalog")
+    selected = st.session_state.get("query_datasets") or []
+    if catalog is None or not selected or selected == [catalog.active]:
+        return st.session_state.rag.query_data(prompt)
+    return catalog.query(prompt, datasets=selected)
+
+def make_progress_callback(label="Embedding data"):
+    """Return a load_csv progress callback that drives a Streamlit progress bar"""
+    progress_bar = st.progress(0.0, text=label)
+
+    def update(done, total):
+        if total:
+            progress_bar.progress(min(done / total, 1.0), text=f"{label}: {done}/{total}")
+
+    return update
+
 def render_chat_ui():
     st.set_page_config(page_title="PiRhoAI", page_icon="📊", layout="wide")
 
@@ -123,6 +193,9 @@ def render_chat_ui():
     # Initialize session state
     if "rag" not in st.session_state:
         st.session_state.rag = RAGHandler()
+    if "catalog" not in st.session_state:
+        # Every dataset loaded this session, each with its own index
+        st.session_state.catalog = DatasetCatalog() if DatasetCatalog is not None else None
     if "llm" not in st.session_state:
         st.session_state.llm = None  # Initialize later
     if "messages" not in st.session_state:
@@ -135,18 +208,21 @@ def render_chat_ui():
         st.session_state.language = "en"
     if "auto_loaded" not in st.session_state:
         st.session_state.auto_loaded = False
+    if "session_id" not in st.session_state:
+        # Tags this session's traces so the sidebar shows no one else's
+        st.session_state.session_id = uuid.uuid4().hex
 
     # Auto-load sample data on first run
     if not st.session_state.auto_loaded:
         if not st.session_state.data_loaded:
             try:
-                df = pd.read_csv("sample_data.csv")
-                result = st.session_state.rag.load_csv(df=df)
+                result = load_dataset("sample_data.csv", "sample_data.csv")
                 st.success(f"Auto-loaded sample data: {result}")
                 st.session_state.data_loaded = True
+                st.session_state.drive_source = None
                 if st.session_state.llm is None:
                     with st.spinner("Loading AI model..."):
-                        st.session_state.llm = LLMHandler(st.session_state.model_choice)
+                        st.session_state.llm = lease_llm(st.session_state.model_choice)
                 st.session_state.auto_loaded = True
                 st.rerun()
             except Exception as e:
@@ -363,20 +439,28 @@ def render_chat_ui():
                     file_details = {"filename": uploaded_file.name, "filesize": uploaded_file.size}
                     st.write(file_details)
 
-                    # Save uploaded file temporarily
+                    # Save uploaded file temporarily, copying in blocks rather than via getvalue()
                     file_path = f"temp_{uploaded_file.name}"
+                    uploaded_file.seek(0)
                     with open(file_path, "wb") as f:
-                        f.write(uploaded_file.getvalue())
+                        shutil.copyfileobj(uploaded_file, f, COPY_BLOCK_SIZE)
 
                     try:
-                        result = st.session_state.rag.load_csv(file_path)
+                        result = load_dataset(
+                            uploaded_file.name,
+                            file_path,
+                            progress_callback=make_progress_callback(),
+                            incremental=True,
+                            chunksize=streaming_chunksize(file_path)
+                        )
                         st.success(result)
                         st.session_state.data_loaded = True
+                        st.session_state.drive_source = None
 
                         # Initialize LLM if needed
                         if st.session_state.llm is None:
                             with st.spinner("Loading AI model (first time may take a while)..."):
-                                st.session_state.llm = LLMHandler(st.session_state.model_choice)
+                                st.session_state.llm = lease_llm(st.session_state.model_choice)
 
                         st.rerun()
                     except Exception as e:
@@ -388,20 +472,39 @@ def render_chat_ui():
 
                 elif drive_link:
                     try:
-                        with st.spinner("Downloading from Google Drive..."):
-                            df, message = connector.load_csv_from_drive(drive_link)
-
-                        if message == "Successfully loaded from Google Drive":
-                            result = st.session_state.rag.load_csv(df=df)
-                            st.success(f"From Google Drive: {result}")
-                            st.session_state.data_loaded = True
-
-                            # Initialize LLM if needed
-                            if st.session_state.llm is None:
-                                with st.spinner("Loading AI model..."):
-                                    st.session_state.llm = LLMHandler()
-
-                            st.rerun()
+                        with st.spinner("Checking Google Drive..."):
+                            local_path, message, changed = connector.fetch_drive_source(
+                                drive_link, progress_callback=make_progress_callback("Downloading")
+                            )
+
+                        if local_path:
+                            loaded = st.session_state.get("drive_source")
+                            if not changed and st.session_state.data_loaded and loaded == local_path:
+                                # Same bytes already embedded in this session
+                                st.info(message)
+                            else:
+                                result = load_dataset(
+                                    os.path.basename(local_path),
+                                    local_path,
+                                    progress_callback=make_progress_callback(),
+                                    incremental=True,
+                                    chunksize=streaming_chunksize(local_path)
+                                )
+                                st.success(f"From Google Drive: {result}")
+                                st.session_state.data_loaded = True
+                                st.session_state.drive_source = local_path
+                                # Sync only re-checks the Drive files this session loaded
+                                file_id = connector.extract_file_id(drive_link)
+                                drive_files = st.session_state.get("drive_files", [])
+                                if file_id not in drive_files:
+                                    st.session_state.drive_files = drive_files + [file_id]
+
+                                # Initialize LLM if needed
+                                if st.session_state.llm is None:
+                                    with st.spinner("Loading AI model..."):
+                                        st.session_state.llm = lease_llm(st.session_state.model_choice)
+
+                                st.rerun()
                         else:
                             st.error(message)
 
@@ -410,21 +513,45 @@ def render_chat_ui():
                 else:
                     st.warning("Please upload a file or provide a Drive link")
 
+            if st.session_state.get("drive_source") and st.button("🔄 Sync Drive sources",
+                                                                 help="Download only Drive files that changed"):
+                from src.data.connector import DataConnector
+                with st.spinner("Checking Google Drive for changes..."):
+                    results = DataConnector().sync_drive_sources(st.session_state.get("drive_files", []))
+                for item in results:
+                    if item["status"] == "error":
+                        st.error(f"{item['name']}: {item['message']}")
+                    elif item["status"] == "updated" and item["path"] == st.session_state.drive_source:
+                        result = load_dataset(
+                            os.path.basename(item["path"]),
+                            item["path"],
+                            progress_callback=make_progress_callback(),
+                            incremental=True,
+                            chunksize=streaming_chunksize(item["path"])
+                        )
+                        st.success(f"{item['name']} updated: {result}")
+                    else:
+                        catalog = st.session_state.catalog
+                        if item["status"] == "updated" and catalog is not None \
+                                and os.path.basename(item["path"]) in catalog.names():
+                            # Other loaded Drive datasets pick up the new version on their next question
+                            catalog.register(os.path.basename(item["path"]), item["path"], incremental=True)
+                        st.caption(f"{item['name']}: {item['status']}")
+
             st.markdown("---")
             st.header("🚀 Quick Start")
 
             if st.button("Load Sample Data", type="secondary", help="Load synthetic business data to explore PiRhoAI features"):
                 try:
-                    import pandas as pd
-                    df = pd.read_csv("sample_data.csv")
-                    result = st.session_state.rag.load_csv(df=df)
+                    result = load_dataset("sample_data.csv", "sample_data.csv", progress_callback=make_progress_callback())
                     st.success(f"Sample data loaded: {result}")
                     st.session_state.data_loaded = True
+                    st.session_state.drive_source = None
 
                     # Initialize LLM if needed
                     if st.session_state.llm is None:
                         with st.spinner("Loading AI model..."):
-                            st.session_state.llm = LLMHandler(st.session_state.model_choice)
+                            st.session_state.llm = lease_llm(st.session_state.model_choice)
 
                     st.rerun()
                 except Exception as e:
@@ -435,20 +562,33 @@ def render_chat_ui():
                 preview = st.session_state.rag.get_preview()
                 st.code(preview[:1000], language='text')  # Show first 1000 chars
 
+            catalog = st.session_state.catalog
+            if catalog is not None and len(catalog.names()) > 1:
+                st.multiselect(
+                    "Ask across datasets",
+                    catalog.names(),
+                    default=[catalog.active] if catalog.active in catalog.names() else None,
+                    key="query_datasets",
+                    help="Questions search every selected dataset in parallel and combine the closest matches"
+                )
+
             st.markdown("---")
             st.header("⚙️ Settings")
 
             # Model selector
+            model_options = ["phi4", "phi4-int8", "phi4-onnx", "phi3", "grok4"]
             model_choice = st.selectbox(
                 "AI Model",
-                ["phi4", "phi3", "grok4"],
-                index=["phi4", "phi3", "grok4"].index(st.session_state.model_choice),
-                help="Phi-4 (latest) for MSME analytics, optimized for accuracy. Grok-4 in future release."
+                model_options,
+                index=model_options.index(st.session_state.model_choice),
+                help="Phi-4 (latest) for MSME analytics, optimized for accuracy. phi4-int8 / phi4-onnx run "
+                     "it on CPU with int8 weights or ONNX Runtime. Grok-4 in future release."
             )
 
             if model_choice != st.session_state.model_choice:
+                # Swap to the shared handler for the new model; the old one stays cached for other sessions
                 st.session_state.model_choice = model_choice
-                st.session_state.llm = LLMHandler(model_choice)  # Reinitialize with new model
+                st.session_state.llm = lease_llm(model_choice)
                 st.session_state.messages = []  # Clear chat for new model
                 st.success(f"Switched to {model_choice.upper()} model")
 
@@ -472,6 +612,24 @@ def render_chat_ui():
                 st.write(f"**Optimized for**: {model_info['optimized_for']}")
                 st.write(f"**Features**: {', '.join(model_info['features'])}")
 
+                if hasattr(st.session_state.llm, 'response_cache'):
+                    cache_stats = st.session_state.llm.response_cache.stats()
+                    st.write(f"**Response cache**: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
+                if getattr(st.session_state.llm, 'scheduler', None) is not None:
+                    queue_stats = st.session_state.llm.scheduler.stats()
+                    st.write(f"**Generation queue**: {queue_stats['pending']} waiting, "
+                             f"avg batch {queue_stats['mean_batch_size']:.1f}")
+
+            # Per-request timing breakdown; the operator enables it with PIRHO_TRACE=1
+            if tracing.is_enabled():
+                with st.expander("⏱️ Recent traces", expanded=False):
+                    traces = tracing.recent_traces(limit=5, session=st.session_state.session_id)
+                    if not traces:
+                        st.caption("No traces yet. Ask a question to record one.")
+                    for record in traces:
+                        st.code("\n".join(tracing.format_trace(record)), language='text')
+
         # Main chat interface
     if not st.session_state.data_loaded:
         st.info("👋 Upload some data first to start chatting with PiRhoAI!")
@@ -510,21 +668,24 @@ def render_chat_ui():
 
         # Generate AI response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
+            try:
+                with tracing.span("chat.request", session=st.session_state.session_id,
+                                  model=st.session_state.model_choice,
+                                  language=st.session_state.language):
                     # Get context from RAG
-                    context = st.session_state.rag.query_data(prompt)
-                    
-                    # Generate response with LLM
-                    response = st.session_state.llm.generate_response(prompt, context, st.session_state.language)
-                    
-                    st.markdown(response)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                except Exception as e:
-                    error_msg = f"Sorry, I encountered an error: {str(e)}. Please try again."
-                    st.error(error_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                    with st.spinner("Thinking..."):
+                        context = query_context(prompt)
+
+                    # Render tokens as the LLM produces them
+                    response = st.write_stream(
+                        st.session_state.llm.stream_response(prompt, context, st.session_state.language)
+                    )
+                st.session_state.messages.append({"role": "assistant", "content": response})
+
+            except Exception as e:
+                error_msg = f"Sorry, I encountered an error: {str(e)}. Please try again."
+                st.error(error_msg)
+                st.session_state.messages.append({"role": "assistant", "content": error_msg})
 
     # Voice input placeholder (would need JavaScript)
     st.markdown("---")
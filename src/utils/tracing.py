@@ -0,0 +1,190 @@
+# Tracing - lightweight nested timing spans for the load, retrieval and generation hot paths
+#
+# Enable with PIRHO_TRACE=1 (or set_enabled(True) from operator code). Finished traces
+# are kept in memory for the sidebar panel, which shows each session only its own.
+# When PIRHO_TRACE_PATH is set, they are also appended to it as JSON lines.
+# When disabled, span() returns a shared no-op object, so instrumented code pays for
+# one flag check per call.
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_RECENT_TRACES = 50
+
+_enabled = os.getenv("PIRHO_TRACE", "0") == "1"
+_path = os.getenv("PIRHO_TRACE_PATH") or None
+_current = contextvars.ContextVar("pirho_current_span", default=None)
+_recent = deque(maxlen=MAX_RECENT_TRACES)
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+class _NoopSpan:
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def incr(self, key, amount=1):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    recording = True
+
+    def __init__(self, name, parent=None, activate=True, attrs=None):
+        """
+        One timed step. Spans opened while this one is active become its children;
+        with activate=False (for generators) it is timed but never made current.
+        """
+        self.name = name
+        self.parent = parent
+        self.activate = activate
+        self.attrs = attrs or {}
+        self.children = []
+        self.trace_id = parent.trace_id if parent else next(_ids)
+        self.started_at = None
+        self.duration_ms = None
+        self._start = None
+        self._token = None
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        if self.parent is not None:
+            self.parent.children.append(self)
+        if self.activate:
+            self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        if self.parent is None:
+            _finish_trace(self)
+        return False
+
+    def set(self, **attrs):
+        """Attach counts, cache outcomes or other details"""
+        self.attrs.update(attrs)
+
+    def incr(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attrs": self.attrs,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled, path=None):
+    """Turn tracing on or off at runtime; path overrides PIRHO_TRACE_PATH"""
+    global _enabled, _path
+    _enabled = bool(enabled)
+    if path is not None:
+        _path = path or None
+
+
+def span(name, activate=True, **attrs):
+    """Context manager timing one step, nested under the active span if any"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, parent=_current.get(), activate=activate, attrs=attrs)
+
+
+def current_span():
+    """The active span, or a no-op span when tracing is off or nothing is active"""
+    if not _enabled:
+        return _NOOP
+    return _current.get() or _NOOP
+
+
+def traced(name=None):
+    """Decorator wrapping a function call in a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish_trace(root):
+    record = root.to_dict()
+    record["trace_id"] = root.trace_id
+    with _lock:
+        _recent.append(record)
+        if _path:
+            try:
+                with open(_path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write trace: {e}")
+
+
+def recent_traces(limit=10, session=None):
+    """Most recent finished traces, newest first; only those whose root has session=session if given"""
+    with _lock:
+        records = list(_recent)[::-1]
+    if session is not None:
+        records = [record for record in records if record["attrs"].get("session") == session]
+    return records[:limit]
+
+
+def clear_traces():
+    with _lock:
+        _recent.clear()
+
+
+def export_jsonl(path):
+    """Write the in-memory traces to path, one JSON object per line"""
+    with _lock:
+        records = list(_recent)
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + "\n")
+    return len(records)
+
+
+def format_trace(record, indent=0):
+    """Indented 'name  12.3 ms  key=value' lines for one trace"""
+    details = " ".join(
+        f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in record["attrs"].items()
+    )
+    duration = record["duration_ms"] or 0.0
+    lines = [f"{'  ' * indent}{record['name']}  {duration:.1f} ms  {details}".rstrip()]
+    for child in record["children"]:
+        lines.extend(format_trace(child, indent + 1))
+    return lines
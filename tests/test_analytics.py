@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.core.analytics import AnalyticsEngine
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_data.csv")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return AnalyticsEngine(pd.read_csv(SAMPLE_DATA))
+
+
+def result_lines(answer):
+    """Value lines of a grouped answer, after the header and the column label"""
+    return answer.splitlines()[2:]
+
+
+def test_most_orders_counts_rows(engine):
+    plan = engine.plan("Which customer has the most orders?")
+    assert plan.group == "Customer"
+    assert plan.aggregation == "count"
+    assert plan.measure is None
+
+
+def test_most_orders_returns_every_tie(engine):
+    # Every customer in the sample placed exactly one order
+    lines = result_lines(engine.answer("Which customer has the most orders?"))
+    assert len(lines) == 20
+    assert all(line.endswith(": 1") for line in lines)
+
+
+@pytest.mark.parametrize("question", [
+    "Which product has the most purchases?",
+    "Which product has the most transactions?",
+    "What is the most popular product?",
+])
+def test_frequency_rankings_count_rows(engine, question):
+    plan = engine.plan(question)
+    assert plan.group == "Product"
+    assert plan.aggregation == "count"
+
+
+def test_most_popular_products_returns_every_tie(engine):
+    # Each product appears in five rows
+    lines = result_lines(engine.answer("What are the most popular products?"))
+    assert sorted(lines) == ["Keyboard: 5", "Laptop: 5", "Monitor: 5", "Mouse: 5"]
+
+
+def test_revenue_ranking_needs_sales_words(engine):
+    plan = engine.plan("Which product has the highest sales?")
+    assert plan.measure == "Revenue"
+    assert result_lines(engine.answer("Which product has the highest sales?")) == ["Laptop: 9,350.00"]
+
+
+def test_top_n_without_ties_is_exact(engine):
+    assert result_lines(engine.answer("top 2 products by revenue")) == ["Laptop: 9,350.00", "Monitor: 2,375.00"]
+
+
+def test_units_ranking_sums_quantity(engine):
+    assert result_lines(engine.answer("Which product sold the most units?")) == ["Mouse: 15"]
+
+
+def test_question_naming_no_column_falls_back_to_retrieval(engine):
+    assert engine.plan("Which suppliers give best deals?") is None
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.core.lexical_index import LexicalIndex
+from src.core.profile import DatasetProfile
+from src.core.rag import RAGHandler
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_data.csv")
+
+
+@pytest.fixture(scope="module")
+def df():
+    df = pd.read_csv(SAMPLE_DATA)
+    # An integer column whose one value names every row of the sample
+    df["Year"] = 2025
+    return df
+
+
+@pytest.fixture(scope="module")
+def index(df):
+    return LexicalIndex().add(df).finish()
+
+
+def test_text_values_are_entities(index):
+    assert {col for col, _, _ in index.match_entities("What did Jane Smith buy?")} == {"Customer"}
+
+
+def test_numbers_are_not_entities(index):
+    assert index.match_entities("Which orders had a quantity of 3 in 2025?") == []
+
+
+def test_numbers_still_score_in_bm25(index):
+    rows, _ = index.search("2025-01-02")
+    assert len(rows)
+
+
+def test_numeric_token_leaves_question_to_analytics(df, index):
+    handler = RAGHandler()
+    handler.df = df
+    handler.lexical = index
+    handler.profile = DatasetProfile().update(df)
+    answer = handler.query_data("What was the total quantity sold in 2025?")
+    assert isinstance(answer, str)
+    assert answer.startswith("Computed result")